@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .datastore import BaseStore, store
+from .rollups import FAILED_STATUSES, SyncRollup, classify
+
+TIER_LEVELS = ("hot", "warm", "cold")
+DISK_STATUSES = ("normal", "warning", "failed")
+ALERT_STATUSES = ("open", "processing", "closed")
+TRACKED_COLLECTIONS = ("projects", "assets", "disks", "sync_jobs", "alerts")
+RECENT_FAILURES = 5
+# Failed jobs kept in memory for recentFailures; older ones are looked up again only if deletions eat into these.
+FAILURES_KEPT = 50
+
+
+def asset_mb(asset: Dict[str, Any]) -> int:
+    return int(asset.get("size", 0) * 1024)
+
+
+class DashboardAggregates:
+    # Dashboard counters maintained as deltas from store change events, so
+    # reading the overview never scans a collection.
+
+    def __init__(self, source: Optional[BaseStore] = None) -> None:
+        self._source = source
+        self._lock = threading.Lock()
+        self.total_capacity: float = 0
+        self.used_capacity = 0
+        self.tiers: Dict[str, int] = {}
+        self.disk_status: Dict[str, int] = {}
+        self.sync_rollup = SyncRollup()
+        self.alert_status: Dict[str, int] = {}
+        self._failure_ids: List[int] = []
+        self._failures: Dict[int, Dict[str, Any]] = {}
+        # Whether failed jobs older than the kept ones may exist.
+        self._failures_truncated = False
+
+    def _count(self, counter: Dict[str, int], key: Any, sign: int) -> None:
+        counter[key] = counter.get(key, 0) + sign
+
+    def _apply(self, collection: str, record: Dict[str, Any], sign: int) -> None:
+        if collection == "projects":
+            self.total_capacity += sign * record.get("projectCapacityGb", 0)
+        elif collection == "assets":
+            size = asset_mb(record)
+            self.used_capacity += sign * size
+            tier = record.get("tierLevel", "hot")
+            self.tiers[tier] = self.tiers.get(tier, 0) + sign * size
+        elif collection == "disks":
+            self._count(self.disk_status, record.get("status"), sign)
+        elif collection == "sync_jobs":
+            self.sync_rollup.add(record, sign)
+            if classify(record.get("status")) == "failed":
+                self._track_failure(record, sign)
+        elif collection == "alerts":
+            self._count(self.alert_status, record.get("status"), sign)
+
+    def _track_failure(self, job: Dict[str, Any], sign: int) -> None:
+        ids = self._failure_ids
+        if sign > 0:
+            if job["id"] in self._failures:
+                self._failures[job["id"]] = job
+                return
+            if len(ids) >= FAILURES_KEPT and job["id"] < ids[0]:
+                self._failures_truncated = True
+                return
+            if not ids or job["id"] > ids[-1]:
+                ids.append(job["id"])
+            else:
+                bisect.insort(ids, job["id"])
+            self._failures[job["id"]] = job
+            if len(ids) > FAILURES_KEPT:
+                del self._failures[ids.pop(0)]
+                self._failures_truncated = True
+        elif self._failures.pop(job["id"], None) is not None:
+            del ids[bisect.bisect_left(ids, job["id"])]
+            if len(ids) < RECENT_FAILURES and self._failures_truncated and self._source is not None:
+                self._refill_failures()
+
+    def _refill_failures(self) -> None:
+        # Runs in the writer's listener call, where reading the store is safe.
+        failed: List[Dict[str, Any]] = []
+        for status in FAILED_STATUSES:
+            failed.extend(self._source.find_by("sync_jobs", "status", status))
+        failed.sort(key=lambda job: job["id"])
+        kept = failed[-FAILURES_KEPT:]
+        self._failure_ids = [job["id"] for job in kept]
+        self._failures = {job["id"]: job for job in kept}
+        self._failures_truncated = len(failed) > FAILURES_KEPT
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection not in TRACKED_COLLECTIONS:
+            return
+        with self._lock:
+            if old is not None:
+                self._apply(collection, old, -1)
+            if new is not None:
+                self._apply(collection, new, 1)
+
+    def load(self, collection: str, records: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for record in records:
+                self._apply(collection, record, 1)
+
+    def capacity_summary(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {tier: self.tiers.get(tier, 0) for tier in TIER_LEVELS}
+            tiers.update((tier, size) for tier, size in self.tiers.items() if tier not in tiers)
+            return {
+                "totalGb": self.total_capacity,
+                "usedGb": self.used_capacity,
+                "remainingGb": max(self.total_capacity - self.used_capacity, 0),
+                "tiers": tiers,
+            }
+
+    def sync_summary(self) -> Dict[str, Any]:
+        windows = self.sync_rollup.windows()
+        with self._lock:
+            recent = [self._failures[job_id] for job_id in reversed(self._failure_ids[-RECENT_FAILURES:])]
+        return {
+            "totalLast24h": windows["24h"]["total"],
+            "success": windows["24h"]["success"],
+            "failed": windows["24h"]["failed"],
+            "recentFailures": recent,
+            "windows": windows,
+        }
+
+    def overview(self) -> Dict[str, Any]:
+        capacity = self.capacity_summary()
+        sync = self.sync_summary()
+        with self._lock:
+            return {
+                "capacitySummary": capacity,
+                "diskSummary": {status: self.disk_status.get(status, 0) for status in DISK_STATUSES},
+                "syncSummary": sync,
+                "alertSummary": {status: self.alert_status.get(status, 0) for status in ALERT_STATUSES},
+            }
+
+
+def build_dashboard_aggregates(source: BaseStore) -> DashboardAggregates:
+    aggregates = DashboardAggregates(source)
+    with source.transaction():
+        source.add_listener(aggregates.on_change)
+        for collection in TRACKED_COLLECTIONS:
+            aggregates.load(collection, source.get_collection(collection))
+    return aggregates
+
+
+dashboard = build_dashboard_aggregates(store)
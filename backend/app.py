@@ -1,15 +1,67 @@
 from __future__ import annotations
 
+import asyncio
+import bisect
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-from fastapi import Body, FastAPI, HTTPException, Query
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from .datastore import iso_now, store
-
-app = FastAPI(title="创作 NAS 混合云 API", version="1.0.0")
+from .aggregates import dashboard
+from .bulk import BATCH_ACTIONS, plan_batch, unique_ids
+from .datastore import STORE_PATH, iso_now, store
+from .events import EventStreamResponse, event_bus, parse_topics
+from .export import EXPORT_FILTERS, buffered, csv_lines, iter_records, ndjson_lines
+from .folder_sizes import folder_sizes
+from .folder_tree import folder_trees
+from .http_cache import ETagMiddleware, cache_on
+from .import_engine import import_engine
+from .locks import lock_file
+from .pagination import MAX_PAGE_SIZE, decode_cursor, page_response, parse_fields
+from .responses import FastJSONResponse, FastJSONRoute
+from .restore import LANES, restore_scheduler
+from .scheduler import SCHEDULER_ENABLED, parse_schedule, sync_scheduler
+from .search import asset_index
+from .sync_engine import relative_location, sync_executor
+from .tiering import TIERING_ENABLED, tiering_engine
+from .writer import store_writer
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # With several workers on a shared store, only the one holding this lock
+    # recovers interrupted work and runs the scheduler and tiering.
+    primary = lock_file(Path(STORE_PATH).with_name(Path(STORE_PATH).name + ".primary"))
+    if primary is not None:
+        sync_executor.recover()
+        import_engine.recover()
+        restore_scheduler.recover()
+    restore_scheduler.start()
+    if primary is not None and SCHEDULER_ENABLED:
+        sync_scheduler.start()
+    if primary is not None and TIERING_ENABLED:
+        tiering_engine.start()
+    yield
+    await store_writer.close()
+    tiering_engine.close()
+    sync_scheduler.close()
+    sync_executor.close()
+    import_engine.close()
+    restore_scheduler.close()
+    # Deferred group commits may still hold writes in memory.
+    store.close()
+    if primary is not None:
+        primary.close()
+
+
+app = FastAPI(title="创作 NAS 混合云 API", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
+app.router.route_class = FastJSONRoute
+# Added before CORS so CORS stays the outermost layer, also for cached responses.
+app.add_middleware(ETagMiddleware, source=store)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,219 +70,337 @@ app.add_middleware(
 )
 
 
+def not_found(collection: str, item_id: int) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"{collection} {item_id} 不存在")
+
+
 def ensure_exists(collection: str, item_id: int) -> Dict[str, Any]:
     item = store.find_by_id(collection, item_id)
     if not item:
-        raise HTTPException(status_code=404, detail=f"{collection} {item_id} 不存在")
+        raise not_found(collection, item_id)
     return item
 
 
+async def update_existing(collection: str, item_id: int, changes: Dict[str, Any]) -> Dict[str, Any]:
+    # Looked up and written in one step on the writer thread, so a record
+    # deleted in the meantime is a 404 rather than a null body.
+    def update() -> Dict[str, Any]:
+        updated = store.update(collection, item_id, changes)
+        if updated is None:
+            raise not_found(collection, item_id)
+        return updated
+
+    return await store_writer.run(update)
+
+
+def cursor_position(cursor: Optional[str]) -> Optional[int]:
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="分页游标无效") from None
+
+
+def list_page(
+    collection: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    fields: Optional[str],
+    filters: Optional[Dict[str, Any]] = None,
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Dict[str, Any]:
+    records = store.scan(
+        collection,
+        {field: value for field, value in (filters or {}).items() if value is not None},
+        where,
+        after=cursor_position(cursor),
+        limit=None if limit is None else limit + 1,
+    )
+    return page_response(records, limit, parse_fields(fields))
+
+
+def validate_schedule(payload: Dict[str, Any]) -> None:
+    if not payload.get("schedule"):
+        return
+    try:
+        parse_schedule(payload["schedule"])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"执行计划无效: {payload['schedule']}") from None
+
+
+def validate_sync_locations(payload: Dict[str, Any]) -> None:
+    names = [payload["source"]] if "source" in payload else []
+    targets = payload.get("target", [])
+    names.extend(targets if isinstance(targets, list) else [targets])
+    for name in names:
+        try:
+            if not isinstance(name, str):
+                raise ValueError(name)
+            relative_location(name)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"同步路径无效: {name}") from None
+
+
+def validate_import_target(payload: Dict[str, Any]) -> None:
+    # The ids name the directory imported files are written to, so they must be real.
+    project_id = payload.get("targetProjectId")
+    folder_id = payload.get("targetFolderId")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in (project_id, folder_id)):
+        raise HTTPException(status_code=400, detail="导入目标无效")
+    folder = store.find_by_id("folders", folder_id)
+    if store.find_by_id("projects", project_id) is None or folder is None or folder.get("projectId") != project_id:
+        raise HTTPException(status_code=400, detail="导入目标文件夹不存在或不属于该项目")
+
+
+def find_project_member(project_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    return next((item for item in store.find_by("project_members", "projectId", project_id) if item.get("userId") == user_id), None)
+
+
+@app.get("/api/events")
+async def stream_events(request: Request, topics: str) -> EventStreamResponse:
+    try:
+        subscriber = event_bus.subscribe(parse_topics(topics), asyncio.get_running_loop())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="订阅主题无效") from None
+    except OverflowError:
+        raise HTTPException(status_code=503, detail="订阅连接数已达上限") from None
+    return EventStreamResponse(event_bus, subscriber, request.is_disconnected)
+
+
+@app.get("/api/export/{collection}")
+async def export_collection(
+    collection: str,
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+) -> StreamingResponse:
+    allowed = EXPORT_FILTERS.get(collection)
+    if allowed is None:
+        raise HTTPException(status_code=404, detail=f"{collection} 不支持导出")
+    filters: Dict[str, Any] = {}
+    for name, convert in allowed.items():
+        raw = request.query_params.get(name)
+        if raw in (None, ""):
+            continue
+        try:
+            filters[name] = convert(raw)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"参数 {name} 无效") from None
+    records = iter_records(store, collection, filters)
+    if format == "csv":
+        lines, media_type = csv_lines(records, parse_fields(fields)), "text/csv; charset=utf-8"
+    else:
+        lines, media_type = ndjson_lines(records, parse_fields(fields)), "application/x-ndjson"
+    return StreamingResponse(
+        buffered(lines),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'},
+    )
+
+
 @app.get("/api/dashboard/overview")
-def dashboard_overview() -> Dict[str, Any]:
-    return store.dashboard_overview()
+async def dashboard_overview() -> Dict[str, Any]:
+    return dashboard.overview()
 
 
 @app.get("/api/projects")
+@cache_on("projects")
 def list_projects(
     keyword: Optional[str] = None,
     status: Optional[str] = None,
     owner: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
 ) -> Dict[str, Any]:
-    projects = store.data["projects"]
-    result = []
-    for project in projects:
-        if keyword and keyword not in (project.get("name", "") + project.get("clientName", "")):
-            continue
-        if status and project.get("status") != status:
-            continue
-        if owner and project.get("ownerName") != owner:
-            continue
-        result.append(project)
-    return {"items": result, "total": len(result)}
+    filters = {field: value for field, value in (("status", status), ("ownerName", owner)) if value}
+    where = (lambda project: keyword in (project.get("name", "") + project.get("clientName", ""))) if keyword else None
+    page = list_page("projects", limit, cursor, fields, filters, where)
+    page["total"] = store.count("projects", filters, where)
+    return page
 
 
 @app.post("/api/projects")
-def create_project(payload: Dict[str, Any]) -> Dict[str, Any]:
-    project_id = store.next_id("projects")
+async def create_project(payload: Dict[str, Any]) -> Dict[str, Any]:
     payload.setdefault("createdAt", iso_now())
     payload.setdefault("updatedAt", iso_now())
-    payload["id"] = project_id
-    store.get_collection("projects").append(payload)
-    store.save()
+    await store_writer.insert("projects", payload)
     return payload
 
 
 @app.get("/api/projects/{project_id}")
+@cache_on("projects")
 def get_project(project_id: int) -> Dict[str, Any]:
     return ensure_exists("projects", project_id)
 
 
 @app.patch("/api/projects/{project_id}")
-def update_project(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    project = ensure_exists("projects", project_id)
-    project.update(payload)
-    project["updatedAt"] = iso_now()
-    store.save()
-    return project
+async def update_project(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("projects", project_id, {**payload, "updatedAt": iso_now()})
 
 
 @app.delete("/api/projects/{project_id}")
-def delete_project(project_id: int) -> Dict[str, Any]:
-    deleted = store.delete_by_id("projects", project_id)
+async def delete_project(project_id: int) -> Dict[str, Any]:
+    deleted = await store_writer.delete_by_id("projects", project_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="项目不存在")
-    store.save()
     return {"status": "deleted"}
 
 
 @app.get("/api/projects/{project_id}/stats")
 def project_stats(project_id: int) -> Dict[str, Any]:
     ensure_exists("projects", project_id)
-    assets = [asset for asset in store.data["assets"] if asset.get("projectId") == project_id]
-    total_gb = sum(asset.get("size", 0) for asset in assets)
-    tiers: Dict[str, float] = {}
-    for asset in assets:
-        tier = asset.get("tierLevel", "hot")
-        tiers[tier] = tiers.get(tier, 0) + asset.get("size", 0)
-    folder_usage: Dict[int, float] = {}
-    for asset in assets:
-        folder_usage[asset.get("folderId")] = folder_usage.get(asset.get("folderId"), 0) + asset.get("size", 0)
-    folder_map = {folder["id"]: folder["name"] for folder in store.data["folders"]}
-    folder_breakdown = [
-        {"folderId": folder_id, "folderName": folder_map.get(folder_id, ""), "size": size}
-        for folder_id, size in folder_usage.items()
-    ]
+    totals = folder_sizes.project(project_id)
+    folder_breakdown = []
+    for folder in store.find_by("folders", "projectId", project_id):
+        usage = folder_sizes.folder(folder["id"])
+        if usage["assetCount"]:
+            folder_breakdown.append({"folderId": folder["id"], "folderName": folder.get("name", ""), **usage})
     folder_breakdown.sort(key=lambda item: item["size"], reverse=True)
-    return {"totalSize": total_gb, "tiers": tiers, "topFolders": folder_breakdown[:10]}
+    return {
+        "totalSize": totals["size"],
+        "assetCount": totals["assetCount"],
+        "tiers": totals["tiers"],
+        "topFolders": folder_breakdown[:10],
+    }
 
 
 @app.get("/api/projects/{project_id}/sync-tasks")
+@cache_on("projects", "sync_tasks")
 def project_sync_tasks(project_id: int) -> Dict[str, Any]:
     ensure_exists("projects", project_id)
-    tasks = [task for task in store.data["sync_tasks"] if task.get("projectId") == project_id]
+    tasks = store.find_by("sync_tasks", "projectId", project_id)
     return {"items": tasks}
 
 
 @app.get("/api/projects/{project_id}/members")
+@cache_on("projects", "project_members", "users")
 def list_project_members(project_id: int) -> Dict[str, Any]:
     ensure_exists("projects", project_id)
-    members = [member for member in store.data["project_members"] if member.get("projectId") == project_id]
-    user_map = {user["id"]: user for user in store.data["users"]}
-    for member in members:
-        user = user_map.get(member.get("userId"))
+    members = []
+    for member in store.find_by("project_members", "projectId", project_id):
+        user = store.find_by_id("users", member.get("userId"))
         if user:
-            member["username"] = user.get("username")
-            member["name"] = user.get("name")
+            member = {**member, "username": user.get("username"), "name": user.get("name")}
+        members.append(member)
     return {"items": members}
 
 
 @app.post("/api/projects/{project_id}/members")
-def add_project_member(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    ensure_exists("projects", project_id)
-    member_id = store.next_id("project_members")
-    payload["id"] = member_id
+async def add_project_member(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
     payload["projectId"] = project_id
     payload.setdefault("joinedAt", iso_now())
-    store.get_collection("project_members").append(payload)
-    store.save()
+
+    def add() -> None:
+        with store.transaction():
+            ensure_exists("projects", project_id)
+            store.insert("project_members", payload)
+
+    await store_writer.run(add)
     return payload
 
 
 @app.patch("/api/projects/{project_id}/members/{user_id}")
-def update_project_member(project_id: int, user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    member = next(
-        (item for item in store.data["project_members"] if item.get("projectId") == project_id and item.get("userId") == user_id),
-        None,
-    )
-    if not member:
-        raise HTTPException(status_code=404, detail="成员不存在")
-    member.update(payload)
-    store.save()
-    return member
+async def update_project_member(project_id: int, user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def update() -> Dict[str, Any]:
+        with store.transaction():
+            member = find_project_member(project_id, user_id)
+            if not member:
+                raise HTTPException(status_code=404, detail="成员不存在")
+            return store.update("project_members", member["id"], payload)
+
+    return await store_writer.run(update)
 
 
 @app.delete("/api/projects/{project_id}/members/{user_id}")
-def delete_project_member(project_id: int, user_id: int) -> Dict[str, Any]:
-    before = len(store.data["project_members"])
-    store.data["project_members"] = [
-        item for item in store.data["project_members"] if not (item.get("projectId") == project_id and item.get("userId") == user_id)
-    ]
-    if before == len(store.data["project_members"]):
-        raise HTTPException(status_code=404, detail="成员不存在")
-    store.save()
+async def delete_project_member(project_id: int, user_id: int) -> Dict[str, Any]:
+    def delete() -> None:
+        with store.transaction():
+            member = find_project_member(project_id, user_id)
+            if not member:
+                raise HTTPException(status_code=404, detail="成员不存在")
+            store.delete_by_id("project_members", member["id"])
+
+    await store_writer.run(delete)
     return {"status": "deleted"}
 
 
 @app.get("/api/projects/{project_id}/tree")
-def project_tree(project_id: int) -> Dict[str, Any]:
+def project_tree(
+    project_id: int,
+    parentId: Optional[int] = Query(None),
+    depth: Optional[int] = Query(None, ge=1),
+) -> Dict[str, Any]:
     ensure_exists("projects", project_id)
-    folders = [folder for folder in store.data["folders"] if folder.get("projectId") == project_id]
+    if parentId is not None:
+        parent = ensure_exists("folders", parentId)
+        if parent.get("projectId") != project_id:
+            raise HTTPException(status_code=404, detail="目录不属于该项目")
+    return {"items": folder_trees.tree(project_id, parentId, depth, folder_sizes.folder)}
 
-    def build(parent_id: Optional[int]) -> List[Dict[str, Any]]:
-        nodes = [folder for folder in folders if folder.get("parentId") == parent_id]
-        for node in nodes:
-            node["children"] = build(node.get("id"))
-        return nodes
 
-    return {"items": build(None)}
+@app.get("/api/folders/{folder_id}/assets")
+def folder_assets(
+    folder_id: int,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    ensure_exists("folders", folder_id)
+    return list_page("assets", limit, cursor, fields, {"folderId": folder_id})
 
 
-@app.get("/api/folders/{folder_id}/assets")
-def folder_assets(folder_id: int) -> Dict[str, Any]:
+@app.get("/api/folders/{folder_id}/stats")
+def folder_stats(folder_id: int) -> Dict[str, Any]:
     ensure_exists("folders", folder_id)
-    assets = [asset for asset in store.data["assets"] if asset.get("folderId") == folder_id]
-    return {"items": assets}
+    return {"folderId": folder_id, **folder_sizes.folder(folder_id)}
 
 
 @app.post("/api/folders")
-def create_folder(payload: Dict[str, Any]) -> Dict[str, Any]:
-    folder_id = store.next_id("folders")
-    payload["id"] = folder_id
-    store.get_collection("folders").append(payload)
-    store.save()
+async def create_folder(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("folders", payload)
     return payload
 
 
 @app.patch("/api/folders/{folder_id}")
-def update_folder(folder_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    folder = ensure_exists("folders", folder_id)
-    folder.update(payload)
-    store.save()
-    return folder
+async def update_folder(folder_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("folders", folder_id, payload)
 
 
 @app.delete("/api/folders/{folder_id}")
-def delete_folder(folder_id: int) -> Dict[str, Any]:
-    ensure_exists("folders", folder_id)
-    has_child = any(folder.get("parentId") == folder_id for folder in store.data["folders"])
-    has_assets = any(asset.get("folderId") == folder_id for asset in store.data["assets"])
-    if has_child or has_assets:
-        raise HTTPException(status_code=400, detail="目录非空，无法删除")
-    store.data["folders"] = [folder for folder in store.data["folders"] if folder.get("id") != folder_id]
-    store.save()
+async def delete_folder(folder_id: int) -> Dict[str, Any]:
+    def delete() -> None:
+        with store.transaction():
+            ensure_exists("folders", folder_id)
+            has_child = store.count_by("folders", "parentId", folder_id) > 0
+            has_assets = store.count_by("assets", "folderId", folder_id) > 0
+            if has_child or has_assets:
+                raise HTTPException(status_code=400, detail="目录非空，无法删除")
+            store.delete_by_id("folders", folder_id)
+
+    await store_writer.run(delete)
     return {"status": "deleted"}
 
 
 @app.patch("/api/assets/batch")
-def batch_asset_operation(payload: Dict[str, Any]) -> Dict[str, Any]:
+async def batch_asset_operation(payload: Dict[str, Any]) -> Dict[str, Any]:
     action = payload.get("action")
-    asset_ids: List[int] = payload.get("assetIds", [])
-    updated: List[Dict[str, Any]] = []
-    for asset_id in asset_ids:
-        asset = store.find_by_id("assets", asset_id)
-        if not asset:
-            continue
-        if action == "move":
-            asset["folderId"] = payload.get("targetFolderId", asset.get("folderId"))
-        elif action == "delete":
-            store.delete_by_id("assets", asset_id)
-        elif action == "tag":
-            tags = payload.get("tags", [])
-            asset.setdefault("tags", [])
-            asset["tags"] = list(set(asset["tags"]) | set(tags))
-        updated.append(asset)
-    store.save()
-    return {"items": updated}
+    if action not in BATCH_ACTIONS:
+        raise HTTPException(status_code=400, detail="不支持的批量操作")
+    asset_ids: List[int] = unique_ids(payload.get("assetIds", []))
+
+    def apply() -> Dict[str, Any]:
+        with store.transaction():
+            assets = store.find_many("assets", asset_ids)
+            updates, deletes, outcomes = plan_batch(action, asset_ids, assets, payload)
+            written = store.bulk_write("assets", updates, deletes)
+        summary: Dict[str, int] = {}
+        for outcome in outcomes:
+            summary[outcome["status"]] = summary.get(outcome["status"], 0) + 1
+        deleted = set(deletes)
+        items = [written.get(asset_id, assets[asset_id]) for asset_id in asset_ids if asset_id in assets and asset_id not in deleted]
+        return {"items": items, "results": outcomes, "summary": summary}
+
+    return await store_writer.run(apply)
 
 
 @app.get("/api/assets/{asset_id}")
@@ -239,41 +409,64 @@ def get_asset(asset_id: int) -> Dict[str, Any]:
 
 
 @app.patch("/api/assets/{asset_id}/meta")
-def update_asset_meta(asset_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    asset = ensure_exists("assets", asset_id)
-    asset.update(payload)
-    asset["updatedAt"] = iso_now()
-    store.save()
-    return asset
+async def update_asset_meta(asset_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("assets", asset_id, {**payload, "updatedAt": iso_now()})
 
 
 @app.post("/api/assets/{asset_id}/restore")
-def restore_asset(asset_id: int) -> Dict[str, Any]:
-    asset = ensure_exists("assets", asset_id)
-    asset["localPresence"] = "both"
-    store.save()
-    return {"status": "restoring", "asset": asset}
+async def restore_asset(asset_id: int, payload: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
+    def submit() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        asset = ensure_exists("assets", asset_id)
+        return asset, restore_scheduler.submit([asset_id], payload.get("initiator") or "", "interactive", "asset", asset.get("projectId"))
+
+    asset, task = await store_writer.run(submit)
+    return {"status": "restored" if task["status"] == "success" else "restoring", "asset": asset, "task": task}
+
+
+@app.post("/api/folders/{folder_id}/restore")
+async def restore_folder(folder_id: int, payload: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
+    priority = payload.get("priority") or "bulk"
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail="不支持的恢复优先级")
+
+    def submit() -> Dict[str, Any]:
+        folder = ensure_exists("folders", folder_id)
+        asset_ids = restore_scheduler.folder_assets(folder_id)
+        return restore_scheduler.submit(asset_ids, payload.get("initiator") or "", priority, "folder", folder["projectId"], folder_id)
+
+    return await store_writer.run(submit)
 
 
 @app.get("/api/import/devices")
+@cache_on("import_devices")
 def list_import_devices() -> Dict[str, Any]:
-    return {"items": store.data.get("import_devices", [])}
+    return {"items": store.get_document("import_devices", [])}
 
 
 @app.post("/api/import/tasks")
-def create_import_task(payload: Dict[str, Any]) -> Dict[str, Any]:
-    task_id = store.next_id("import_tasks")
-    payload["id"] = task_id
+async def create_import_task(payload: Dict[str, Any]) -> Dict[str, Any]:
     payload.setdefault("status", "pending")
     payload.setdefault("createdAt", iso_now())
-    store.get_collection("import_tasks").append(payload)
-    store.save()
-    return payload
+
+    def create() -> Dict[str, Any]:
+        try:
+            import_engine.device_root(payload.get("sourceDevice"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="导入设备不存在") from None
+        validate_import_target(payload)
+        store.insert("import_tasks", payload)
+        return import_engine.launch(payload["id"]) or payload
+
+    return await store_writer.run(create)
 
 
 @app.get("/api/import/tasks")
-def list_import_tasks() -> Dict[str, Any]:
-    return {"items": store.data["import_tasks"]}
+def list_import_tasks(
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    return list_page("import_tasks", limit, cursor, fields)
 
 
 @app.get("/api/import/tasks/{task_id}")
@@ -282,11 +475,15 @@ def get_import_task(task_id: int) -> Dict[str, Any]:
 
 
 @app.post("/api/import/tasks/{task_id}/retry")
-def retry_import_task(task_id: int) -> Dict[str, Any]:
-    task = ensure_exists("import_tasks", task_id)
-    task["status"] = "running"
-    task["startedAt"] = iso_now()
-    store.save()
+async def retry_import_task(task_id: int) -> Dict[str, Any]:
+    def launch() -> Optional[Dict[str, Any]]:
+        ensure_exists("import_tasks", task_id)
+        # Files the task already imported are skipped; only the rest are copied.
+        return import_engine.launch(task_id)
+
+    task = await store_writer.run(launch)
+    if task is None:
+        raise HTTPException(status_code=409, detail="导入任务正在执行")
     return task
 
 
@@ -296,121 +493,132 @@ def search_assets(payload: Dict[str, Any]) -> Dict[str, Any]:
     project_ids = payload.get("projectIds")
     tier_level = payload.get("tierLevel")
     file_type = payload.get("fileType")
-    results = []
-    for asset in store.data["assets"]:
-        if keyword and keyword not in (asset.get("fileName", "") + asset.get("projectName", "") + asset.get("clientName", "")):
-            continue
-        if project_ids and asset.get("projectId") not in project_ids:
-            continue
-        if tier_level and asset.get("tierLevel") != tier_level:
-            continue
-        if file_type and asset.get("fileType") != file_type:
-            continue
-        results.append(asset)
-    return {"items": results, "total": len(results)}
+    limit = payload.get("limit")
+    if limit is not None and (not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE):
+        raise HTTPException(status_code=422, detail=f"limit 需在 1-{MAX_PAGE_SIZE} 之间")
+    after = cursor_position(payload.get("cursor"))
+    fields = payload.get("fields")
+    fields = fields if isinstance(fields, list) else parse_fields(fields)
+    filters = {field: value for field, value in (("tierLevel", tier_level), ("fileType", file_type)) if value}
+    fetch = None if limit is None else limit + 1
+    if keyword:
+        hits = store.find_many("assets", asset_index.search(keyword))
+        results = [
+            asset
+            for _, asset in sorted(hits.items())
+            if (not project_ids or asset.get("projectId") in project_ids)
+            and all(asset.get(field) == value for field, value in filters.items())
+        ]
+        start = 0 if after is None else bisect.bisect_right([asset["id"] for asset in results], after)
+        page = page_response(results[start : None if fetch is None else start + fetch], limit, fields)
+        page["total"] = len(results)
+        return page
+    if not project_ids:
+        page = page_response(store.scan("assets", filters, after=after, limit=fetch), limit, fields)
+        page["total"] = store.count("assets", filters)
+        return page
+    # One indexed scan per project, merged by id.
+    scopes = [{**filters, "projectId": project_id} for project_id in sorted(set(project_ids))]
+    records = sorted((asset for scope in scopes for asset in store.scan("assets", scope, after=after, limit=fetch)), key=lambda asset: asset["id"])
+    page = page_response(records[:fetch], limit, fields)
+    page["total"] = sum(store.count("assets", scope) for scope in scopes)
+    return page
 
 
 @app.post("/api/search/views")
-def create_search_view(payload: Dict[str, Any]) -> Dict[str, Any]:
-    view_id = store.next_id("search_views")
-    payload["id"] = view_id
+async def create_search_view(payload: Dict[str, Any]) -> Dict[str, Any]:
     payload.setdefault("lastUsedAt", iso_now())
-    store.get_collection("search_views").append(payload)
-    store.save()
+    await store_writer.insert("search_views", payload)
     return payload
 
 
 @app.get("/api/search/views")
+@cache_on("search_views")
 def list_search_views(userId: Optional[int] = Query(default=None, alias="userId")) -> Dict[str, Any]:
-    views = store.data["search_views"]
     if userId is not None:
-        views = [view for view in views if view.get("userId") == userId]
+        views = store.find_by("search_views", "userId", userId)
+    else:
+        views = store.get_collection("search_views")
     return {"items": views}
 
 
 @app.patch("/api/search/views/{view_id}")
-def update_search_view(view_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    view = ensure_exists("search_views", view_id)
-    view.update(payload)
-    store.save()
-    return view
+async def update_search_view(view_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("search_views", view_id, payload)
 
 
 @app.delete("/api/search/views/{view_id}")
-def delete_search_view(view_id: int) -> Dict[str, Any]:
-    deleted = store.delete_by_id("search_views", view_id)
+async def delete_search_view(view_id: int) -> Dict[str, Any]:
+    deleted = await store_writer.delete_by_id("search_views", view_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="视图不存在")
-    store.save()
     return {"status": "deleted"}
 
 
 @app.get("/api/sync-tasks")
+@cache_on("sync_tasks")
 def list_sync_tasks() -> Dict[str, Any]:
-    return {"items": store.data["sync_tasks"]}
+    return {"items": store.get_collection("sync_tasks")}
+
+
+@app.get("/api/sync-tasks/upcoming")
+async def upcoming_sync_runs() -> Dict[str, Any]:
+    return {"items": sync_scheduler.upcoming()}
 
 
 @app.post("/api/sync-tasks")
-def create_sync_task(payload: Dict[str, Any]) -> Dict[str, Any]:
-    task_id = store.next_id("sync_tasks")
-    payload["id"] = task_id
+async def create_sync_task(payload: Dict[str, Any]) -> Dict[str, Any]:
+    validate_schedule(payload)
+    validate_sync_locations(payload)
     payload.setdefault("enabled", True)
-    store.get_collection("sync_tasks").append(payload)
-    store.save()
+    await store_writer.insert("sync_tasks", payload)
     return payload
 
 
 @app.patch("/api/sync-tasks/{task_id}")
-def update_sync_task(task_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    task = ensure_exists("sync_tasks", task_id)
-    task.update(payload)
-    store.save()
-    return task
+async def update_sync_task(task_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    validate_schedule(payload)
+    validate_sync_locations(payload)
+    return await update_existing("sync_tasks", task_id, payload)
 
 
 @app.patch("/api/sync-tasks/{task_id}/enable")
-def toggle_sync_task(task_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    task = ensure_exists("sync_tasks", task_id)
-    task["enabled"] = payload.get("enabled", True)
-    store.save()
-    return task
+async def toggle_sync_task(task_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("sync_tasks", task_id, {"enabled": payload.get("enabled", True)})
 
 
 @app.post("/api/sync-tasks/{task_id}/run")
-def run_sync_task(task_id: int) -> Dict[str, Any]:
-    task = ensure_exists("sync_tasks", task_id)
-    job_id = store.next_id("sync_jobs")
-    job = {
-        "id": job_id,
-        "taskId": task_id,
-        "taskName": task.get("name"),
-        "startedAt": iso_now(),
-        "finishedAt": None,
-        "status": "running",
-        "totalFiles": 0,
-        "successFiles": 0,
-        "failedFiles": 0,
-    }
-    store.get_collection("sync_jobs").append(job)
-    store.save()
+async def run_sync_task(task_id: int) -> Dict[str, Any]:
+    def launch() -> Optional[Dict[str, Any]]:
+        return sync_executor.launch(ensure_exists("sync_tasks", task_id))
+
+    job = await store_writer.run(launch)
+    if job is None:
+        raise HTTPException(status_code=409, detail="任务正在执行")
     return job
 
 
 @app.delete("/api/sync-tasks/{task_id}")
-def delete_sync_task(task_id: int) -> Dict[str, Any]:
-    deleted = store.delete_by_id("sync_tasks", task_id)
+async def delete_sync_task(task_id: int) -> Dict[str, Any]:
+    deleted = await store_writer.delete_by_id("sync_tasks", task_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="任务不存在")
-    store.save()
     return {"status": "deleted"}
 
 
 @app.get("/api/sync-jobs")
-def list_sync_jobs(taskId: Optional[int] = Query(default=None, alias="taskId")) -> Dict[str, Any]:
-    jobs = store.data["sync_jobs"]
-    if taskId is not None:
-        jobs = [job for job in jobs if job.get("taskId") == taskId]
-    return {"items": jobs}
+def list_sync_jobs(
+    taskId: Optional[int] = Query(default=None, alias="taskId"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    return list_page("sync_jobs", limit, cursor, fields, {"taskId": taskId})
+
+
+@app.get("/api/sync-jobs/stats")
+async def sync_job_stats() -> Dict[str, Any]:
+    return {"windows": dashboard.sync_rollup.windows()}
 
 
 @app.get("/api/sync-jobs/{job_id}")
@@ -419,51 +627,55 @@ def get_sync_job(job_id: int) -> Dict[str, Any]:
 
 
 @app.get("/api/tier-policies")
+@cache_on("tier_policies")
 def list_tier_policies() -> Dict[str, Any]:
-    return {"items": store.data["tier_policies"]}
+    return {"items": store.get_collection("tier_policies")}
 
 
 @app.post("/api/tier-policies")
-def create_tier_policy(payload: Dict[str, Any]) -> Dict[str, Any]:
-    policy_id = store.next_id("tier_policies")
-    payload["id"] = policy_id
-    store.get_collection("tier_policies").append(payload)
-    store.save()
+async def create_tier_policy(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("tier_policies", payload)
     return payload
 
 
 @app.patch("/api/tier-policies/{policy_id}")
-def update_tier_policy(policy_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    policy = ensure_exists("tier_policies", policy_id)
-    policy.update(payload)
-    store.save()
-    return policy
+async def update_tier_policy(policy_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("tier_policies", policy_id, payload)
+
+
+@app.get("/api/tiering/status")
+async def tiering_status() -> Dict[str, Any]:
+    return tiering_engine.status()
+
+
+@app.post("/api/tiering/run")
+async def run_tiering() -> Dict[str, Any]:
+    return await store_writer.run(tiering_engine.run_once)
 
 
 @app.patch("/api/projects/{project_id}/tier-policy")
-def update_project_tier_policy(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    project = ensure_exists("projects", project_id)
-    existing = next((p for p in store.data["tier_policies"] if p.get("projectId") == project_id), None)
-    if existing:
-        existing.update(payload)
-        policy = existing
-    else:
-        policy_id = store.next_id("tier_policies")
-        policy = {
-            "id": policy_id,
-            "type": "project",
-            "projectId": project_id,
-            "projectName": project.get("name"),
-            **payload,
-        }
-        store.get_collection("tier_policies").append(policy)
-    store.save()
-    return policy
+async def update_project_tier_policy(project_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def upsert() -> Dict[str, Any]:
+        with store.transaction():
+            project = ensure_exists("projects", project_id)
+            existing = next(iter(store.find_by("tier_policies", "projectId", project_id)), None)
+            if existing:
+                return store.update("tier_policies", existing["id"], payload)
+            policy = {
+                "type": "project",
+                "projectId": project_id,
+                "projectName": project.get("name"),
+                **payload,
+            }
+            store.insert("tier_policies", policy)
+            return policy
+
+    return await store_writer.run(upsert)
 
 
 @app.get("/api/restore/tasks")
 def list_restore_tasks() -> Dict[str, Any]:
-    return {"items": store.data["restore_tasks"]}
+    return {"items": store.get_collection("restore_tasks")}
 
 
 @app.get("/api/restore/tasks/{task_id}")
@@ -471,62 +683,84 @@ def get_restore_task(task_id: int) -> Dict[str, Any]:
     return ensure_exists("restore_tasks", task_id)
 
 
+@app.post("/api/restore/tasks")
+async def create_restore_task(payload: Dict[str, Any]) -> Dict[str, Any]:
+    asset_ids = payload.get("assetIds")
+    if not asset_ids or not isinstance(asset_ids, list) or not all(isinstance(asset_id, int) for asset_id in asset_ids):
+        raise HTTPException(status_code=400, detail="请选择要恢复的素材")
+    priority = payload.get("priority") or ("interactive" if len(asset_ids) == 1 else "bulk")
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail="不支持的恢复优先级")
+
+    def submit() -> Dict[str, Any]:
+        project_ids = {asset.get("projectId") for asset in store.find_many("assets", asset_ids).values()}
+        project_id = project_ids.pop() if len(project_ids) == 1 else None
+        return restore_scheduler.submit(asset_ids, payload.get("initiator") or "", priority, "asset", project_id)
+
+    return await store_writer.run(submit)
+
+
+@app.get("/api/restore/queue")
+async def restore_queue() -> Dict[str, Any]:
+    return restore_scheduler.pending()
+
+
 @app.post("/api/restore/tasks/{task_id}/retry")
-def retry_restore_task(task_id: int) -> Dict[str, Any]:
-    task = ensure_exists("restore_tasks", task_id)
-    task["status"] = "running"
-    task["startedAt"] = iso_now()
-    task["finishedAt"] = None
-    store.save()
-    return task
+async def retry_restore_task(task_id: int) -> Dict[str, Any]:
+    def retry() -> Optional[Dict[str, Any]]:
+        return restore_scheduler.retry(ensure_exists("restore_tasks", task_id))
+
+    retried = await store_writer.run(retry)
+    if retried is None:
+        raise HTTPException(status_code=409, detail="恢复任务正在执行")
+    return retried
 
 
 @app.get("/api/disks")
+@cache_on("disks")
 def list_disks() -> Dict[str, Any]:
-    return {"items": store.data["disks"]}
+    return {"items": store.get_collection("disks")}
 
 
 @app.get("/api/disks/{disk_id}")
+@cache_on("disks")
 def get_disk(disk_id: int) -> Dict[str, Any]:
     return ensure_exists("disks", disk_id)
 
 
 @app.get("/api/storage/arrays")
+@cache_on("storage_arrays")
 def list_storage_arrays() -> Dict[str, Any]:
-    return {"items": store.data["storage_arrays"]}
+    return {"items": store.get_collection("storage_arrays")}
 
 
 @app.post("/api/storage/arrays")
-def create_storage_array(payload: Dict[str, Any]) -> Dict[str, Any]:
-    array_id = store.next_id("storage_arrays")
-    payload["id"] = array_id
-    store.get_collection("storage_arrays").append(payload)
-    store.save()
+async def create_storage_array(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("storage_arrays", payload)
     return payload
 
 
 @app.get("/api/storage/volumes")
+@cache_on("storage_volumes")
 def list_storage_volumes() -> Dict[str, Any]:
-    return {"items": store.data["storage_volumes"]}
+    return {"items": store.get_collection("storage_volumes")}
 
 
 @app.post("/api/storage/volumes")
-def create_storage_volume(payload: Dict[str, Any]) -> Dict[str, Any]:
-    volume_id = store.next_id("storage_volumes")
-    payload["id"] = volume_id
-    store.get_collection("storage_volumes").append(payload)
-    store.save()
+async def create_storage_volume(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("storage_volumes", payload)
     return payload
 
 
 @app.get("/api/storage/capacity/summary")
-def storage_capacity_summary() -> Dict[str, Any]:
-    return store.dashboard_overview().get("capacitySummary", {})
+async def storage_capacity_summary() -> Dict[str, Any]:
+    return dashboard.capacity_summary()
 
 
 @app.get("/api/storage/capacity/by-project")
+@cache_on("assets", "projects")
 def storage_capacity_by_project() -> Dict[str, Any]:
-    assets = store.data["assets"]
+    assets = store.get_collection("assets")
     breakdown: Dict[int, Dict[str, Any]] = {}
     for asset in assets:
         project_id = asset.get("projectId")
@@ -540,36 +774,30 @@ def storage_capacity_by_project() -> Dict[str, Any]:
 
 
 @app.get("/api/storage-targets")
+@cache_on("storage_targets")
 def list_storage_targets(type: Optional[str] = None) -> Dict[str, Any]:
-    targets = store.data["storage_targets"]
+    targets = store.get_collection("storage_targets")
     if type:
         targets = [target for target in targets if target.get("type") == type]
     return {"items": targets}
 
 
 @app.post("/api/storage-targets")
-def create_storage_target(payload: Dict[str, Any]) -> Dict[str, Any]:
-    target_id = store.next_id("storage_targets")
-    payload["id"] = target_id
-    store.get_collection("storage_targets").append(payload)
-    store.save()
+async def create_storage_target(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("storage_targets", payload)
     return payload
 
 
 @app.patch("/api/storage-targets/{target_id}")
-def update_storage_target(target_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    target = ensure_exists("storage_targets", target_id)
-    target.update(payload)
-    store.save()
-    return target
+async def update_storage_target(target_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("storage_targets", target_id, payload)
 
 
 @app.delete("/api/storage-targets/{target_id}")
-def delete_storage_target(target_id: int) -> Dict[str, Any]:
-    deleted = store.delete_by_id("storage_targets", target_id)
+async def delete_storage_target(target_id: int) -> Dict[str, Any]:
+    deleted = await store_writer.delete_by_id("storage_targets", target_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="存储目标不存在")
-    store.save()
     return {"status": "deleted"}
 
 
@@ -580,47 +808,48 @@ def test_storage_target(target_id: int) -> Dict[str, Any]:
 
 
 @app.post("/api/netdisk/{provider}/bind")
-def bind_netdisk(provider: str, payload: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
-    session_id = f"session-{len(store.data['netdisk_sessions']) + 1}"
-    store.data["netdisk_sessions"][session_id] = {
-        "provider": provider,
-        "status": "pending",
-        "createdAt": iso_now(),
-        "account": payload.get("account"),
-    }
-    store.save()
-    return {"sessionId": session_id}
+async def bind_netdisk(provider: str, payload: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
+    def bind() -> str:
+        with store.transaction():
+            session_id = f"session-{len(store.get_document('netdisk_sessions', {})) + 1}"
+            store.put_document(
+                ("netdisk_sessions", session_id),
+                {
+                    "provider": provider,
+                    "status": "pending",
+                    "createdAt": iso_now(),
+                    "account": payload.get("account"),
+                },
+            )
+            return session_id
+
+    return {"sessionId": await store_writer.run(bind)}
 
 
 @app.get("/api/netdisk/{provider}/bind/status")
 def netdisk_bind_status(provider: str, session: str) -> Dict[str, Any]:
-    data = store.data.get("netdisk_sessions", {}).get(session)
+    data = store.get_document("netdisk_sessions", {}).get(session)
     if not data or data.get("provider") != provider:
         raise HTTPException(status_code=404, detail="会话不存在")
     return data
 
 
 @app.get("/api/users")
+@cache_on("users")
 def list_users() -> Dict[str, Any]:
-    return {"items": store.data["users"]}
+    return {"items": store.get_collection("users")}
 
 
 @app.post("/api/users")
-def create_user(payload: Dict[str, Any]) -> Dict[str, Any]:
-    user_id = store.next_id("users")
-    payload["id"] = user_id
+async def create_user(payload: Dict[str, Any]) -> Dict[str, Any]:
     payload.setdefault("status", "enabled")
-    store.get_collection("users").append(payload)
-    store.save()
+    await store_writer.insert("users", payload)
     return payload
 
 
 @app.patch("/api/users/{user_id}")
-def update_user(user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    user = ensure_exists("users", user_id)
-    user.update(payload)
-    store.save()
-    return user
+async def update_user(user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("users", user_id, payload)
 
 
 @app.post("/api/users/{user_id}/reset-password")
@@ -630,125 +859,124 @@ def reset_password(user_id: int) -> Dict[str, Any]:
 
 
 @app.get("/api/roles")
+@cache_on("roles")
 def list_roles() -> Dict[str, Any]:
-    return {"items": store.data["roles"]}
+    return {"items": store.get_collection("roles")}
 
 
 @app.post("/api/roles")
-def create_role(payload: Dict[str, Any]) -> Dict[str, Any]:
-    role_id = store.next_id("roles")
-    payload["id"] = role_id
-    store.get_collection("roles").append(payload)
-    store.save()
+async def create_role(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await store_writer.insert("roles", payload)
     return payload
 
 
 @app.patch("/api/roles/{role_id}")
-def update_role(role_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    role = ensure_exists("roles", role_id)
-    role.update(payload)
-    store.save()
-    return role
+async def update_role(role_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("roles", role_id, payload)
 
 
 @app.delete("/api/roles/{role_id}")
-def delete_role(role_id: int) -> Dict[str, Any]:
-    deleted = store.delete_by_id("roles", role_id)
+async def delete_role(role_id: int) -> Dict[str, Any]:
+    deleted = await store_writer.delete_by_id("roles", role_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="角色不存在")
-    store.save()
     return {"status": "deleted"}
 
 
 @app.get("/api/permissions")
+@cache_on("permissions")
 def list_permissions() -> Dict[str, Any]:
-    return {"items": store.data["permissions"]}
+    return {"items": store.get_document("permissions", [])}
 
 
 @app.get("/api/audit/logs")
-def audit_logs(user: Optional[str] = None) -> Dict[str, Any]:
-    logs = store.data["audit_logs"]
-    if user:
-        logs = [log for log in logs if log.get("user") == user]
-    return {"items": logs}
+def audit_logs(
+    user: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    return list_page("audit_logs", limit, cursor, fields, {"user": user or None})
 
 
 @app.get("/api/system/logs")
-def system_logs(level: Optional[str] = None) -> Dict[str, Any]:
-    logs = store.data["system_logs"]
-    if level:
-        logs = [log for log in logs if log.get("level") == level]
-    return {"items": logs}
+def system_logs(
+    level: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    return list_page("system_logs", limit, cursor, fields, {"level": level or None})
 
 
 @app.get("/api/alerts")
-def list_alerts(status: Optional[str] = None) -> Dict[str, Any]:
-    alerts = store.data["alerts"]
-    if status:
-        alerts = [alert for alert in alerts if alert.get("status") == status]
-    return {"items": alerts}
+def list_alerts(
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Dict[str, Any]:
+    return list_page("alerts", limit, cursor, fields, {"status": status or None})
 
 
 @app.patch("/api/alerts/{alert_id}")
-def update_alert(alert_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-    alert = ensure_exists("alerts", alert_id)
-    alert.update(payload)
-    store.save()
-    return alert
+async def update_alert(alert_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await update_existing("alerts", alert_id, payload)
 
 
 @app.get("/api/alerts/settings")
+@cache_on("alert_settings")
 def get_alert_settings() -> Dict[str, Any]:
-    return store.data["alert_settings"]
+    return store.get_document("alert_settings", {})
 
 
 @app.post("/api/alerts/settings")
-def update_alert_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
-    store.data["alert_settings"].update(payload)
-    store.save()
-    return store.data["alert_settings"]
+async def update_alert_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await store_writer.merge_document(("alert_settings",), payload)
 
 
 @app.get("/api/settings/base")
+@cache_on("settings")
 def get_base_settings() -> Dict[str, Any]:
-    return store.data["settings"].get("base", {})
+    return store.get_document("settings", {}).get("base", {})
 
 
 @app.post("/api/settings/base")
-def update_base_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
-    store.data["settings"]["base"].update(payload)
-    store.save()
-    return store.data["settings"]["base"]
+async def update_base_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await store_writer.merge_document(("settings", "base"), payload)
 
 
 @app.get("/api/settings/network")
+@cache_on("settings")
 def get_network_settings() -> Dict[str, Any]:
-    return store.data["settings"].get("network", {})
+    return store.get_document("settings", {}).get("network", {})
 
 
 @app.post("/api/settings/network")
-def update_network_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
-    store.data["settings"]["network"].update(payload)
-    store.save()
-    return store.data["settings"]["network"]
+async def update_network_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await store_writer.merge_document(("settings", "network"), payload)
 
 
 @app.get("/api/settings/backup")
+@cache_on("settings")
 def list_backups() -> Dict[str, Any]:
-    return {"items": store.data["settings"].get("backup_history", [])}
+    return {"items": store.get_document("settings", {}).get("backup_history", [])}
 
 
 @app.post("/api/settings/restore")
-def restore_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
-    entry = {
-        "id": len(store.data["settings"].get("backup_history", [])) + 1,
-        "file": payload.get("file", "uploaded-config.json"),
-        "createdAt": iso_now(),
-        "downloadUrl": payload.get("file", "uploaded-config.json"),
-    }
-    store.data["settings"].setdefault("backup_history", []).append(entry)
-    store.save()
-    return entry
+async def restore_settings(payload: Dict[str, Any]) -> Dict[str, Any]:
+    def append() -> Dict[str, Any]:
+        with store.transaction():
+            entry = {
+                "id": len(store.get_document("settings", {}).get("backup_history", [])) + 1,
+                "file": payload.get("file", "uploaded-config.json"),
+                "createdAt": iso_now(),
+                "downloadUrl": payload.get("file", "uploaded-config.json"),
+            }
+            store.append_document(("settings", "backup_history"), entry)
+            return entry
+
+    return await store_writer.run(append)
 
 
 # -------------------------- Frontend delivery --------------------------
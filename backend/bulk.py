@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+BATCH_ACTIONS = ("move", "delete", "tag")
+
+Updates = List[Tuple[int, Dict[str, Any]]]
+
+
+def unique_ids(ids: Sequence[Any]) -> List[Any]:
+    return list(dict.fromkeys(ids))
+
+
+def plan_batch(
+    action: str, ids: Sequence[int], assets: Dict[int, Dict[str, Any]], payload: Dict[str, Any]
+) -> Tuple[Updates, List[int], List[Dict[str, Any]]]:
+    # Turns one batch request into set operations: the updates and deletes to
+    # write in a single store call, plus one outcome per requested id.
+    updates: Updates = []
+    deletes: List[int] = []
+    outcomes: List[Dict[str, Any]] = []
+    target = payload.get("targetFolderId")
+    tags = payload.get("tags", [])
+    for asset_id in ids:
+        asset = assets.get(asset_id)
+        if asset is None:
+            outcomes.append({"id": asset_id, "status": "not_found"})
+            continue
+        status = "unchanged"
+        if action == "delete":
+            deletes.append(asset_id)
+            status = "deleted"
+        elif action == "move":
+            if target is not None and asset.get("folderId") != target:
+                updates.append((asset_id, {"folderId": target}))
+                status = "moved"
+        elif action == "tag":
+            current = asset.get("tags", [])
+            added = [tag for tag in unique_ids(tags) if tag not in current]
+            if added:
+                updates.append((asset_id, {"tags": [*current, *added]}))
+                status = "tagged"
+        outcomes.append({"id": asset_id, "status": status})
+    return updates, deletes, outcomes
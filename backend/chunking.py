@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Set, Tuple
+
+from .serialization import dumps, loads
+
+CHUNK_MIN = 256 * 1024
+CHUNK_AVG = 1024 * 1024
+CHUNK_MAX = 4 * 1024 * 1024
+READ_SIZE = 8 * 1024 * 1024
+# Boundaries are only considered right after this byte, and accepted when the
+# hash of the preceding WINDOW bytes matches the mask. The decision depends on
+# local content only, so an insert or trim shifts boundaries along with the
+# data instead of changing every later chunk, as with a rolling hash; finding
+# anchors with bytes.find keeps Python-level work to one step per ~256 bytes.
+ANCHOR = b"\xa7"
+ANCHOR_SPACING = 256
+WINDOW = 48
+CHUNK_DIR = ".chunks"
+MANIFEST_DIR = ".manifests"
+
+
+class Chunker:
+    def __init__(self, min_size: int = CHUNK_MIN, avg_size: int = CHUNK_AVG, max_size: int = CHUNK_MAX) -> None:
+        if not 0 < min_size <= avg_size <= max_size:
+            raise ValueError("chunk sizes must satisfy 0 < min <= avg <= max")
+        self.min_size = min_size
+        self.max_size = max_size
+        bits = int(math.log2(max(avg_size - min_size, ANCHOR_SPACING) / ANCHOR_SPACING))
+        self.mask = (1 << bits) - 1
+
+    def cut(self, data: bytes, start: int, end: int) -> int:
+        # First boundary in data[start:end]; end when none is found.
+        position = start + max(self.min_size, WINDOW) - 1
+        while position < end:
+            anchor = data.find(ANCHOR, position, end)
+            if anchor < 0:
+                break
+            position = anchor + 1
+            if not zlib.crc32(data[position - WINDOW : position]) & self.mask:
+                return position
+        return end
+
+    def chunks(self, handle: BinaryIO) -> Iterator[bytes]:
+        buffer = b""
+        offset = 0
+        eof = False
+        while True:
+            if not eof and len(buffer) - offset < self.max_size:
+                block = handle.read(READ_SIZE)
+                if block:
+                    buffer = buffer[offset:] + block
+                    offset = 0
+                    continue
+                eof = True
+            if offset >= len(buffer):
+                return
+            end = min(len(buffer), offset + self.max_size)
+            cut = self.cut(buffer, offset, end)
+            yield buffer[offset:cut]
+            offset = cut
+
+
+class ChunkTarget:
+    # Content-addressed chunks plus one manifest per file, stored under a
+    # target root (a local directory standing in for an object store). The
+    # set of chunks the target holds is kept in a local append-only index so
+    # uploads never ask the target which chunks it already has.
+
+    def __init__(self, root: Path, index_path: Path, chunker: Optional[Chunker] = None) -> None:
+        self.root = root
+        self.index_path = index_path
+        self.chunker = chunker or Chunker()
+        self._lock = threading.Lock()
+        self._known: Optional[Set[str]] = None
+
+    def _index(self) -> Set[str]:
+        if self._known is None:
+            if self.index_path.exists():
+                self._known = set(self.index_path.read_text(encoding="ascii").split())
+            else:
+                # No local index yet: rebuild it once from the target listing.
+                chunk_root = self.root / CHUNK_DIR
+                self._known = {path.name for path in chunk_root.glob("*/*") if path.is_file()} if chunk_root.exists() else set()
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                self.index_path.write_text("".join(f"{digest}\n" for digest in sorted(self._known)), encoding="ascii")
+        return self._known
+
+    def has(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._index()
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self.root / CHUNK_DIR / digest[:2] / digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{digest}.{threading.get_ident()}.part")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+        with self._lock:
+            known = self._index()
+            if digest not in known:
+                known.add(digest)
+                with self.index_path.open("a", encoding="ascii") as handle:
+                    handle.write(f"{digest}\n")
+
+    def manifest_path(self, relative: Path) -> Path:
+        return self.root / MANIFEST_DIR / relative.parent / f"{relative.name}.json"
+
+    def read_manifest(self, relative: Path) -> Optional[dict]:
+        path = self.manifest_path(relative)
+        return loads(path.read_bytes()) if path.exists() else None
+
+    def read_file(self, relative: Path) -> Iterator[bytes]:
+        manifest = self.read_manifest(relative)
+        if manifest is None:
+            raise FileNotFoundError(str(relative))
+        for digest, _ in manifest["chunks"]:
+            yield (self.root / CHUNK_DIR / digest[:2] / digest).read_bytes()
+
+    def upload(self, path: Path, relative: Path, mode: str) -> Optional[Tuple[int, int]]:
+        # Returns (bytes sent, bytes already on the target), or None when the
+        # manifest shows the file unchanged ("incremental" only).
+        stat = path.stat()
+        manifest = self.read_manifest(relative)
+        if mode == "incremental" and manifest is not None and manifest["size"] == stat.st_size and manifest["mtimeNs"] == stat.st_mtime_ns:
+            return None
+        chunks: List[Tuple[str, int]] = []
+        sent = reused = 0
+        with path.open("rb") as handle:
+            for data in self.chunker.chunks(handle):
+                digest = hashlib.sha256(data).hexdigest()
+                if self.has(digest):
+                    reused += len(data)
+                else:
+                    self.put(digest, data)
+                    sent += len(data)
+                chunks.append((digest, len(data)))
+        target = self.manifest_path(relative)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f"{target.name}.{threading.get_ident()}.part")
+        partial.write_bytes(dumps({"size": stat.st_size, "mtimeNs": stat.st_mtime_ns, "chunks": chunks}))
+        os.replace(partial, target)
+        return sent, reused
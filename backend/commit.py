@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+DURABILITY_MODES = ("sync", "deferred")
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    # Coalesces save requests arriving within `window` seconds (or until
+    # `max_batch` requests are waiting) into a single call to `flush`.
+    # With "sync" durability each request blocks until a flush covering it
+    # has finished; with "deferred" it returns immediately, but raises the
+    # error of the last flush for as long as flushing keeps failing.
+
+    def __init__(self, flush: Callable[[], None], window: float, max_batch: int = 0, durability: str = "sync") -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"unknown durability {durability!r}")
+        self._flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.durability = durability
+        self._cond = threading.Condition()
+        self._requested = 0
+        self._flushed = 0
+        self._first_request_at: Optional[float] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="datastore-group-commit", daemon=True)
+        self._thread.start()
+
+    def request(self) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("group committer is closed")
+            self._requested += 1
+            ticket = self._requested
+            if self._first_request_at is None:
+                self._first_request_at = time.monotonic()
+            self._cond.notify_all()
+            if self.durability == "sync":
+                self._wait_for(ticket)
+            elif self._error is not None:
+                # The write is queued and will be retried, but nothing since the
+                # failed flush is on disk yet.
+                raise self._error
+
+    def flush(self) -> None:
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+            self._first_request_at = float("-inf")
+            self._cond.notify_all()
+            self._wait_for(ticket)
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+        try:
+            self.flush()
+        finally:
+            # A failed last flush still shuts the flusher down; the error reaches the caller.
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
+
+    def _wait_for(self, ticket: int) -> None:
+        while self._flushed < ticket:
+            self._cond.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _due(self) -> bool:
+        if self._first_request_at is None:
+            return False
+        if self.max_batch and self._requested - self._flushed >= self.max_batch:
+            return True
+        return time.monotonic() - self._first_request_at >= self.window
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    if self._first_request_at is None:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(self._first_request_at + self.window - time.monotonic(), 0))
+                if self._closed and self._flushed >= self._requested:
+                    return
+                target = self._requested
+                self._first_request_at = None
+            try:
+                self._flush()
+                error = None
+            except BaseException as exc:  # surfaced to the waiting and the next requests
+                logger.exception("store flush failed")
+                error = exc
+            with self._cond:
+                self._flushed = target
+                self._error = error
+                self._cond.notify_all()
@@ -1,12 +1,41 @@
 from __future__ import annotations
 
-import json
+import bisect
+import os
+import threading
+from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .commit import GroupCommitter
+from .journal import Journal, fsync_directory
+from .locks import RWLock, lock_file
+from .serialization import dumps, loads
 
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# Snapshots are compact JSON; NAS_SNAPSHOT_PRETTY=1 indents them for reading by hand.
+SNAPSHOT_PRETTY = os.environ.get("NAS_SNAPSHOT_PRETTY", "0") == "1"
+COMPACT_BYTES = 4 * 1024 * 1024
+# Top-level lists that are plain values rather than id-keyed record collections.
+DOCUMENT_LISTS = ("permissions", "import_devices")
+# Snapshot key holding each collection's next id, so ids of deleted records are never handed out again.
+NEXT_IDS_KEY = "_next_ids"
+# Snapshot key holding the sequence number of the last journal record it contains.
+JOURNAL_SEQ_KEY = "_journal_seq"
+# Fields that get a secondary index, per collection: foreign keys, the sync
+# job status the dashboard looks failed jobs up by, and the import task an
+# asset came from, which a retried import looks up to skip finished files.
+INDEXES: Dict[str, Tuple[str, ...]] = {
+    "assets": ("projectId", "folderId", "importTaskId"),
+    "folders": ("projectId", "parentId"),
+    "project_members": ("projectId", "userId"),
+    "search_views": ("userId",),
+    "sync_tasks": ("projectId",),
+    "sync_jobs": ("taskId", "status"),
+    "tier_policies": ("projectId",),
+}
 
 
 def iso_now() -> str:
@@ -482,81 +511,653 @@ DEFAULT_DATA: Dict[str, Any] = {
 }
 
 
-class DataStore:
-    def __init__(self, path: str = "data_store.json") -> None:
-        self.path = Path(path)
-        if self.path.exists():
-            self.data = json.loads(self.path.read_text(encoding="utf-8"))
-        else:
-            self.data = deepcopy(DEFAULT_DATA)
-            self.save()
+# Called as listener(collection, old, new) after every record change; old is
+# None for inserts and new is None for deletes.
+ChangeListener = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+
+class BaseStore:
+    # True when other processes write to the same store; see refresh().
+    shared = False
+
+    def __init__(self) -> None:
+        self.committer: Optional[GroupCommitter] = None
+        self._listeners: List[ChangeListener] = []
+        # Per collection/document change counters; the epoch tells apart
+        # counters of different store instances, which all start at zero.
+        self.epoch = os.urandom(6).hex()
+        self._versions: Dict[str, int] = {}
+        self._deferring = threading.local()
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def refresh(self) -> None:
+        # Stores shared between processes catch up on other processes' changes here.
+        pass
+
+    def _bump(self, name: str) -> None:
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _notify(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        self._bump(collection)
+        for listener in self._listeners:
+            listener(collection, old, new)
+
+    def enable_group_commit(self, window: float, max_batch: int = 0, durability: str = "sync") -> None:
+        self.committer = GroupCommitter(self.flush, window, max_batch, durability)
+
+    @contextmanager
+    def deferred_saves(self) -> Iterator[None]:
+        # Saves requested on this thread inside the block are skipped; the
+        # caller saves once for everything written in it.
+        self._deferring.active = True
+        try:
+            yield
+        finally:
+            self._deferring.active = False
 
     def save(self) -> None:
-        self.path.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+        if getattr(self._deferring, "active", False):
+            return
+        if self.committer is not None:
+            self.committer.request()
+        else:
+            self.flush()
+
+    def flush(self) -> None:
+        raise NotImplementedError
+
+    def _stop_group_commit(self) -> None:
+        if self.committer is not None:
+            self.committer.close()
+            self.committer = None
+
+    # The storage interface every backend implements; code outside the
+    # stores only relies on these.
 
     def get_collection(self, name: str) -> List[Dict[str, Any]]:
-        if name not in self.data:
-            self.data[name] = []
-        return self.data[name]
+        raise NotImplementedError
+
+    def get_document(self, name: str, default: Any = None) -> Any:
+        raise NotImplementedError
 
     def next_id(self, collection: str) -> int:
-        coll = self.get_collection(collection)
-        if not coll:
-            return 1
-        return max(item.get("id", 0) for item in coll) + 1
+        raise NotImplementedError
 
     def find_by_id(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
-        return next((item for item in self.get_collection(collection) if item.get("id") == item_id), None)
+        raise NotImplementedError
+
+    def find_many(self, collection: str, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def find_by(self, collection: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def count_by(self, collection: str, field: str, value: Any) -> int:
+        raise NotImplementedError
+
+    def scan(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def count(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> int:
+        raise NotImplementedError
+
+    def insert(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def update(self, collection: str, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
 
     def delete_by_id(self, collection: str, item_id: int) -> bool:
-        coll = self.get_collection(collection)
-        initial = len(coll)
-        self.data[collection] = [item for item in coll if item.get("id") != item_id]
-        return len(self.data[collection]) != initial
+        raise NotImplementedError
+
+    def bulk_write(
+        self, collection: str, updates: Sequence[Tuple[int, Dict[str, Any]]], deletes: Sequence[int]
+    ) -> Dict[int, Optional[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def insert_many(self, collection: str, items: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def merge_document(self, path: Sequence[str], changes: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def put_document(self, path: Sequence[str], value: Any) -> Any:
+        raise NotImplementedError
+
+    def append_document(self, path: Sequence[str], value: Any) -> List[Any]:
+        raise NotImplementedError
+
+    def transaction(self) -> ContextManager[None]:
+        # Writes inside the block are atomic for other threads and are all
+        # undone if it raises.
+        raise NotImplementedError
+
+    def compact(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
 
     def touch(self) -> None:
         self.save()
 
     def dashboard_overview(self) -> Dict[str, Any]:
-        projects = self.data["projects"]
-        assets = self.data["assets"]
-        sync_jobs = self.data["sync_jobs"]
-        alerts = self.data["alerts"]
-
-        total_capacity = sum(p.get("projectCapacityGb", 0) for p in projects)
-        used_capacity = sum(int(a.get("size", 0) * 1024) for a in assets)
-        tier_breakdown: Dict[str, int] = {"hot": 0, "warm": 0, "cold": 0}
-        for asset in assets:
-            tier_breakdown[asset.get("tierLevel", "hot")] = tier_breakdown.get(asset.get("tierLevel", "hot"), 0) + int(
-                asset.get("size", 0) * 1024
-            )
-        disk_summary = {
-            "normal": sum(1 for d in self.data["disks"] if d.get("status") == "normal"),
-            "warning": sum(1 for d in self.data["disks"] if d.get("status") == "warning"),
-            "failed": sum(1 for d in self.data["disks"] if d.get("status") == "failed"),
-        }
-        sync_summary = {
-            "totalLast24h": len(sync_jobs),
-            "success": sum(1 for job in sync_jobs if job.get("status") == "success"),
-            "failed": sum(1 for job in sync_jobs if job.get("status") == "fail"),
-            "recentFailures": [job for job in sync_jobs if job.get("status") != "success"][:5],
-        }
-        alert_summary = {
-            "open": sum(1 for alert in alerts if alert.get("status") == "open"),
-            "processing": sum(1 for alert in alerts if alert.get("status") == "processing"),
-            "closed": sum(1 for alert in alerts if alert.get("status") == "closed"),
-        }
-        return {
-            "capacitySummary": {
-                "totalGb": total_capacity,
-                "usedGb": used_capacity,
-                "remainingGb": max(total_capacity - used_capacity, 0),
-                "tiers": tier_breakdown,
-            },
-            "diskSummary": disk_summary,
-            "syncSummary": sync_summary,
-            "alertSummary": alert_summary,
+        # Full recomputation; the API serves the incrementally maintained
+        # copy in backend/aggregates.py instead.
+        from .aggregates import TRACKED_COLLECTIONS, DashboardAggregates
+
+        aggregates = DashboardAggregates()
+        for collection in TRACKED_COLLECTIONS:
+            aggregates.load(collection, self.get_collection(collection))
+        return aggregates.overview()
+
+
+class DataStore(BaseStore):
+    def __init__(
+        self, path: str = "data_store.json", journal: bool = False, compact_bytes: int = COMPACT_BYTES, exclusive: bool = False
+    ) -> None:
+        super().__init__()
+        self.path = Path(path)
+        # All state lives in this process, so a second process on the same
+        # file would overwrite it; an exclusive store refuses to open then.
+        self._owner = lock_file(self.path.with_name(self.path.name + ".lock")) if exclusive else None
+        if exclusive and self._owner is None:
+            raise RuntimeError(f"{self.path} is in use by another process; run several workers with NAS_SHARED_STORE=1 and NAS_STORE_MODE=sqlite")
+        self.compact_bytes = compact_bytes
+        self.journal = Journal(self.path.with_suffix(".journal")) if journal else None
+        self._lock = RWLock()
+        self._save_lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        # Sequence number of the last journal record applied to the tables.
+        self._seq = 0
+        self._compacting = False
+        self._compactor: Optional[threading.Thread] = None
+        # Changes made inside transaction(), reverted if the block raises.
+        self._undo: List[Tuple[Any, ...]] = []
+        self._transactions = 0
+        self.tables: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._next_ids: Dict[str, int] = {}
+        # Field value -> ids holding it, kept sorted so scans can bisect to a cursor.
+        self._indexes: Dict[Tuple[str, str], Dict[Any, List[int]]] = {}
+        # Sorted ids per table for cursor scans; deleted ids are skipped and pruned lazily.
+        self._order: Dict[str, List[int]] = {}
+        if self.path.exists():
+            self._load(loads(self.path.read_bytes()))
+        else:
+            self._load(deepcopy(DEFAULT_DATA))
+            self._write_snapshot(self._dump())
+        if self.journal is not None and self.journal.has_entries():
+            for record in self.journal.replay():
+                # A crash between writing a snapshot and discarding the rotated
+                # journal leaves records behind that the snapshot already holds.
+                if "n" not in record or record["n"] > self._seq:
+                    self._replay(record)
+                    self._seq = max(self._seq, record.get("n", 0))
+            self.compact()
+
+    def _load(self, data: Dict[str, Any]) -> None:
+        next_ids = data.pop(NEXT_IDS_KEY, {})
+        self._seq = data.pop(JOURNAL_SEQ_KEY, 0)
+        self.data = data
+        for name, value in data.items():
+            if isinstance(value, list) and name not in DOCUMENT_LISTS:
+                self._create_table(name, value)
+        for name, next_id in next_ids.items():
+            self._table(name)
+            self._next_ids[name] = max(self._next_ids[name], next_id)
+
+    def _create_table(self, name: str, items: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        table = {item["id"]: item for item in items}
+        self.tables[name] = table
+        self.data[name] = table
+        self._next_ids[name] = max(table, default=0) + 1
+        self._order[name] = sorted(table)
+        for field in INDEXES.get(name, ()):
+            index: Dict[Any, List[int]] = {}
+            for item_id in self._order[name]:
+                index.setdefault(table[item_id].get(field), []).append(item_id)
+            self._indexes[(name, field)] = index
+        return table
+
+    def _index_add(self, collection: str, item: Dict[str, Any], fields: Sequence[str]) -> None:
+        for field in fields:
+            bucket = self._indexes[(collection, field)].setdefault(item.get(field), [])
+            if not bucket or item["id"] > bucket[-1]:
+                bucket.append(item["id"])
+                continue
+            position = bisect.bisect_left(bucket, item["id"])
+            if bucket[position] != item["id"]:
+                bucket.insert(position, item["id"])
+
+    def _index_remove(self, collection: str, item: Dict[str, Any], fields: Sequence[str]) -> None:
+        for field in fields:
+            index = self._indexes[(collection, field)]
+            bucket = index.get(item.get(field))
+            if bucket is None:
+                continue
+            position = bisect.bisect_left(bucket, item["id"])
+            if position < len(bucket) and bucket[position] == item["id"]:
+                del bucket[position]
+            if not bucket:
+                del index[item.get(field)]
+
+    def _table(self, name: str) -> Dict[int, Dict[str, Any]]:
+        table = self.tables.get(name)
+        if table is None:
+            table = self._create_table(name, [])
+        return table
+
+    def _dump(self) -> bytes:
+        snapshot = {name: list(value.values()) if name in self.tables else value for name, value in self.data.items()}
+        snapshot[NEXT_IDS_KEY] = dict(self._next_ids)
+        snapshot[JOURNAL_SEQ_KEY] = self._seq
+        return dumps(snapshot, pretty=SNAPSHOT_PRETTY)
+
+    def _write_snapshot(self, payload: bytes) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("wb") as handle:
+            handle.write(payload)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_directory(self.path.parent)
+
+    def flush(self) -> None:
+        if self.journal is None:
+            # Dump and write under one lock so concurrent saves land on disk in order.
+            with self._save_lock:
+                with self._lock.read():
+                    payload = self._dump()
+                self._write_snapshot(payload)
+            return
+        # The journal write happens outside the store lock so readers never
+        # wait on disk; the append lock keeps records in the order taken.
+        with self._append_lock:
+            with self._lock.write():
+                records, self._pending = self._pending, []
+            try:
+                self.journal.append(records)
+            except BaseException:
+                with self._lock.write():
+                    self._pending[:0] = records
+                raise
+            start_compaction = not self._compacting and self.journal.size() >= self.compact_bytes
+            if start_compaction:
+                self._compacting = True
+        if start_compaction:
+            self._compactor = threading.Thread(target=self._compact_in_background, name="datastore-compact", daemon=True)
+            self._compactor.start()
+
+    def compact(self) -> None:
+        if self.journal is None:
+            self.flush()
+            return
+        with self._save_lock:
+            # Rotation and dump must be atomic: "append" records are not
+            # idempotent, so nothing in the new journal may be in the snapshot.
+            with self._append_lock, self._lock.write():
+                self.journal.append(self._pending)
+                self._pending = []
+                self.journal.rotate()
+                payload = self._dump()
+            self._write_snapshot(payload)
+            self.journal.discard_rotated()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        finally:
+            self._compacting = False
+
+    def close(self) -> None:
+        self._stop_group_commit()
+        self.flush()
+        # A compaction still running would write the snapshot after the store is closed.
+        if self._compactor is not None:
+            self._compactor.join()
+        if self.journal is not None:
+            self.journal.close()
+        if self._owner is not None:
+            self._owner.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # A block that raises leaves nothing behind, as with SQLiteStore: its
+        # changes are reverted by records of their own, so the journal and
+        # listeners see the undo like any other write.
+        with self._lock.write():
+            mark = len(self._undo)
+            self._transactions += 1
+            try:
+                yield
+            except BaseException:
+                undone, self._undo[mark:] = self._undo[mark:], []
+                for entry in reversed(undone):
+                    if entry[0] == "c":
+                        self._record({"op": "restore", "c": entry[1], "id": entry[2], "v": entry[3]})
+                    else:
+                        self._record({"op": "put", "p": [entry[1]], "v": entry[2]})
+                raise
+            finally:
+                self._transactions -= 1
+                if not self._transactions:
+                    self._undo.clear()
+
+    def _remember(self, record: Dict[str, Any], changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        if not self._transactions:
+            return
+        if "p" in record:
+            self._undo.append(("p", record["p"][0], deepcopy(self.data.get(record["p"][0]))))
+            return
+        for old, new in changes:
+            item = old if old is not None else new
+            if item is not None:
+                self._undo.append(("c", record["c"], item["id"], old))
+
+    def _record(self, record: Dict[str, Any]) -> Any:
+        with self._lock.write():
+            if "p" in record:
+                self._remember(record, [])
+            if record["op"] == "bulk":
+                changes = self._apply(record)
+                self._remember(record, changes)
+                self._log(record)
+                for old, new in changes:
+                    self._notify(record["c"], old, new)
+                return changes
+            if "c" in record:
+                item_id = record["v"]["id"] if record["op"] == "insert" else record["id"]
+                old = self.tables.get(record["c"], {}).get(item_id)
+            result = self._apply(record)
+            self._log(record)
+            if "c" in record and (old is not None or result):
+                new = self.tables[record["c"]].get(item_id)
+                self._remember(record, [(old, new)])
+                self._notify(record["c"], old, new)
+            elif "p" in record:
+                self._bump(record["p"][0])
+        return result
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        if self.journal is not None:
+            self._seq += 1
+            record["n"] = self._seq
+            self._pending.append(record)
+
+    def _apply(self, record: Dict[str, Any]) -> Any:
+        op = record["op"]
+        if op == "insert":
+            return self._insert_item(record["c"], record["v"])
+        if op == "update":
+            item = self.tables.get(record["c"], {}).get(record["id"])
+            if item is not None:
+                item = self._update_item(record["c"], item, record["v"])
+            return item
+        if op == "delete":
+            item = self._delete_item(record["c"], record["id"])
+            self._prune_order(record["c"])
+            return item is not None
+        if op == "restore":
+            # Puts a record back exactly as it was; a None value deletes it.
+            item = self._table(record["c"]).get(record["id"])
+            if record["v"] is None:
+                self._delete_item(record["c"], record["id"])
+                self._prune_order(record["c"])
+                return None
+            if item is None:
+                return self._insert_item(record["c"], record["v"])
+            fields = INDEXES.get(record["c"], ())
+            self._index_remove(record["c"], item, fields)
+            self.tables[record["c"]][record["id"]] = record["v"]
+            self._index_add(record["c"], record["v"], fields)
+            return record["v"]
+        if op == "bulk":
+            # Many inserts, updates and deletes of one collection as a single
+            # record; returns (old, new) pairs for the records that changed.
+            table = self._table(record["c"])
+            changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = []
+            for item in record.get("i", ()):
+                existing = table.get(item["id"])
+                if existing is None:
+                    changes.append((None, self._insert_item(record["c"], item)))
+                else:
+                    # Replayed over a snapshot that already holds it.
+                    changes.append((existing, self._update_item(record["c"], existing, item)))
+            for item_id, values in record["u"]:
+                item = table.get(item_id)
+                if item is not None:
+                    changes.append((item, self._update_item(record["c"], item, values)))
+            for item_id in record["d"]:
+                item = self._delete_item(record["c"], item_id)
+                if item is not None:
+                    changes.append((item, None))
+            self._prune_order(record["c"])
+            return changes
+        parent = self._resolve(record["p"][:-1])
+        key = record["p"][-1]
+        if op == "merge":
+            parent[key] = {**parent.get(key, {}), **record["v"]}
+        elif op == "put":
+            parent[key] = record["v"]
+        elif op == "append":
+            parent[key] = [*parent.get(key, []), record["v"]]
+        else:
+            raise ValueError(f"unknown journal op {op!r}")
+        return parent[key]
+
+    def _insert_item(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        self._table(collection)[item["id"]] = item
+        order = self._order[collection]
+        if not order or item["id"] > order[-1]:
+            order.append(item["id"])
+        else:
+            # A restored record may still have its id in the not yet pruned order.
+            position = bisect.bisect_left(order, item["id"])
+            if order[position] != item["id"]:
+                order.insert(position, item["id"])
+        self._next_ids[collection] = max(self._next_ids[collection], item["id"] + 1)
+        self._index_add(collection, item, INDEXES.get(collection, ()))
+        return item
+
+    def _update_item(self, collection: str, item: Dict[str, Any], values: Dict[str, Any]) -> Dict[str, Any]:
+        moved = [field for field in INDEXES.get(collection, ()) if field in values and values[field] != item.get(field)]
+        self._index_remove(collection, item, moved)
+        # Copy-on-write: records handed out to readers are never mutated.
+        updated = {**item, **values}
+        self.tables[collection][item["id"]] = updated
+        self._index_add(collection, updated, moved)
+        return updated
+
+    def _delete_item(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
+        item = self._table(collection).pop(item_id, None)
+        if item is not None:
+            self._index_remove(collection, item, INDEXES.get(collection, ()))
+        return item
+
+    def _prune_order(self, collection: str) -> None:
+        order = self._order[collection]
+        table = self.tables[collection]
+        if len(order) > 2 * len(table) + 64:
+            self._order[collection] = [item_id for item_id in order if item_id in table]
+
+    def _replay(self, record: Dict[str, Any]) -> None:
+        # Journals written before records carried sequence numbers may repeat
+        # what the snapshot holds, so inserts become upserts there.
+        if record["op"] == "insert" and record["v"]["id"] in self.tables.get(record["c"], {}):
+            record = {"op": "update", "c": record["c"], "id": record["v"]["id"], "v": record["v"]}
+        self._apply(record)
+
+    def _resolve(self, path: Sequence[str]) -> Dict[str, Any]:
+        node = self.data
+        for key in path:
+            node = node.setdefault(key, {})
+        return node
+
+    def get_collection(self, name: str) -> List[Dict[str, Any]]:
+        with self._lock.read():
+            return list(self.tables.get(name, {}).values())
+
+    def get_document(self, name: str, default: Any = None) -> Any:
+        with self._lock.read():
+            return self.data.get(name, default)
+
+    def next_id(self, collection: str) -> int:
+        with self._lock.read():
+            return self._next_ids.get(collection, 1)
+
+    def find_by_id(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock.read():
+            return self.tables.get(collection, {}).get(item_id)
+
+    def find_many(self, collection: str, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        with self._lock.read():
+            table = self.tables.get(collection, {})
+            return {item_id: table[item_id] for item_id in ids if item_id in table}
+
+    def find_by(self, collection: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        with self._lock.read():
+            table = self.tables.get(collection, {})
+            index = self._indexes.get((collection, field))
+            if index is None:
+                return [item for item in table.values() if item.get(field) == value]
+            return [table[item_id] for item_id in index.get(value, ())]
+
+    def count_by(self, collection: str, field: str, value: Any) -> int:
+        with self._lock.read():
+            index = self._indexes.get((collection, field))
+            if index is None:
+                return len(self.find_by(collection, field, value))
+            return len(index.get(value, ()))
+
+    def scan(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        filters = filters or {}
+        with self._lock.read():
+            table = self.tables.get(collection, {})
+            indexed = next((field for field in filters if (collection, field) in self._indexes), None)
+            if indexed is not None:
+                ids: Sequence[int] = self._indexes[(collection, indexed)].get(filters[indexed], ())
+            else:
+                ids = self._order.get(collection, [])
+            start = bisect.bisect_right(ids, after) if after is not None else 0
+            result: List[Dict[str, Any]] = []
+            for position in range(start, len(ids)):
+                item = table.get(ids[position])
+                if item is None or any(item.get(field) != value for field, value in filters.items()):
+                    continue
+                if where is not None and not where(item):
+                    continue
+                result.append(item)
+                if limit is not None and len(result) >= limit:
+                    break
+            return result
+
+    def count(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> int:
+        if not filters and where is None:
+            with self._lock.read():
+                return len(self.tables.get(collection, {}))
+        return len(self.scan(collection, filters, where))
+
+    def insert(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock.write():
+            item["id"] = self.next_id(collection)
+            return self._record({"op": "insert", "c": collection, "v": item})
+
+    def update(self, collection: str, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # The primary key is immutable, otherwise the id index would go stale.
+        changes = {key: value for key, value in changes.items() if key != "id"}
+        return self._record({"op": "update", "c": collection, "id": item_id, "v": changes})
+
+    def delete_by_id(self, collection: str, item_id: int) -> bool:
+        return self._record({"op": "delete", "c": collection, "id": item_id})
+
+    def bulk_write(
+        self, collection: str, updates: Sequence[Tuple[int, Dict[str, Any]]], deletes: Sequence[int]
+    ) -> Dict[int, Optional[Dict[str, Any]]]:
+        # One persistence record for the whole set; maps each changed id to its new record (None if deleted).
+        record = {
+            "op": "bulk",
+            "c": collection,
+            "u": [[item_id, {key: value for key, value in changes.items() if key != "id"}] for item_id, changes in updates],
+            "d": list(deletes),
         }
+        return {old["id"]: new for old, new in self._record(record)}
+
+    def insert_many(self, collection: str, items: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Assigns consecutive ids and persists the batch as one record.
+        if not items:
+            return []
+        with self._lock.write():
+            first_id = self.next_id(collection)
+            for offset, item in enumerate(items):
+                item["id"] = first_id + offset
+            self._record({"op": "bulk", "c": collection, "i": list(items), "u": [], "d": []})
+        return list(items)
+
+    def merge_document(self, path: Sequence[str], changes: Dict[str, Any]) -> Dict[str, Any]:
+        return self._record({"op": "merge", "p": list(path), "v": changes})
+
+    def put_document(self, path: Sequence[str], value: Any) -> Any:
+        return self._record({"op": "put", "p": list(path), "v": value})
+
+    def append_document(self, path: Sequence[str], value: Any) -> List[Any]:
+        return self._record({"op": "append", "p": list(path), "v": value})
+
+
+STORE_MODE = os.environ.get("NAS_STORE_MODE", "json")
+STORE_PATH = os.environ.get("NAS_STORE_PATH", "data_store.db" if STORE_MODE == "sqlite" else "data_store.json")
+# Group commit: saves within the window share one disk write; a batch of N queued saves flushes early.
+COMMIT_WINDOW_MS = int(os.environ.get("NAS_COMMIT_WINDOW_MS", "0"))
+COMMIT_BATCH = int(os.environ.get("NAS_COMMIT_BATCH", "0"))
+DURABILITY = os.environ.get("NAS_DURABILITY", "sync")
+# Several worker processes (uvicorn --workers N) on one SQLite database.
+SHARED_STORE = os.environ.get("NAS_SHARED_STORE", "0") == "1"
+
+
+def create_store(mode: str = STORE_MODE, path: str = STORE_PATH) -> BaseStore:
+    selected: BaseStore
+    if SHARED_STORE and mode != "sqlite":
+        raise ValueError("NAS_SHARED_STORE=1 requires NAS_STORE_MODE=sqlite")
+    if mode == "sqlite":
+        from .sqlite_store import SQLiteStore
+
+        selected = SQLiteStore(path, seed_path="data_store.json", shared=SHARED_STORE, exclusive=not SHARED_STORE)
+    elif mode in ("json", "journal"):
+        selected = DataStore(path, journal=mode == "journal", exclusive=True)
+    else:
+        raise ValueError(f"unknown NAS_STORE_MODE {mode!r}")
+    if COMMIT_WINDOW_MS > 0:
+        selected.enable_group_commit(COMMIT_WINDOW_MS / 1000, COMMIT_BATCH, DURABILITY)
+    return selected
 
 
-store = DataStore()
+store = create_store()
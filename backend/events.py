@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .datastore import BaseStore, store
+from .serialization import dumps
+
+# Collections clients may follow; records of long-running work.
+EVENT_COLLECTIONS = ("import_tasks", "sync_jobs", "sync_tasks", "restore_tasks", "alerts")
+# Distinct records buffered per subscriber before it is told to resync.
+EVENT_BUFFER = int(os.environ.get("NAS_EVENT_BUFFER", "256"))
+MAX_SUBSCRIBERS = int(os.environ.get("NAS_EVENT_SUBSCRIBERS", "256"))
+HEARTBEAT_SECONDS = 15.0
+
+Topics = Dict[str, Optional[Set[int]]]
+
+
+def parse_topics(text: str) -> Topics:
+    # "sync_jobs:12,import_tasks:3,restore_tasks" -> {collection: ids or None for all}
+    topics: Topics = {}
+    for part in filter(None, (piece.strip() for piece in text.split(","))):
+        collection, _, item_id = part.partition(":")
+        if collection not in EVENT_COLLECTIONS:
+            raise ValueError(f"cannot subscribe to {collection!r}")
+        if not item_id:
+            topics[collection] = None
+        elif collection not in topics or topics[collection] is not None:
+            topics.setdefault(collection, set()).add(int(item_id))  # type: ignore[union-attr]
+    if not topics:
+        raise ValueError("no topics")
+    return topics
+
+
+class Subscriber:
+    # Pending events keyed by record: a newer event for a record already
+    # waiting replaces it, so a slow client gets the latest state of each
+    # record instead of every intermediate progress update. Past `limit`
+    # distinct records the buffer is dropped and the client is told to resync.
+
+    def __init__(self, topics: Topics, loop: asyncio.AbstractEventLoop, limit: int = EVENT_BUFFER) -> None:
+        self.topics = topics
+        self.limit = limit
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._buffer: OrderedDict[Tuple[str, int], Dict[str, Any]] = OrderedDict()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def matches(self, collection: str, item_id: int) -> bool:
+        ids = self.topics.get(collection, set())
+        return ids is None or item_id in ids
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        key = (event["collection"], event["id"])
+        with self._lock:
+            if key in self._buffer:
+                del self._buffer[key]
+            elif len(self._buffer) >= self.limit:
+                self._buffer.clear()
+                self._overflowed = True
+            self._buffer[key] = event
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # the event loop is gone; the stream is closing
+            pass
+
+    def drain(self) -> Tuple[List[Dict[str, Any]], bool]:
+        with self._lock:
+            events = list(self._buffer.values())
+            overflowed = self._overflowed
+            self._buffer.clear()
+            self._overflowed = False
+        return events, overflowed
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._ready.clear()
+
+
+class EventBus:
+    # Turns store change notifications into events for the subscribers of
+    # that collection. Runs inside the writer's store lock, so it only hands
+    # the record to each matching subscriber; encoding happens in the stream.
+
+    def __init__(self, source: BaseStore, max_subscribers: int = MAX_SUBSCRIBERS) -> None:
+        self._source = source
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._count = 0
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        subscribers = self._subscribers.get(collection)
+        if not subscribers:
+            return
+        # Subscriber sets are replaced, never mutated, so no lock is needed to read one.
+        item_id = (new or old or {}).get("id")
+        targets = [subscriber for subscriber in subscribers if subscriber.matches(collection, item_id)]
+        if not targets:
+            return
+        event = {
+            "collection": collection,
+            "id": item_id,
+            "op": "insert" if old is None else "delete" if new is None else "update",
+            "record": new,
+            "version": self._source.version(collection),
+        }
+        for subscriber in targets:
+            subscriber.offer(event)
+
+    def subscribe(self, topics: Topics, loop: asyncio.AbstractEventLoop) -> Subscriber:
+        subscriber = Subscriber(topics, loop)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise OverflowError("too many subscribers")
+            self._count += 1
+            for collection in topics:
+                self._subscribers[collection] = {*self._subscribers.get(collection, ()), subscriber}
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        # Called by both the stream and its response; the first call frees the slot.
+        with self._lock:
+            if subscriber.closed:
+                return
+            subscriber.closed = True
+            self._count -= 1
+            for collection in subscriber.topics:
+                remaining = self._subscribers.get(collection, set()) - {subscriber}
+                if remaining:
+                    self._subscribers[collection] = remaining
+                else:
+                    self._subscribers.pop(collection, None)
+
+    def snapshot(self, subscriber: Subscriber) -> List[Dict[str, Any]]:
+        # Current state of the records a client subscribed to by id.
+        events = []
+        for collection, ids in subscriber.topics.items():
+            for item_id, record in sorted(self._source.find_many(collection, ids or ()).items()):
+                events.append({"collection": collection, "id": item_id, "op": "snapshot", "record": record, "version": self._source.version(collection)})
+        return events
+
+
+def sse_message(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode("utf-8") + b"data: " + dumps(data) + b"\n\n"
+
+
+async def sse_stream(
+    bus: EventBus, subscriber: Subscriber, is_disconnected: Callable[[], Awaitable[bool]], heartbeat: float = HEARTBEAT_SECONDS
+) -> AsyncIterator[bytes]:
+    sequence = 0
+    try:
+        for event in bus.snapshot(subscriber):
+            sequence += 1
+            yield sse_message(event["collection"], event, sequence)
+        while True:
+            await subscriber.wait(heartbeat)
+            if await is_disconnected():
+                return
+            events, overflowed = subscriber.drain()
+            if overflowed:
+                # Events were dropped: the client should refetch what it shows.
+                yield sse_message("resync", {"topics": sorted(subscriber.topics)})
+            elif not events:
+                yield b": ping\n\n"
+            for event in events:
+                sequence += 1
+                yield sse_message(event["collection"], event, sequence)
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+class EventStreamResponse(StreamingResponse):
+    # Frees the subscriber's slot however the response ends: the stream's own
+    # cleanup never runs if sending fails before the stream has started.
+
+    def __init__(self, bus: EventBus, subscriber: Subscriber, is_disconnected: Callable[[], Awaitable[bool]]) -> None:
+        super().__init__(
+            sse_stream(bus, subscriber, is_disconnected),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.bus = bus
+        self.subscriber = subscriber
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.bus.unsubscribe(self.subscriber)
+
+
+def build_event_bus(source: BaseStore) -> EventBus:
+    bus = EventBus(source)
+    source.add_listener(bus.on_change)
+    return bus
+
+
+event_bus = build_event_bus(store)
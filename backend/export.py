@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from .datastore import BaseStore
+from .pagination import project
+from .serialization import dumps_text
+
+EXPORT_CHUNK = 500
+STREAM_BUFFER_BYTES = 64 * 1024
+# Exportable collections and the query parameters their list routes filter on.
+EXPORT_FILTERS: Dict[str, Dict[str, Callable[[str], Any]]] = {
+    "assets": {"projectId": int, "folderId": int, "tierLevel": str, "fileType": str},
+    "audit_logs": {"user": str},
+    "sync_jobs": {"taskId": int, "status": str},
+    "system_logs": {"level": str},
+    "alerts": {"status": str},
+    "import_tasks": {"status": str},
+}
+
+
+def iter_records(source: BaseStore, collection: str, filters: Dict[str, Any], chunk: int = EXPORT_CHUNK) -> Iterator[Dict[str, Any]]:
+    # Pages through the store by id so only one chunk is held at a time.
+    after: Optional[int] = None
+    while True:
+        records = source.scan(collection, filters, after=after, limit=chunk)
+        yield from records
+        if len(records) < chunk:
+            return
+        after = records[-1]["id"]
+
+
+def buffered(lines: Iterator[str]) -> Iterator[bytes]:
+    # Groups small lines into larger writes without holding more than one buffer.
+    parts: List[str] = []
+    size = 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_BYTES:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            size = 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def ndjson_lines(records: Iterator[Dict[str, Any]], fields: Optional[Sequence[str]]) -> Iterator[str]:
+    for record in records:
+        yield dumps_text(project(record, fields)) + "\n"
+
+
+def csv_cell(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return dumps_text(value)
+    return value
+
+
+def csv_lines(records: Iterator[Dict[str, Any]], fields: Optional[Sequence[str]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer: Optional[csv.DictWriter] = None
+    columns: List[str] = list(fields) if fields else []
+    # UTF-8 BOM so spreadsheet tools detect the encoding of Chinese file names.
+    yield "\ufeff"
+    for record in records:
+        if writer is None:
+            columns = columns or list(record)
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({column: csv_cell(record.get(column)) for column in columns})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if writer is None and columns:
+        csv.writer(buffer).writerow(columns)
+        yield buffer.getvalue()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .aggregates import TIER_LEVELS
+from .datastore import BaseStore, store
+
+# Fields of an asset that contribute to the rollups.
+SIZE_FIELDS = ("projectId", "folderId", "size", "tierLevel")
+
+
+class Totals:
+    __slots__ = ("size", "count", "tiers")
+
+    def __init__(self) -> None:
+        self.size: float = 0
+        self.count = 0
+        self.tiers: Dict[str, float] = {}
+
+    def add(self, size: float, count: int, tiers: Dict[str, float], sign: int) -> None:
+        self.size += sign * size
+        self.count += sign * count
+        for tier, value in tiers.items():
+            self.tiers[tier] = self.tiers.get(tier, 0) + sign * value
+
+    def merge(self, other: Totals, sign: int) -> None:
+        self.add(other.size, other.count, other.tiers, sign)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Rounded so float drift from repeated add/remove never shows up as -0.0000001.
+        tiers = {tier: round(self.tiers.get(tier, 0), 6) for tier in TIER_LEVELS}
+        tiers.update((tier, round(value, 6)) for tier, value in self.tiers.items() if tier not in tiers and value)
+        return {"size": round(self.size, 6), "assetCount": self.count, "tiers": tiers}
+
+
+class FolderRollups:
+    # Subtree totals (size, asset count, per-tier size) for every folder plus
+    # per-project totals, maintained from asset and folder change events. An
+    # asset change walks only the ancestor chain of the folders involved; a
+    # folder move shifts its whole subtree total between two ancestor chains.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._parents: Dict[int, Optional[int]] = {}
+        self._subtrees: Dict[int, Totals] = {}
+        self._projects: Dict[Any, Totals] = {}
+
+    def _ancestors(self, folder_id: Optional[int]) -> List[int]:
+        chain: List[int] = []
+        seen = set()
+        while folder_id is not None and folder_id not in seen:
+            seen.add(folder_id)
+            chain.append(folder_id)
+            folder_id = self._parents.get(folder_id)
+        return chain
+
+    def _apply_asset(self, asset: Dict[str, Any], sign: int) -> None:
+        size = asset.get("size", 0)
+        tiers = {asset.get("tierLevel", "hot"): size}
+        self._projects.setdefault(asset.get("projectId"), Totals()).add(size, 1, tiers, sign)
+        for folder_id in self._ancestors(asset.get("folderId")):
+            self._subtrees.setdefault(folder_id, Totals()).add(size, 1, tiers, sign)
+
+    def _apply_folder(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        folder_id = (new or old or {}).get("id")
+        if new is not None and old is not None and old.get("parentId") == new.get("parentId"):
+            return
+        subtree = self._subtrees.get(folder_id)
+        if old is not None and subtree is not None:
+            for ancestor in self._ancestors(old.get("parentId")):
+                if ancestor != folder_id:
+                    self._subtrees.setdefault(ancestor, Totals()).merge(subtree, -1)
+        if new is None:
+            self._parents.pop(folder_id, None)
+            # Folders are only deleted once empty; keep totals of anything still inside.
+            if subtree is not None and not subtree.count:
+                del self._subtrees[folder_id]
+            return
+        self._parents[folder_id] = new.get("parentId")
+        if subtree is not None:
+            for ancestor in self._ancestors(new.get("parentId")):
+                if ancestor == folder_id:
+                    break
+                self._subtrees.setdefault(ancestor, Totals()).merge(subtree, 1)
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection == "folders":
+            with self._lock:
+                self._apply_folder(old, new)
+        elif collection == "assets":
+            if old is not None and new is not None and all(old.get(field) == new.get(field) for field in SIZE_FIELDS):
+                return
+            with self._lock:
+                if old is not None:
+                    self._apply_asset(old, -1)
+                if new is not None:
+                    self._apply_asset(new, 1)
+
+    def load(self, folders: Iterable[Dict[str, Any]], assets: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for folder in folders:
+                self._parents[folder["id"]] = folder.get("parentId")
+            for asset in assets:
+                self._apply_asset(asset, 1)
+
+    def folder(self, folder_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return (self._subtrees.get(folder_id) or Totals()).to_dict()
+
+    def project(self, project_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return (self._projects.get(project_id) or Totals()).to_dict()
+
+
+def build_folder_rollups(source: BaseStore) -> FolderRollups:
+    rollups = FolderRollups()
+    with source.transaction():
+        source.add_listener(rollups.on_change)
+        rollups.load(source.get_collection("folders"), source.get_collection("assets"))
+    return rollups
+
+
+folder_sizes = build_folder_rollups(store)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .datastore import BaseStore, store
+
+# parentId -> child folders, in id order.
+Adjacency = Dict[Optional[int], List[Dict[str, Any]]]
+
+
+def build_adjacency(folders: List[Dict[str, Any]]) -> Adjacency:
+    children: Adjacency = {}
+    for folder in sorted(folders, key=lambda item: item["id"]):
+        children.setdefault(folder.get("parentId"), []).append(folder)
+    return children
+
+
+class FolderTreeCache:
+    # Per-project adjacency maps built in one pass over the project's folders
+    # and dropped whenever a folder of that project changes. Stored records are
+    # only referenced, never modified; tree nodes are fresh dicts.
+
+    def __init__(self, source: BaseStore) -> None:
+        self._source = source
+        self._lock = threading.Lock()
+        self._trees: Dict[int, Adjacency] = {}
+        self._versions: Dict[int, int] = {}
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection != "folders":
+            return
+        with self._lock:
+            for record in (old, new):
+                if record is not None:
+                    self._invalidate(record.get("projectId"))
+
+    def _invalidate(self, project_id: Optional[int]) -> None:
+        self._trees.pop(project_id, None)
+        self._versions[project_id] = self._versions.get(project_id, 0) + 1
+
+    def adjacency(self, project_id: int) -> Adjacency:
+        with self._lock:
+            cached = self._trees.get(project_id)
+            if cached is not None:
+                return cached
+            version = self._versions.get(project_id, 0)
+        children = build_adjacency(self._source.find_by("folders", "projectId", project_id))
+        with self._lock:
+            # A folder change during the build makes this copy stale; serve it once but do not cache it.
+            if self._versions.get(project_id, 0) == version:
+                self._trees[project_id] = children
+        return children
+
+    def tree(
+        self,
+        project_id: int,
+        parent_id: Optional[int] = None,
+        depth: Optional[int] = None,
+        annotate: Optional[Callable[[int], Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        children = self.adjacency(project_id)
+        roots: List[Dict[str, Any]] = []
+        stack: List[Tuple[Optional[int], List[Dict[str, Any]], int]] = [(parent_id, roots, 1)]
+        while stack:
+            folder_id, target, level = stack.pop()
+            for folder in children.get(folder_id, ()):
+                node = dict(folder)
+                has_children = folder["id"] in children
+                node["hasChildren"] = has_children
+                if annotate is not None:
+                    node.update(annotate(folder["id"]))
+                if depth is None or level < depth:
+                    node["children"] = []
+                    if has_children:
+                        stack.append((folder["id"], node["children"], level + 1))
+                target.append(node)
+        return roots
+
+
+def build_folder_tree_cache(source: BaseStore) -> FolderTreeCache:
+    cache = FolderTreeCache(source)
+    source.add_listener(cache.on_change)
+    return cache
+
+
+folder_trees = build_folder_tree_cache(store)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .datastore import BaseStore
+
+CACHE_ENTRIES = 512
+# Bodies larger than this are still answered with ETags but not kept in memory.
+CACHE_MAX_BODY = 1024 * 1024
+
+Endpoint = TypeVar("Endpoint", bound=Callable[..., Any])
+# (path, query string, versions of the collections the route reads)
+CacheKey = Tuple[str, bytes, Tuple[int, ...]]
+
+
+def cache_on(*names: str) -> Callable[[Endpoint], Endpoint]:
+    # Marks a GET route whose response depends only on the named collections
+    # or documents, so it can be revalidated and served from the cache.
+    def mark(endpoint: Endpoint) -> Endpoint:
+        endpoint.cache_names = names  # type: ignore[attr-defined]
+        return endpoint
+
+    return mark
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[CacheKey, Tuple[List[Tuple[bytes, bytes]], bytes]] = OrderedDict()
+
+    def get(self, key: CacheKey) -> Optional[Tuple[List[Tuple[bytes, bytes]], bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: CacheKey, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (headers, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    return any(candidate.strip() in (etag, "*") for candidate in header.split(","))
+
+
+class ETagMiddleware:
+    # Serves GET routes marked with cache_on: the ETag is derived from the store
+    # epoch and the versions of the route's collections, so a matching
+    # If-None-Match gets a 304 and a cached body is replayed without calling
+    # the handler or encoding JSON again.
+
+    def __init__(self, app: ASGIApp, source: BaseStore, cache: Optional[ResponseCache] = None) -> None:
+        self.app = app
+        self.source = source
+        self.cache = cache or ResponseCache()
+
+    def _cache_names(self, scope: Scope) -> Optional[Sequence[str]]:
+        router = scope.get("app").router if scope.get("app") is not None else None
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(getattr(route, "endpoint", None), "cache_names", None)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        names = self._cache_names(scope)
+        if names is None:
+            await self.app(scope, receive, send)
+            return
+        if self.source.shared:
+            # Apply other worker processes' writes before versions are compared;
+            # the check is a query, so it runs off the event loop. Other routes
+            # read the database directly and rely on the store's watcher.
+            await run_in_threadpool(self.source.refresh)
+        key: CacheKey = (scope["path"], scope["query_string"], tuple(self.source.version(name) for name in names))
+        digest = hashlib.sha1(repr((self.source.epoch, key)).encode("utf-8")).hexdigest()[:20]
+        etag = f'"{digest}"'
+        validators = [(b"etag", etag.encode("ascii")), (b"cache-control", b"no-cache")]
+        request_headers = dict(scope["headers"])
+        if etag_matches(request_headers.get(b"if-none-match", b"").decode("latin-1"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        cached = self.cache.get(key)
+        if cached is not None:
+            headers, body = cached
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message: Message) -> None:
+            nonlocal size
+            if message["type"] == "http.response.start":
+                start.update(message)
+                if message["status"] == 200:
+                    start["headers"] = [*message.get("headers", []), *validators]
+                await send(start)
+                return
+            if start.get("status") == 200 and size <= CACHE_MAX_BODY:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if not message.get("more_body", False) and size <= CACHE_MAX_BODY:
+                    self.cache.put(key, list(start["headers"]), b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, capture)
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+try:
+    import xxhash
+except ImportError:  # optional: hashlib's sha256 is the fallback
+    xxhash = None  # type: ignore[assignment]
+
+from .datastore import BaseStore, iso_now, store
+from .sync_engine import PARTIAL_SUFFIX, JobProgress, job_status
+
+# Imported media lands under IMPORT_ROOT/project-<id>/folder-<id>/<task id>-<device>/.
+IMPORT_ROOT = Path(os.environ.get("NAS_IMPORT_ROOT", "library"))
+# Files copied at once; each copy also runs its own writer thread.
+IMPORT_WORKERS = int(os.environ.get("NAS_IMPORT_WORKERS", "4"))
+IMPORT_BUFFER = int(os.environ.get("NAS_IMPORT_BUFFER_MB", "8")) * 1024 * 1024
+IMPORT_HASH = os.environ.get("NAS_IMPORT_HASH", "xxh3" if xxhash is not None else "sha256")
+# Imported assets are registered in batches of this size, or at least this often.
+REGISTER_BATCH = 200
+REGISTER_INTERVAL = 1.0
+IMPORT_COUNTERS = ("totalFiles", "successFiles", "failedFiles", "skippedFiles", "bytesCopied")
+XXHASH_ALGORITHMS = ("xxh3", "xxh64", "xxh128")
+FILE_TYPES = {
+    **dict.fromkeys((".mp4", ".mov", ".mxf", ".braw", ".r3d", ".crm", ".avi", ".mkv", ".mts"), "video"),
+    **dict.fromkeys((".jpg", ".jpeg", ".png", ".heic", ".tif", ".tiff", ".dng", ".arw", ".cr2", ".cr3", ".nef", ".raf"), "image"),
+    **dict.fromkeys((".wav", ".mp3", ".aac", ".flac", ".m4a"), "audio"),
+}
+
+
+class ChecksumError(Exception):
+    pass
+
+
+def new_hasher(algorithm: str) -> Any:
+    if algorithm in XXHASH_ALGORITHMS:
+        if xxhash is None:
+            raise ValueError(f"校验算法 {algorithm} 需要安装 xxhash")
+        return {"xxh3": xxhash.xxh3_64, "xxh64": xxhash.xxh64, "xxh128": xxhash.xxh3_128}[algorithm]()
+    return hashlib.new(algorithm)
+
+
+def file_checksum(path: Path, algorithm: str, buffer_size: int = IMPORT_BUFFER) -> str:
+    hasher = new_hasher(algorithm)
+    with path.open("rb", buffering=0) as handle:
+        for block in iter(lambda: handle.read(buffer_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def drop_cache(handle: BinaryIO) -> None:
+    # Verification should read the written copy from disk, not from the page cache.
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _drain(handle: BinaryIO, blocks: queue.Queue[Optional[bytes]], failures: List[BaseException]) -> None:
+    # Keeps consuming after a failure so the reader never blocks on a full queue.
+    while True:
+        block = blocks.get()
+        if block is None:
+            return
+        if not failures:
+            try:
+                handle.write(block)
+            except OSError as exc:
+                failures.append(exc)
+
+
+def copy_verified(source: Path, target: Path, algorithm: str, buffer_size: int = IMPORT_BUFFER) -> str:
+    # Reads and hashes on this thread while a writer thread drains a two-block
+    # queue, so reading the card overlaps writing the disk. The written copy is
+    # read back and compared before it is renamed into place.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + PARTIAL_SUFFIX)
+    hasher = new_hasher(algorithm)
+    blocks: queue.Queue[Optional[bytes]] = queue.Queue(maxsize=2)
+    failures: List[BaseException] = []
+    try:
+        with source.open("rb", buffering=0) as reader, partial.open("wb") as writer:
+            thread = threading.Thread(target=_drain, args=(writer, blocks, failures), daemon=True)
+            thread.start()
+            try:
+                while not failures:
+                    block = reader.read(buffer_size)
+                    if not block:
+                        break
+                    hasher.update(block)
+                    blocks.put(block)
+            finally:
+                blocks.put(None)
+                thread.join()
+            if failures:
+                raise failures[0]
+            writer.flush()
+            os.fsync(writer.fileno())
+            drop_cache(writer)
+        checksum = hasher.hexdigest()
+        if file_checksum(partial, algorithm, buffer_size) != checksum:
+            raise ChecksumError(f"校验失败: {source}")
+        shutil.copystat(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return checksum
+
+
+class AssetRegistrar:
+    # Collects asset records from copy workers and inserts them in batches.
+
+    def __init__(self, source: BaseStore) -> None:
+        self._source = source
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._flushed_at = time.monotonic()
+
+    def add(self, asset: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(asset)
+            if len(self._pending) < REGISTER_BATCH and time.monotonic() - self._flushed_at < REGISTER_INTERVAL:
+                return
+            self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        self._flushed_at = time.monotonic()
+        if batch:
+            self._source.insert_many("assets", batch)
+            self._source.save()
+
+
+class ImportEngine:
+    # Runs import tasks: a driver thread per task scans the device paths and
+    # feeds files to a shared copy pool, skipping files a previous run of the
+    # same task already registered, so a retry resumes where it failed.
+
+    def __init__(self, source: BaseStore, workers: int = IMPORT_WORKERS, root: Path = IMPORT_ROOT, algorithm: str = IMPORT_HASH) -> None:
+        self._source = source
+        self.workers = workers
+        self.root = root
+        self.algorithm = algorithm
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-copy")
+        self._lock = threading.Lock()
+        self._running: Dict[int, threading.Event] = {}
+        self._stopping = threading.Event()
+
+    def is_running(self, task_id: int) -> bool:
+        with self._lock:
+            return task_id in self._running
+
+    def launch(self, task_id: int) -> Optional[Dict[str, Any]]:
+        # Marks the task running and starts it; None if it is already running.
+        with self._lock:
+            if task_id in self._running or self._stopping.is_set():
+                return None
+            self._running[task_id] = threading.Event()
+        try:
+            task = self._source.update(
+                "import_tasks",
+                task_id,
+                {"status": "running", "startedAt": iso_now(), "finishedAt": None, "errors": []},
+            )
+            self._source.save()
+        except Exception:
+            self._release(task_id)
+            raise
+        threading.Thread(target=self._drive, args=(task,), name=f"import-task-{task_id}", daemon=True).start()
+        return task
+
+    def wait(self, task_id: int, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            done = self._running.get(task_id)
+        return True if done is None else done.wait(timeout)
+
+    def _release(self, task_id: int) -> None:
+        with self._lock:
+            done = self._running.pop(task_id, None)
+        if done is not None:
+            done.set()
+
+    def recover(self) -> None:
+        for task in self._source.scan("import_tasks", where=lambda task: task.get("status") == "running"):
+            self._source.update("import_tasks", task["id"], {"status": "fail", "finishedAt": iso_now(), "errors": ["服务重启，导入中断，可重试继续"]})
+        self._source.save()
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            pending = list(self._running.values())
+        deadline = time.monotonic() + timeout
+        for done in pending:
+            done.wait(max(deadline - time.monotonic(), 0))
+
+    def device_root(self, name: Optional[str]) -> Path:
+        for device in self._source.get_document("import_devices", []):
+            if device.get("name") == name and device.get("mountPath"):
+                return Path(device["mountPath"])
+        raise ValueError(f"导入设备不存在: {name}")
+
+    def scan(self, task: Dict[str, Any]) -> List[Tuple[Path, str]]:
+        # (file on the device, its path relative to the mount point); hidden
+        # files such as macOS "._" metadata are not media and are left out.
+        mount = self.device_root(task.get("sourceDevice")).resolve()
+        files: List[Tuple[Path, str]] = []
+        for source_path in task.get("sourcePaths") or ["/"]:
+            base = (mount / source_path.lstrip("/")).resolve()
+            if not base.is_relative_to(mount):
+                raise ValueError(f"导入路径超出设备范围: {source_path}")
+            if base.is_file():
+                files.append((base, base.relative_to(mount).as_posix()))
+                continue
+            if not base.is_dir():
+                raise ValueError(f"导入路径不存在: {source_path}")
+            for directory, names, file_names in os.walk(base):
+                names[:] = sorted(name for name in names if not name.startswith("."))
+                for name in sorted(file_names):
+                    if not name.startswith("."):
+                        path = Path(directory) / name
+                        files.append((path, path.relative_to(mount).as_posix()))
+        return files
+
+    def destination(self, task: Dict[str, Any]) -> Path:
+        return self.root / f"project-{task.get('targetProjectId')}" / f"folder-{task.get('targetFolderId')}" / f"{task['id']:04d}-{task.get('sourceDevice')}"
+
+    def _asset(self, task: Dict[str, Any], path: Path, relative: str, target: Path, checksum: str) -> Dict[str, Any]:
+        stat = target.stat()
+        project = self._source.find_by_id("projects", task.get("targetProjectId")) or {}
+        now = iso_now()
+        return {
+            "folderId": task.get("targetFolderId"),
+            "projectId": task.get("targetProjectId"),
+            "fileName": path.name,
+            "fileType": FILE_TYPES.get(path.suffix.lower(), "other"),
+            "size": round(stat.st_size / 1024**3, 4),
+            "shootDate": time.strftime("%Y-%m-%d", time.localtime(stat.st_mtime)),
+            "projectName": project.get("name"),
+            "tags": [],
+            "tierLevel": "hot",
+            "localPresence": "local",
+            "createdAt": now,
+            "updatedAt": now,
+            "owner": task.get("createdBy"),
+            "importTaskId": task["id"],
+            "sourcePath": relative,
+            "storagePath": str(target),
+            "checksum": f"{self.algorithm}:{checksum}",
+        }
+
+    def _import_file(self, task: Dict[str, Any], path: Path, relative: str, registrar: AssetRegistrar, progress: JobProgress) -> None:
+        target = self.destination(task) / PurePosixPath(relative)
+        try:
+            checksum = copy_verified(path, target, self.algorithm)
+            registrar.add(self._asset(task, path, relative, target, checksum))
+        except Exception as exc:  # one bad file must not stop the import
+            progress.error(f"{relative}: {exc}")
+            progress.add(failedFiles=1)
+        else:
+            progress.add(successFiles=1, bytesCopied=target.stat().st_size)
+        self._publish(task["id"], progress)
+
+    def _publish(self, task_id: int, progress: JobProgress, force: bool = False) -> None:
+        fields = progress.snapshot(force)
+        if fields is not None:
+            self._source.update("import_tasks", task_id, fields)
+            self._source.save()
+
+    def _drive(self, task: Dict[str, Any]) -> None:
+        progress = JobProgress(IMPORT_COUNTERS)
+        registrar = AssetRegistrar(self._source)
+        try:
+            new_hasher(self.algorithm)
+            files = self.scan(task)
+            imported = {asset.get("sourcePath") for asset in self._source.find_by("assets", "importTaskId", task["id"])}
+            remaining = [(path, relative) for path, relative in files if relative not in imported]
+            done = len(files) - len(remaining)
+            progress.add(totalFiles=len(files), successFiles=done, skippedFiles=done)
+            self._publish(task["id"], progress, force=True)
+            slots = threading.BoundedSemaphore(self.workers)
+
+            def release(_: Any) -> None:
+                slots.release()
+
+            for position, (path, relative) in enumerate(remaining):
+                if self._stopping.is_set():
+                    progress.error("服务关闭，导入中断，可重试继续")
+                    progress.add(failedFiles=len(remaining) - position)
+                    break
+                slots.acquire()
+                try:
+                    future = self._pool.submit(self._import_file, task, path, relative, registrar, progress)
+                except RuntimeError:
+                    slots.release()
+                    progress.add(failedFiles=len(remaining) - position)
+                    break
+                future.add_done_callback(release)
+            for _ in range(self.workers):
+                slots.acquire()
+        except Exception as exc:  # the task record must not stay "running"
+            progress.error(str(exc))
+            progress.add(failedFiles=1)
+        finally:
+            try:
+                registrar.flush()
+            finally:
+                counters = progress.counters
+                status = job_status(counters["totalFiles"], counters["successFiles"], counters["failedFiles"])
+                self._publish(task["id"], progress, force=True)
+                self._source.update("import_tasks", task["id"], {"status": status, "finishedAt": iso_now()})
+                self._source.save()
+                self._release(task["id"])
+
+
+import_engine = ImportEngine(store)
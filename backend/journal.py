@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from .serialization import dumps, loads
+
+
+def fsync_directory(path: Path) -> None:
+    # Makes a rename durable; directories cannot be opened this way on Windows.
+    if os.name != "posix":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    return dumps(record) + b"\n"
+
+
+class Journal:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.rotated_path = path.with_name(path.name + ".old")
+        self._handle: Optional[BinaryIO] = None
+
+    def _open(self) -> BinaryIO:
+        if self._handle is None:
+            self._handle = self.path.open("ab")
+        return self._handle
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        handle = self._open()
+        start = handle.tell()
+        try:
+            handle.write(b"".join(encode_record(record) for record in records))
+            handle.flush()
+            # A save has returned only once its records would survive a power loss.
+            os.fsync(handle.fileno())
+        except OSError:
+            # Cut off whatever part made it to the file: the caller retries
+            # these records, and replay stops at the first torn line.
+            self._handle = None
+            try:
+                handle.close()
+            except OSError:
+                pass
+            os.truncate(self.path, start)
+            raise
+
+    def size(self) -> int:
+        return self._open().tell()
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        for path in (self.rotated_path, self.path):
+            if not path.exists():
+                continue
+            with path.open("rb") as handle:
+                for line in handle:
+                    try:
+                        yield loads(line)
+                    except ValueError:
+                        # A crash mid-append can leave a truncated last line.
+                        break
+
+    def has_entries(self) -> bool:
+        return any(path.exists() and path.stat().st_size > 0 for path in (self.rotated_path, self.path))
+
+    def rotate(self) -> None:
+        self.close()
+        if not self.path.exists():
+            return
+        if self.rotated_path.exists():
+            # A previous compaction did not finish: keep its records in front of ours.
+            with self.rotated_path.open("ab") as target, self.path.open("rb") as source:
+                target.write(source.read())
+                target.flush()
+                os.fsync(target.fileno())
+            self.path.unlink()
+        else:
+            os.replace(self.path, self.rotated_path)
+        fsync_directory(self.path.parent)
+
+    def discard_rotated(self) -> None:
+        if self.rotated_path.exists():
+            self.rotated_path.unlink()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(item_id: int) -> str:
+    raw = json.dumps({"id": item_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"invalid cursor {cursor!r}") from None
+    if not isinstance(item_id, int):
+        raise ValueError(f"invalid cursor {cursor!r}")
+    return item_id
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def project(item: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def page_response(items: List[Dict[str, Any]], limit: Optional[int], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    # Callers fetch limit + 1 records; the extra one only signals another page.
+    has_more = limit is not None and len(items) > limit
+    if has_more:
+        items = items[:limit]
+    return {
+        "items": [project(item, fields) for item in items],
+        "nextCursor": encode_cursor(items[-1]["id"]) if has_more else None,
+    }
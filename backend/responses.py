@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import functools
+import inspect
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, request_response
+
+from .serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        try:
+            return dumps(content)
+        except TypeError:
+            # Values only FastAPI knows how to encode (models, sets, ...).
+            return dumps(jsonable_encoder(content))
+
+
+def plain_json(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Handlers return plain dicts and lists built from store records; wrapping
+    # them in a response here skips FastAPI's response-model validation and
+    # jsonable_encoder walk, leaving a single encode in FastJSONResponse.
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def run_async(*args: Any, **kwargs: Any) -> Any:
+            result = await endpoint(*args, **kwargs)
+            return FastJSONResponse(result) if isinstance(result, (dict, list)) else result
+
+        return run_async
+
+    @functools.wraps(endpoint)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        result = endpoint(*args, **kwargs)
+        return FastJSONResponse(result) if isinstance(result, (dict, list)) else result
+
+    return run
+
+
+class FastJSONRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # Parameters and OpenAPI are derived from the original endpoint (its
+        # annotations resolve in its own module); only the call is wrapped.
+        super().__init__(path, endpoint, **kwargs)
+        self.dependant.call = plain_json(endpoint)
+        self.app = request_response(self.get_route_handler())
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .datastore import BaseStore, iso_now, store
+from .sync_engine import MAX_JOB_ERRORS, PROGRESS_INTERVAL, job_status
+
+# Concurrent asset downloads; one of them only ever serves the interactive lane.
+RESTORE_WORKERS = int(os.environ.get("NAS_RESTORE_WORKERS", "3"))
+# Download budget shared by all workers, in MB/s; 0 means unlimited.
+RESTORE_BANDWIDTH_MB = float(os.environ.get("NAS_RESTORE_BANDWIDTH_MB", "200"))
+RESTORE_CHUNK = 8 * 1024 * 1024
+# Served strictly in this order.
+LANES = ("interactive", "bulk")
+BYTES_PER_GB = 1024**3
+TASK_COUNTERS = ("totalAssets", "restoredAssets", "failedAssets", "totalBytes", "restoredBytes")
+Transfer = Callable[[Dict[str, Any], int, int], None]
+
+
+def asset_bytes(asset: Dict[str, Any]) -> int:
+    return int(asset.get("size", 0) * BYTES_PER_GB)
+
+
+def fetch_nothing(asset: Dict[str, Any], offset: int, length: int) -> None:
+    # Stand-in for the cloud download of one chunk; pacing comes from the bandwidth budget.
+    return None
+
+
+class TokenBucket:
+    # Callers reserve bytes up front and sleep off any debt outside the lock,
+    # so concurrent downloads share the rate in arrival order.
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = rate
+        self._updated = clock()
+
+    def consume(self, amount: int) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            debt = -self._tokens
+        if debt > 0:
+            self._sleep(debt / self.rate)
+
+
+class FairQueue:
+    # Per lane: users in round-robin order, each with its projects in
+    # round-robin order, each with a FIFO of asset ids. One pop serves the
+    # next user, and within that user the next project.
+
+    def __init__(self) -> None:
+        self._lanes: Dict[str, OrderedDict[str, OrderedDict[Any, Deque[int]]]] = {lane: OrderedDict() for lane in LANES}
+
+    def push(self, lane: str, user: str, project_id: Any, asset_id: int) -> None:
+        projects = self._lanes[lane].setdefault(user, OrderedDict())
+        projects.setdefault(project_id, deque()).append(asset_id)
+
+    def pop(self, lanes: Iterable[str]) -> Optional[Tuple[str, int]]:
+        for lane in lanes:
+            users = self._lanes[lane]
+            if not users:
+                continue
+            user, projects = next(iter(users.items()))
+            project_id, queue = next(iter(projects.items()))
+            asset_id = queue.popleft()
+            if queue:
+                projects.move_to_end(project_id)
+            else:
+                del projects[project_id]
+            if projects:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            return lane, asset_id
+        return None
+
+
+class RestoreItem:
+    # One download per asset, shared by every task that asked for it.
+    __slots__ = ("asset_id", "size", "lane", "running", "tasks", "credited")
+
+    def __init__(self, asset_id: int, size: int, lane: str) -> None:
+        self.asset_id = asset_id
+        self.size = size
+        self.lane = lane
+        self.running = False
+        self.tasks: Set[int] = set()
+        self.credited: Dict[int, int] = {}
+
+
+class RestoreScheduler:
+    # Restores cold assets from the cloud on a fixed set of worker threads.
+    # Requests become restore_tasks records; each asset is queued once, in
+    # the interactive lane (single assets) or the bulk lane (folders), and
+    # duplicate requests join the pending download, raising it to the
+    # interactive lane if needed. Task counters are written back at most
+    # every PROGRESS_INTERVAL.
+
+    def __init__(
+        self,
+        source: BaseStore,
+        workers: int = RESTORE_WORKERS,
+        bandwidth_mb: float = RESTORE_BANDWIDTH_MB,
+        transfer: Transfer = fetch_nothing,
+    ) -> None:
+        self._source = source
+        self.workers = workers
+        self.bucket = TokenBucket(bandwidth_mb * 1024 * 1024)
+        self._transfer = transfer
+        self._cond = threading.Condition()
+        self._queue = FairQueue()
+        self._items: Dict[int, RestoreItem] = {}
+        self._tasks: Dict[int, Dict[str, Any]] = {}
+        self._dirty: Set[int] = set()
+        self._published_at = 0.0
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def folder_assets(self, folder_id: int) -> List[int]:
+        # Cloud-only assets in a folder and all of its subfolders.
+        asset_ids: List[int] = []
+        pending, seen = [folder_id], {folder_id}
+        while pending:
+            current = pending.pop()
+            children = [child["id"] for child in self._source.find_by("folders", "parentId", current) if child["id"] not in seen]
+            seen.update(children)
+            pending.extend(children)
+            asset_ids.extend(asset["id"] for asset in self._source.find_by("assets", "folderId", current) if asset.get("localPresence") == "cloud")
+        return asset_ids
+
+    def task_assets(self, task: Dict[str, Any]) -> List[int]:
+        # Tasks created before assets were recorded fall back to their folder or project.
+        if task.get("assetIds"):
+            return task["assetIds"]
+        if task.get("folderId") is not None:
+            return self.folder_assets(task["folderId"])
+        if task.get("projectId") is not None:
+            return [asset["id"] for asset in self._source.find_by("assets", "projectId", task["projectId"]) if asset.get("localPresence") == "cloud"]
+        return []
+
+    def submit(
+        self,
+        asset_ids: List[int],
+        initiator: str,
+        priority: str,
+        object_type: str,
+        project_id: Optional[int] = None,
+        folder_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        project = self._source.find_by_id("projects", project_id) if project_id is not None else None
+        task = {
+            "initiator": initiator,
+            "objectType": object_type,
+            "projectId": project_id,
+            "projectName": (project or {}).get("name"),
+            "folderId": folder_id,
+            "priority": priority,
+            "assetIds": list(dict.fromkeys(asset_ids)),
+            "status": "queued",
+            "createdAt": iso_now(),
+            "startedAt": None,
+            "finishedAt": None,
+            "failureReason": None,
+        }
+        self._source.insert("restore_tasks", task)
+        return self._enqueue(task)
+
+    def retry(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # None while the task still has downloads pending.
+        with self._cond:
+            if task["id"] in self._tasks:
+                return None
+        return self._enqueue({**task, "assetIds": self.task_assets(task)})
+
+    def recover(self) -> None:
+        # Tasks left unfinished by a previous process continue where they stopped.
+        for task in self._source.scan("restore_tasks", where=lambda task: task.get("status") in ("queued", "running")):
+            self._enqueue({**task, "assetIds": self.task_assets(task)})
+
+    def _enqueue(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        assets = self._source.find_many("assets", task.get("assetIds", []))
+        lane = task.get("priority") if task.get("priority") in LANES else "bulk"
+        user = task.get("initiator") or ""
+        with self._cond:
+            state: Dict[str, Any] = {name: 0 for name in TASK_COUNTERS}
+            state["totalAssets"] = len(task.get("assetIds", []))
+            state["failedAssets"] = state["totalAssets"] - len(assets)
+            state["errors"] = ["素材不存在"] if state["failedAssets"] else []
+            self._tasks[task["id"]] = state
+            for asset_id, asset in assets.items():
+                size = asset_bytes(asset)
+                state["totalBytes"] += size
+                if asset.get("localPresence") != "cloud":
+                    state["restoredAssets"] += 1
+                    state["restoredBytes"] += size
+                    continue
+                item = self._items.get(asset_id)
+                if item is None:
+                    item = self._items[asset_id] = RestoreItem(asset_id, size, lane)
+                    self._queue.push(lane, user, asset.get("projectId"), asset_id)
+                elif not item.running and LANES.index(lane) < LANES.index(item.lane):
+                    # The entry left in the slower lane is skipped when it surfaces.
+                    item.lane = lane
+                    self._queue.push(lane, user, asset.get("projectId"), asset_id)
+                item.tasks.add(task["id"])
+                item.credited[task["id"]] = 0
+                state["running"] = state.get("running") or item.running
+            if state["restoredAssets"] + state["failedAssets"] >= state["totalAssets"]:
+                fields = self._finish(task["id"])
+            else:
+                fields = {**self._task_fields(task["id"]), "status": "running" if state.get("running") else "queued", "finishedAt": None, "failureReason": None}
+            fields.update({"assetIds": task.get("assetIds", []), "startedAt": iso_now() if state.get("running") else None})
+            # Written under the lock so a worker's later "running" update cannot be overtaken.
+            updated = self._source.update("restore_tasks", task["id"], fields)
+            self._cond.notify_all()
+        self._source.save()
+        return updated or {**task, **fields}
+
+    def _task_fields(self, task_id: int) -> Dict[str, Any]:
+        state = self._tasks[task_id]
+        return {**{name: state[name] for name in TASK_COUNTERS}, "errors": list(state["errors"])}
+
+    def _finish(self, task_id: int) -> Dict[str, Any]:
+        state = self._tasks.pop(task_id)
+        self._dirty.discard(task_id)
+        status = job_status(state["totalAssets"], state["restoredAssets"], state["failedAssets"])
+        return {
+            **{name: state[name] for name in TASK_COUNTERS},
+            "errors": state["errors"],
+            "status": status,
+            "finishedAt": iso_now(),
+            "failureReason": state["errors"][0] if status != "success" and state["errors"] else None,
+        }
+
+    def pending(self) -> Dict[str, Any]:
+        with self._cond:
+            lanes = {lane: 0 for lane in LANES}
+            for item in self._items.values():
+                if not item.running:
+                    lanes[item.lane] += 1
+            return {"queued": lanes, "running": sum(1 for item in self._items.values() if item.running), "tasks": len(self._tasks)}
+
+    def start(self) -> None:
+        self._threads = [
+            threading.Thread(target=self._run, args=(LANES[:1] if slot == 0 and self.workers > 1 else LANES,), name=f"restore-{slot}", daemon=True)
+            for slot in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        with self._cond:
+            self._publish(force=True)
+        self._source.save()
+
+    def next_item(self, lanes: Tuple[str, ...], block: bool = True) -> Optional[RestoreItem]:
+        with self._cond:
+            while not self._closed:
+                popped = self._queue.pop(lanes)
+                if popped is None:
+                    if not block:
+                        return None
+                    self._cond.wait()
+                    continue
+                lane, asset_id = popped
+                item = self._items.get(asset_id)
+                if item is None or item.running or item.lane != lane:
+                    continue
+                item.running = True
+                started = [task_id for task_id in item.tasks if not self._tasks[task_id].get("running")]
+                with self._source.transaction():
+                    for task_id in started:
+                        self._tasks[task_id]["running"] = True
+                        self._source.update("restore_tasks", task_id, {"status": "running", "startedAt": iso_now()})
+                break
+            else:
+                return None
+        if started:
+            self._source.save()
+        return item
+
+    def restore(self, item: RestoreItem) -> None:
+        asset = self._source.find_by_id("assets", item.asset_id)
+        error: Optional[str] = None
+        try:
+            if asset is None:
+                raise LookupError("素材不存在")
+            for offset in range(0, item.size, RESTORE_CHUNK):
+                length = min(RESTORE_CHUNK, item.size - offset)
+                self.bucket.consume(length)
+                self._transfer(asset, offset, length)
+                self._credit(item, offset + length)
+            self._source.update("assets", item.asset_id, {"localPresence": "both", "lastAccessedAt": iso_now()})
+        except Exception as exc:  # a failed download only fails its tasks
+            error = f"{(asset or {}).get('fileName', item.asset_id)}: {exc}"
+        self._complete(item, error)
+
+    def _credit(self, item: RestoreItem, done: int) -> None:
+        with self._cond:
+            for task_id in item.tasks:
+                self._tasks[task_id]["restoredBytes"] += done - item.credited[task_id]
+                item.credited[task_id] = done
+                self._dirty.add(task_id)
+            published = self._publish(force=False)
+        if published:
+            self._source.save()
+
+    def _complete(self, item: RestoreItem, error: Optional[str]) -> None:
+        with self._cond:
+            del self._items[item.asset_id]
+            finished: Dict[int, Dict[str, Any]] = {}
+            for task_id in item.tasks:
+                state = self._tasks[task_id]
+                if error is None:
+                    state["restoredAssets"] += 1
+                    state["restoredBytes"] += item.size - item.credited[task_id]
+                else:
+                    state["failedAssets"] += 1
+                    state["restoredBytes"] -= item.credited[task_id]
+                    if len(state["errors"]) < MAX_JOB_ERRORS:
+                        state["errors"].append(error)
+                self._dirty.add(task_id)
+                if state["restoredAssets"] + state["failedAssets"] >= state["totalAssets"]:
+                    finished[task_id] = self._finish(task_id)
+            with self._source.transaction():
+                for task_id, fields in finished.items():
+                    self._source.update("restore_tasks", task_id, fields)
+                published = self._publish(force=bool(finished) or error is not None)
+        if published:
+            self._source.save()
+
+    def _publish(self, force: bool = False) -> bool:
+        # Caller holds the lock, so progress writes never overtake a task's
+        # final record; it saves after releasing it.
+        now = time.monotonic()
+        if not force and now - self._published_at < PROGRESS_INTERVAL:
+            return False
+        self._published_at = now
+        with self._source.transaction():
+            for task_id in self._dirty:
+                self._source.update("restore_tasks", task_id, self._task_fields(task_id))
+        self._dirty.clear()
+        return True
+
+    def _run(self, lanes: Tuple[str, ...]) -> None:
+        while True:
+            item = self.next_item(lanes)
+            if item is None:
+                return
+            self.restore(item)
+
+
+restore_scheduler = RestoreScheduler(store)
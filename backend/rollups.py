@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import calendar
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .datastore import ISO_FORMAT
+
+SUCCESS_STATUSES = ("success",)
+FAILED_STATUSES = ("partial", "fail", "failed", "error")
+RUNNING_STATUSES = ("pending", "running")
+# Per-bucket counters, in this order.
+FIELDS = ("total", "success", "failed", "running", "totalFiles", "successFiles", "failedFiles")
+# name -> (window seconds, ring used to answer it)
+WINDOWS = {"24h": (24 * 3600, "minute"), "7d": (7 * 24 * 3600, "hour"), "30d": (30 * 24 * 3600, "hour")}
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        if len(value) == 20 and value.endswith("Z"):
+            # Same format as ISO_FORMAT, parsed an order of magnitude faster than strptime.
+            return int(datetime.fromisoformat(value[:-1] + "+00:00").timestamp())
+        return calendar.timegm(time.strptime(value, ISO_FORMAT))
+    except ValueError:
+        return None
+
+
+def classify(status: Optional[str]) -> str:
+    if status in SUCCESS_STATUSES:
+        return "success"
+    if status in FAILED_STATUSES:
+        return "failed"
+    if status in RUNNING_STATUSES:
+        return "running"
+    return "other"
+
+
+class TimeRing:
+    # Fixed number of time buckets reused round-robin; each slot remembers
+    # which period it holds, so expired periods are reset on reuse.
+
+    def __init__(self, resolution: int, slots: int) -> None:
+        self.resolution = resolution
+        self.slots = slots
+        self._periods = [-1] * slots
+        self._values = [[0] * len(FIELDS) for _ in range(slots)]
+
+    def add(self, timestamp: int, deltas: Sequence[int], now: int) -> None:
+        period = timestamp // self.resolution
+        if period <= now // self.resolution - self.slots:
+            return
+        slot = period % self.slots
+        if self._periods[slot] != period:
+            if self._periods[slot] > period:
+                return
+            self._periods[slot] = period
+            self._values[slot] = [0] * len(FIELDS)
+        values = self._values[slot]
+        for position, delta in enumerate(deltas):
+            values[position] += delta
+
+    def total(self, seconds: int, now: int) -> List[int]:
+        current = now // self.resolution
+        first = current - math.ceil(seconds / self.resolution) + 1
+        result = [0] * len(FIELDS)
+        for slot, period in enumerate(self._periods):
+            if first <= period <= current:
+                for position, value in enumerate(self._values[slot]):
+                    result[position] += value
+        return result
+
+
+class SyncRollup:
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rings = {"minute": TimeRing(60, 24 * 60), "hour": TimeRing(3600, 30 * 24)}
+
+    def add(self, job: Dict[str, Any], sign: int) -> None:
+        started = parse_time(job.get("startedAt"))
+        if started is None:
+            return
+        outcome = classify(job.get("status"))
+        deltas = [
+            sign,
+            sign if outcome == "success" else 0,
+            sign if outcome == "failed" else 0,
+            sign if outcome == "running" else 0,
+            sign * (job.get("totalFiles") or 0),
+            sign * (job.get("successFiles") or 0),
+            sign * (job.get("failedFiles") or 0),
+        ]
+        now = int(self._clock())
+        with self._lock:
+            for ring in self._rings.values():
+                ring.add(started, deltas, now)
+
+    def window(self, name: str) -> Dict[str, Any]:
+        seconds, ring = WINDOWS[name]
+        with self._lock:
+            values = self._rings[ring].total(seconds, int(self._clock()))
+        stats: Dict[str, Any] = dict(zip(FIELDS, values))
+        stats["successFilesPerHour"] = round(stats["successFiles"] / (seconds / 3600), 2)
+        return stats
+
+    def windows(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.window(name) for name in WINDOWS}
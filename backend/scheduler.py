@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .datastore import ISO_FORMAT, BaseStore, store
+from .sync_engine import SyncExecutor, sync_executor
+
+# Scheduled runs executing at once; tasks due together queue for a slot.
+SCHEDULER_BUDGET = int(os.environ.get("NAS_SCHEDULER_BUDGET", "2"))
+SCHEDULER_ENABLED = os.environ.get("NAS_SCHEDULER", "1") == "1"
+# minute, hour, day of month, month, day of week (0 and 7 are Sunday)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+CHINESE_WEEKDAYS = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "日": 0, "天": 0}
+# Chinese schedule phrases and the cron expression they stand for.
+CHINESE_SCHEDULES: List[Tuple[re.Pattern[str], Callable[[re.Match[str]], str]]] = [
+    (re.compile(r"^每[日天]\s*(\d{1,2}):(\d{2})$"), lambda m: f"{int(m[2])} {int(m[1])} * * *"),
+    (re.compile(r"^每周([一二三四五六日天])\s*(\d{1,2}):(\d{2})$"), lambda m: f"{int(m[3])} {int(m[2])} * * {CHINESE_WEEKDAYS[m[1]]}"),
+    (re.compile(r"^每月(\d{1,2})[日号]\s*(\d{1,2}):(\d{2})$"), lambda m: f"{int(m[3])} {int(m[2])} {int(m[1])} * *"),
+    (re.compile(r"^每小时(?:\s*(\d{1,2})分)?$"), lambda m: f"{int(m[1] or 0)} * * * *"),
+]
+
+
+def parse_field(text: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"invalid step in {text!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            first, last = part.split("-", 1)
+            start, end = int(first), int(last)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"{text!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSpec:
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"expected 5 cron fields in {expression!r}")
+        parsed = [parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        # Both restricted: cron fires when either matches.
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Five years covers every day-of-month/weekday/leap-day combination.
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"{self.expression!r} never fires")
+
+
+def parse_schedule(text: str) -> CronSpec:
+    text = text.strip()
+    for pattern, to_cron in CHINESE_SCHEDULES:
+        match = pattern.match(text)
+        if match:
+            return CronSpec(to_cron(match))
+    return CronSpec(text)
+
+
+class SyncScheduler:
+    # Keeps one heap entry per enabled, scheduled task, ordered by next fire
+    # time; a timer thread sleeps until the earliest entry is due instead of
+    # polling tasks. Task changes bump the task's generation so superseded
+    # entries are dropped when they surface. Due tasks go to a FIFO served by
+    # `budget` runner threads, spreading a wave of simultaneous tasks.
+
+    def __init__(self, source: BaseStore, executor: SyncExecutor, budget: int = SCHEDULER_BUDGET, clock: Callable[[], float] = time.time) -> None:
+        self._source = source
+        self._executor = executor
+        self.budget = budget
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, int, int]] = []
+        self._sequence = itertools.count()
+        self._generations: Dict[int, int] = {}
+        self._specs: Dict[int, CronSpec] = {}
+        self._next_runs: Dict[int, float] = {}
+        self._ready: Deque[int] = deque()
+        self._queued: Set[int] = set()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def load(self, tasks: List[Dict[str, Any]]) -> None:
+        for task in tasks:
+            self._schedule(task["id"], task)
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection != "sync_tasks":
+            return
+        if old is not None and new is not None and all(old.get(key) == new.get(key) for key in ("schedule", "enabled")):
+            return
+        self._schedule((new or old or {})["id"], new)
+
+    def _schedule(self, task_id: int, task: Optional[Dict[str, Any]]) -> None:
+        with self._cond:
+            generation = self._generations.get(task_id, 0) + 1
+            self._generations[task_id] = generation
+            self._specs.pop(task_id, None)
+            self._next_runs.pop(task_id, None)
+            if task is None or not task.get("enabled") or not task.get("schedule"):
+                return
+            try:
+                spec = parse_schedule(task["schedule"])
+                fire_at = spec.next_after(datetime.fromtimestamp(self._clock())).timestamp()
+            except ValueError:
+                return
+            self._specs[task_id] = spec
+            self._push(task_id, generation, fire_at)
+
+    def _push(self, task_id: int, generation: int, fire_at: float) -> None:
+        self._next_runs[task_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), task_id, generation))
+        self._cond.notify_all()
+
+    def upcoming(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            runs = sorted(self._next_runs.items(), key=lambda item: item[1])
+            return [
+                {"taskId": task_id, "cron": self._specs[task_id].expression, "nextRunAt": time.strftime(ISO_FORMAT, time.gmtime(fire_at))}
+                for task_id, fire_at in runs
+            ]
+
+    def start(self) -> None:
+        self._threads = [threading.Thread(target=self._run_timer, name="sync-scheduler", daemon=True)]
+        self._threads += [threading.Thread(target=self._run_queue, name=f"sync-scheduler-run-{slot}", daemon=True) for slot in range(self.budget)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def fire_due(self) -> None:
+        # Moves every due entry to the ready queue and schedules its next run.
+        with self._cond:
+            now = self._clock()
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, task_id, generation = heapq.heappop(self._heap)
+                if self._generations.get(task_id) != generation:
+                    continue
+                if task_id not in self._queued:
+                    self._queued.add(task_id)
+                    self._ready.append(task_id)
+                # Runs missed while the process was busy or asleep are not replayed.
+                moment = datetime.fromtimestamp(max(fire_at, now))
+                self._push(task_id, generation, self._specs[task_id].next_after(moment).timestamp())
+
+    def _run_timer(self) -> None:
+        with self._cond:
+            while not self._closed:
+                self.fire_due()
+                timeout = self._heap[0][0] - self._clock() if self._heap else None
+                self._cond.wait(timeout if timeout is None else max(timeout, 0))
+
+    def next_ready(self, block: bool = True) -> Optional[int]:
+        with self._cond:
+            while not self._ready:
+                if self._closed or not block:
+                    return None
+                self._cond.wait()
+            task_id = self._ready.popleft()
+            self._queued.discard(task_id)
+            return task_id
+
+    def run_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        # Re-read the task: it may have been disabled or deleted while queued.
+        task = self._source.find_by_id("sync_tasks", task_id)
+        if task is None or not task.get("enabled"):
+            return None
+        return self._executor.launch(task, trigger="schedule")
+
+    def _run_queue(self) -> None:
+        while True:
+            task_id = self.next_ready()
+            if task_id is None:
+                return
+            job = self.run_task(task_id)
+            # Holding the slot until the job ends is what enforces the budget.
+            if job is not None:
+                self._executor.wait(job["id"])
+
+
+def build_scheduler(source: BaseStore, executor: SyncExecutor) -> SyncScheduler:
+    scheduler = SyncScheduler(source, executor)
+    with source.transaction():
+        source.add_listener(scheduler.on_change)
+        scheduler.load(source.get_collection("sync_tasks"))
+    return scheduler
+
+
+sync_scheduler = build_scheduler(store, sync_executor)
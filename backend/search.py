@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .datastore import BaseStore, store
+
+SEARCH_FIELDS = ("fileName", "tags", "camera", "location", "owner", "clientName", "projectName")
+# Runs of letters/digits or CJK ideographs; punctuation and spaces split terms.
+TERM_PATTERN = re.compile(r"[0-9a-z぀-ヿ㐀-䶿一-鿿가-힯]+")
+# Separates field values so a keyword never matches across two fields.
+FIELD_SEPARATOR = "\x00"
+
+
+def normalize(text: str) -> str:
+    return text.casefold()
+
+
+def grams(term: str) -> Set[str]:
+    # Character unigrams and bigrams: Chinese file names such as 花絮采访.wav
+    # have no word boundaries, and bigrams keep substring queries selective.
+    result = set(term)
+    result.update(term[i : i + 2] for i in range(len(term) - 1))
+    return result
+
+
+def query_grams(keyword: str) -> Set[str]:
+    result: Set[str] = set()
+    for term in TERM_PATTERN.findall(normalize(keyword)):
+        if len(term) == 1:
+            result.add(term)
+        else:
+            result.update(term[i : i + 2] for i in range(len(term) - 1))
+    return result
+
+
+def searchable_text(asset: Dict[str, Any]) -> str:
+    values: List[str] = []
+    for field in SEARCH_FIELDS:
+        value = asset.get(field)
+        if isinstance(value, list):
+            values.extend(str(item) for item in value)
+        elif value is not None:
+            values.append(str(value))
+    return FIELD_SEPARATOR.join(normalize(value) for value in values)
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[int]] = {}
+        self._texts: Dict[int, str] = {}
+        self._grams: Dict[int, Set[str]] = {}
+
+    def add(self, asset: Dict[str, Any]) -> None:
+        text = searchable_text(asset)
+        doc_grams: Set[str] = set()
+        for term in TERM_PATTERN.findall(text):
+            doc_grams |= grams(term)
+        with self._lock:
+            self._remove(asset["id"])
+            self._texts[asset["id"]] = text
+            self._grams[asset["id"]] = doc_grams
+            for gram in doc_grams:
+                self._postings.setdefault(gram, set()).add(asset["id"])
+
+    def remove(self, asset_id: int) -> None:
+        with self._lock:
+            self._remove(asset_id)
+
+    def _remove(self, asset_id: int) -> None:
+        self._texts.pop(asset_id, None)
+        for gram in self._grams.pop(asset_id, ()):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(asset_id)
+            if not posting:
+                del self._postings[gram]
+
+    def rebuild(self, assets: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._texts.clear()
+            self._grams.clear()
+        for asset in assets:
+            self.add(asset)
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection != "assets":
+            return
+        if new is None:
+            if old is not None:
+                self.remove(old["id"])
+        elif old is None or any(old.get(field) != new.get(field) for field in SEARCH_FIELDS):
+            self.add(new)
+
+    def search(self, keyword: str) -> List[int]:
+        needle = normalize(keyword).strip()
+        wanted = query_grams(needle)
+        with self._lock:
+            if not wanted:
+                candidates: Iterable[int] = list(self._texts)
+            else:
+                postings = sorted((self._postings.get(gram, set()) for gram in wanted), key=len)
+                candidates = set.intersection(*postings) if postings[0] else set()
+            # Grams only narrow the candidates; the substring check keeps exact semantics.
+            return sorted(asset_id for asset_id in candidates if needle in self._texts[asset_id])
+
+
+def build_search_index(source: BaseStore) -> SearchIndex:
+    index = SearchIndex()
+    with source.transaction():
+        source.add_listener(index.on_change)
+        index.rebuild(source.get_collection("assets"))
+    return index
+
+
+asset_index = build_search_index(store)
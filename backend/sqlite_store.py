@@ -0,0 +1,568 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .datastore import DEFAULT_DATA, DOCUMENT_LISTS, INDEXES, JOURNAL_SEQ_KEY, NEXT_IDS_KEY, BaseStore
+from .locks import held, lock_file
+from .serialization import dumps_text, loads
+
+# Shared stores: how often a process looks for other processes' changes, and
+# how long change rows are kept for processes that have not caught up yet.
+CHANGE_POLL_INTERVAL = float(os.environ.get("NAS_CHANGE_POLL_MS", "100")) / 1000
+CHANGE_RETENTION = 600.0
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    collection TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    old TEXT,
+    new TEXT,
+    at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _encode(value: Any) -> str:
+    return dumps_text(value)
+
+
+class SQLiteStore(BaseStore):
+    # A shared store is used by several processes at once. Each outermost
+    # write is its own IMMEDIATE transaction, which serializes id allocation
+    # and check-then-write sequences across processes, and logs its changes
+    # to the `changes` table. Every process, the writer included, delivers
+    # those rows to its listeners in sequence order, so in-process caches see
+    # the same history everywhere; collection versions are the sequence of
+    # the last change, which keeps ETags comparable between processes.
+    # Writers of a shared store queue for the cross-process write gate
+    # without holding the connection lock, and other threads read committed
+    # data on a connection of their own, so reads never wait for a write in
+    # another process.
+
+    def __init__(self, path: str = "data_store.db", seed_path: Optional[str] = None, shared: bool = False, exclusive: bool = False) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.shared = shared
+        self._owner = lock_file(self.path.with_name(self.path.name + ".lock")) if exclusive else None
+        if exclusive and self._owner is None:
+            raise RuntimeError(f"{self.path} is in use by another process; run several workers with NAS_SHARED_STORE=1")
+        self._lock = threading.RLock()
+        # Shared stores only: this process's writers queue here, readers use _reader.
+        self._writer = threading.RLock()
+        self._writer_thread: Optional[int] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.RLock()
+        self._pull_lock = threading.RLock()
+        self._depth = 0
+        # Changes notified inside transaction(), reverted if the block raises.
+        self._undo: List[Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = []
+        self._savepoints = 0
+        self._applied = 0
+        self._pulling = False
+        self._conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        for collection, fields in INDEXES.items():
+            for field in fields:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{collection}_{field} "
+                    f"ON records (collection, json_extract(body, '$.{field}'), id)"
+                )
+        self._conn.commit()
+        if shared:
+            self._conn.isolation_level = None
+            # Writers queue on this file lock instead of SQLite's sleep-and-retry busy handler.
+            self._write_gate = self.path.with_name(self.path.name + ".write").open("ab")
+            self._reader = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+            self._applied = self._reader.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+            self._versions = dict(self._reader.execute("SELECT collection, MAX(seq) FROM changes GROUP BY collection").fetchall())
+            self._data_version = self._reader.execute("PRAGMA data_version").fetchone()[0]
+        self.seeded = False
+        # Inside one write so concurrently starting processes seed only once.
+        with self._write():
+            if shared:
+                self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (self.epoch,))
+                self.epoch = self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+            if self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0 and not self._has_records():
+                seed_file = Path(seed_path) if seed_path else None
+                if seed_file is not None and seed_file.exists():
+                    data = loads(seed_file.read_bytes())
+                else:
+                    data = deepcopy(DEFAULT_DATA)
+                self.load(data)
+                self.seeded = True
+        self._closing = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        if shared:
+            self._watcher = threading.Thread(target=self._watch, name="sqlite-changes", daemon=True)
+            self._watcher.start()
+
+    def _has_records(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM records LIMIT 1").fetchone() is not None
+
+    def load(self, data: Dict[str, Any]) -> None:
+        data = dict(data)
+        next_ids = data.pop(NEXT_IDS_KEY, {})
+        data.pop(JOURNAL_SEQ_KEY, None)
+        with self._write():
+            for position, (name, value) in enumerate(data.items()):
+                if isinstance(value, list) and name not in DOCUMENT_LISTS:
+                    self._conn.execute("DELETE FROM records WHERE collection = ?", (name,))
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO records (collection, id, body) VALUES (?, ?, ?)",
+                        ((name, item["id"], _encode(item)) for item in value),
+                    )
+                    next_id = max((item["id"] for item in value), default=0) + 1
+                    self._set_next_id(name, next_id)
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (name, position, body) VALUES (?, ?, ?)",
+                        (name, position, _encode(value)),
+                    )
+            for name, next_id in next_ids.items():
+                self._set_next_id(name, next_id)
+            if not self.shared:
+                self._conn.commit()
+
+    def export(self) -> Dict[str, Any]:
+        with self._reading() as conn:
+            data: Dict[str, Any] = {}
+            for name, body in conn.execute("SELECT name, body FROM documents ORDER BY position").fetchall():
+                data[name] = loads(body)
+            for (name,) in conn.execute("SELECT DISTINCT collection FROM records ORDER BY collection").fetchall():
+                data[name] = self.get_collection(name)
+            return data
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._write():
+            if self.shared and self._depth == 1:
+                # The write itself is the transaction; an exception rolls it back.
+                yield
+                return
+            # A block that raises leaves nothing behind: its statements are
+            # rolled back to a savepoint and listeners see its changes undone.
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN")
+            self._conn.execute("SAVEPOINT store_tx")
+            mark = len(self._undo)
+            self._savepoints += 1
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK TO store_tx")
+                self._conn.execute("RELEASE store_tx")
+                undone, self._undo[mark:] = self._undo[mark:], []
+                for collection, old, new in reversed(undone):
+                    super()._notify(collection, new, old)
+                raise
+            finally:
+                self._savepoints -= 1
+                if not self._savepoints:
+                    self._undo.clear()
+            self._conn.execute("RELEASE store_tx")
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        if not self.shared:
+            with self._lock:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+            return
+        with self._writer:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            with held(self._write_gate), self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._depth = 1
+                self._writer_thread = threading.get_ident()
+                try:
+                    # Caught up before reading, so what is read matches what listeners have seen.
+                    self._pull()
+                    yield
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    self._depth = 0
+                    self._writer_thread = None
+            self._pull()
+
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        # The thread inside a write reads its own uncommitted changes.
+        if self._reader is None or self._writer_thread == threading.get_ident():
+            with self._lock:
+                yield self._conn
+            return
+        with self._read_lock:
+            yield self._reader
+
+    def _notify(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if not self.shared:
+            if self._savepoints:
+                self._undo.append((collection, old, new))
+            super()._notify(collection, old, new)
+            return
+        # Delivered by _pull once the transaction commits, here and in every other process.
+        self._conn.execute(
+            "INSERT INTO changes (collection, old, new, at) VALUES (?, ?, ?, ?)",
+            (collection, None if old is None else _encode(old), None if new is None else _encode(new), time.time()),
+        )
+
+    def _pull(self) -> None:
+        with self._pull_lock:
+            if self._pulling:
+                return
+            self._pulling = True
+            try:
+                while True:
+                    with self._reading() as conn:
+                        rows = conn.execute(
+                            "SELECT seq, collection, old, new FROM changes WHERE seq > ? ORDER BY seq LIMIT 500", (self._applied,)
+                        ).fetchall()
+                    if not rows:
+                        return
+                    for seq, collection, old, new in rows:
+                        self._applied = seq
+                        self._versions[collection] = seq
+                        if old is None and new is None:  # a document changed
+                            continue
+                        old_item = None if old is None else loads(old)
+                        new_item = None if new is None else loads(new)
+                        for listener in self._listeners:
+                            listener(collection, old_item, new_item)
+            finally:
+                self._pulling = False
+
+    def refresh(self) -> None:
+        if self._reader is None:
+            return
+        with self._pull_lock:
+            # data_version only moves when another connection commits.
+            with self._read_lock:
+                data_version = self._reader.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._pull()
+
+    def trim_changes(self, retention: float = CHANGE_RETENTION) -> None:
+        # The newest row of each collection stays: it carries the collection's version.
+        with self._write():
+            self._conn.execute(
+                "DELETE FROM changes WHERE at < ? AND seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY collection)",
+                (time.time() - retention,),
+            )
+
+    def _watch(self) -> None:
+        trim_at = time.monotonic()
+        while not self._closing.wait(CHANGE_POLL_INTERVAL):
+            try:
+                self.refresh()
+                if time.monotonic() >= trim_at:
+                    trim_at = time.monotonic() + 60
+                    self.trim_changes()
+            except sqlite3.Error:  # busy or closing; try again on the next tick
+                continue
+
+    def flush(self) -> None:
+        # Shared stores commit every write as it happens.
+        if self.shared:
+            return
+        with self._lock:
+            self._conn.commit()
+
+    def compact(self) -> None:
+        with self._lock:
+            if not self.shared:
+                self._conn.commit()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        self._stop_group_commit()
+        self._closing.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+        if self._reader is not None:
+            with self._read_lock:
+                self._reader.close()
+        if self._owner is not None:
+            self._owner.close()
+        if self.shared:
+            self._write_gate.close()
+
+    def _rows(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        with self._reading() as conn:
+            return [loads(body) for (body,) in conn.execute(sql, tuple(params))]
+
+    def get_collection(self, name: str) -> List[Dict[str, Any]]:
+        return self._rows("SELECT body FROM records WHERE collection = ? ORDER BY id", (name,))
+
+    def get_document(self, name: str, default: Any = None) -> Any:
+        with self._reading() as conn:
+            row = conn.execute("SELECT body FROM documents WHERE name = ?", (name,)).fetchone()
+        return loads(row[0]) if row else default
+
+    def _set_next_id(self, collection: str, next_id: int) -> None:
+        self._conn.execute(
+            "INSERT INTO sequences (collection, next_id) VALUES (?, ?) "
+            "ON CONFLICT (collection) DO UPDATE SET next_id = MAX(next_id, excluded.next_id)",
+            (collection, next_id),
+        )
+
+    def next_id(self, collection: str) -> int:
+        with self._reading() as conn:
+            row = conn.execute("SELECT next_id FROM sequences WHERE collection = ?", (collection,)).fetchone()
+            if row:
+                return row[0]
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM records WHERE collection = ?", (collection,)).fetchone()
+            return row[0]
+
+    def find_by_id(self, collection: str, item_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._rows("SELECT body FROM records WHERE collection = ? AND id = ?", (collection, item_id))
+        return rows[0] if rows else None
+
+    def _where_field(self, field: str, value: Any) -> Tuple[str, Tuple[Any, ...]]:
+        if value is None:
+            return f"json_extract(body, '$.{field}') IS NULL", ()
+        return f"json_extract(body, '$.{field}') = ?", (value,)
+
+    def find_by(self, collection: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        clause, params = self._where_field(field, value)
+        return self._rows(f"SELECT body FROM records WHERE collection = ? AND {clause} ORDER BY id", (collection, *params))
+
+    def count_by(self, collection: str, field: str, value: Any) -> int:
+        clause, params = self._where_field(field, value)
+        with self._reading() as conn:
+            row = conn.execute(f"SELECT COUNT(*) FROM records WHERE collection = ? AND {clause}", (collection, *params)).fetchone()
+        return row[0]
+
+    def scan(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        clauses = ["collection = ?", "id > ?"]
+        params: List[Any] = [collection]
+        for field, value in (filters or {}).items():
+            clause, extra = self._where_field(field, value)
+            clauses.append(clause)
+            params.extend(extra)
+        sql = f"SELECT id, body FROM records WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+        # Python-side predicates cannot be pushed down, so fetch in chunks until the page is full.
+        chunk = -1 if limit is None else (limit if where is None else max(limit * 4, 256))
+        cursor = after if after is not None else -(2**63)
+        result: List[Dict[str, Any]] = []
+        while True:
+            with self._reading() as conn:
+                rows = conn.execute(sql, (params[0], cursor, *params[1:], chunk)).fetchall()
+            for item_id, body in rows:
+                cursor = item_id
+                item = loads(body)
+                if where is not None and not where(item):
+                    continue
+                result.append(item)
+                if limit is not None and len(result) >= limit:
+                    return result
+            if chunk < 0 or len(rows) < chunk:
+                return result
+
+    def count(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> int:
+        if where is not None:
+            return len(self.scan(collection, filters, where))
+        clauses = ["collection = ?"]
+        params: List[Any] = [collection]
+        for field, value in (filters or {}).items():
+            clause, extra = self._where_field(field, value)
+            clauses.append(clause)
+            params.extend(extra)
+        with self._reading() as conn:
+            row = conn.execute(f"SELECT COUNT(*) FROM records WHERE {' AND '.join(clauses)}", params).fetchone()
+        return row[0]
+
+    def insert(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write():
+            item["id"] = self.next_id(collection)
+            self._conn.execute(
+                "INSERT INTO records (collection, id, body) VALUES (?, ?, ?)",
+                (collection, item["id"], _encode(item)),
+            )
+            self._set_next_id(collection, item["id"] + 1)
+            self._notify(collection, None, item)
+        return item
+
+    def update(self, collection: str, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._write():
+            old = self.find_by_id(collection, item_id)
+            if old is None:
+                return None
+            item = {**old, **{key: value for key, value in changes.items() if key != "id"}}
+            self._conn.execute(
+                "UPDATE records SET body = ? WHERE collection = ? AND id = ?",
+                (_encode(item), collection, item_id),
+            )
+            self._notify(collection, old, item)
+        return item
+
+    def delete_by_id(self, collection: str, item_id: int) -> bool:
+        with self._write():
+            old = self.find_by_id(collection, item_id)
+            cursor = self._conn.execute("DELETE FROM records WHERE collection = ? AND id = ?", (collection, item_id))
+            if cursor.rowcount > 0 and old is not None:
+                self._notify(collection, old, None)
+        return cursor.rowcount > 0
+
+    def find_many(self, collection: str, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        # One query for the whole id set, passed as a JSON array instead of thousands of bound parameters.
+        items = self._rows(
+            "SELECT body FROM records WHERE collection = ? AND id IN (SELECT value FROM json_each(?))",
+            (collection, _encode(list(ids))),
+        )
+        return {item["id"]: item for item in items}
+
+    def bulk_write(
+        self, collection: str, updates: Sequence[Tuple[int, Dict[str, Any]]], deletes: Sequence[int]
+    ) -> Dict[int, Optional[Dict[str, Any]]]:
+        with self._write():
+            current = self.find_many(collection, [item_id for item_id, _ in updates] + list(deletes))
+            changes: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]] = []
+            for item_id, values in updates:
+                old = current.get(item_id)
+                if old is None:
+                    continue
+                item = {**old, **{key: value for key, value in values.items() if key != "id"}}
+                current[item_id] = item
+                changes.append((old, item))
+            for item_id in deletes:
+                old = current.pop(item_id, None)
+                if old is not None:
+                    changes.append((old, None))
+            self._conn.executemany(
+                "UPDATE records SET body = ? WHERE collection = ? AND id = ?",
+                ((_encode(new), collection, new["id"]) for _, new in changes if new is not None),
+            )
+            self._conn.executemany(
+                "DELETE FROM records WHERE collection = ? AND id = ?",
+                ((collection, old["id"]) for old, new in changes if new is None),
+            )
+            for old, new in changes:
+                self._notify(collection, old, new)
+        return {old["id"]: new for old, new in changes}
+
+    def insert_many(self, collection: str, items: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not items:
+            return []
+        with self._write():
+            first_id = self.next_id(collection)
+            for offset, item in enumerate(items):
+                item["id"] = first_id + offset
+            self._conn.executemany(
+                "INSERT INTO records (collection, id, body) VALUES (?, ?, ?)",
+                ((collection, item["id"], _encode(item)) for item in items),
+            )
+            self._set_next_id(collection, first_id + len(items))
+            for item in items:
+                self._notify(collection, None, item)
+        return list(items)
+
+    def _modify_document(self, path: Sequence[str], op: str, value: Any) -> Any:
+        with self._write():
+            name = path[0]
+            root = {name: self.get_document(name, {})}
+            parent = root
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            key = path[-1]
+            if op == "merge":
+                parent.setdefault(key, {}).update(value)
+            elif op == "put":
+                parent[key] = value
+            else:
+                parent.setdefault(key, []).append(value)
+            self._conn.execute(
+                "INSERT INTO documents (name, position, body) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM documents), ?) "
+                "ON CONFLICT (name) DO UPDATE SET body = excluded.body",
+                (name, _encode(root[name])),
+            )
+            if self.shared:
+                self._notify(name, None, None)
+            else:
+                self._bump(name)
+            return parent[key]
+
+    def merge_document(self, path: Sequence[str], changes: Dict[str, Any]) -> Dict[str, Any]:
+        return self._modify_document(path, "merge", changes)
+
+    def put_document(self, path: Sequence[str], value: Any) -> Any:
+        return self._modify_document(path, "put", value)
+
+    def append_document(self, path: Sequence[str], value: Any) -> List[Any]:
+        return self._modify_document(path, "append", value)
+
+
+def migrate_json(json_path: str, db_path: str) -> SQLiteStore:
+    target = SQLiteStore(db_path, seed_path=json_path)
+    if not target.seeded:
+        target.load(loads(Path(json_path).read_bytes()))
+    return target
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m backend.sqlite_store <data_store.json> <data_store.db>")
+        sys.exit(2)
+    migrated = migrate_json(sys.argv[1], sys.argv[2])
+    counts = {name: len(items) for name, items in migrated.export().items() if isinstance(items, list)}
+    migrated.close()
+    print(dumps_text(counts))
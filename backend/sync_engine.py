@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .chunking import ChunkTarget
+from .datastore import BaseStore, iso_now, store
+
+# Logical sources and targets (e.g. "项目/品牌宣传片/素材", "团队网盘") live under
+# this directory unless a storage target names its own "localPath".
+SYNC_ROOT = Path(os.environ.get("NAS_SYNC_ROOT", "sync_data"))
+# Global number of file copies in flight across all jobs.
+SYNC_WORKERS = int(os.environ.get("NAS_SYNC_WORKERS", "4"))
+# Default copies in flight per job; a task may override it with "concurrency".
+TASK_CONCURRENCY = int(os.environ.get("NAS_SYNC_TASK_CONCURRENCY", "2"))
+PROGRESS_INTERVAL = 0.5
+HASH_CHUNK = 1024 * 1024
+MAX_JOB_ERRORS = 20
+PARTIAL_SUFFIX = ".part"
+# Storage target types uploaded as deduplicated chunks rather than file copies;
+# a target record can opt in or out with "chunked".
+CHUNKED_TARGET_TYPES = ("object", "netdisk")
+CHUNK_INDEX_DIR = ".chunk-index"
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def needs_copy(source: Path, target: Path, mode: str) -> bool:
+    # "full" always copies; "checksum" compares content hashes; anything else
+    # ("incremental") compares size and mtime, which copies preserve.
+    if mode == "full":
+        return True
+    try:
+        target_stat = target.stat()
+    except FileNotFoundError:
+        return True
+    source_stat = source.stat()
+    if source_stat.st_size != target_stat.st_size:
+        return True
+    if mode == "checksum":
+        return file_digest(source) != file_digest(target)
+    return source_stat.st_mtime_ns != target_stat.st_mtime_ns
+
+
+def copy_file(source: Path, target: Path) -> None:
+    # Copy next to the target and rename, so a target never holds half a file.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + PARTIAL_SUFFIX)
+    shutil.copy2(source, partial)
+    os.replace(partial, target)
+
+
+def iter_files(root: Path) -> Iterator[Path]:
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            if not name.endswith(PARTIAL_SUFFIX):
+                yield Path(directory) / name
+
+
+def relative_location(name: str) -> Path:
+    # Task sources and targets name places under the sync root and may not leave it.
+    path = Path(name)
+    if path.is_absolute() or ".." in path.parts:
+        raise ValueError(f"sync location {name!r} must be a relative path without '..'")
+    return path
+
+
+def job_status(total: int, success: int, failed: int) -> str:
+    if not failed:
+        return "success"
+    return "fail" if not success else "partial"
+
+
+class SyncLocations:
+    def __init__(self, source: BaseStore, root: Path = SYNC_ROOT) -> None:
+        self._source = source
+        self.root = root
+        self._lock = threading.Lock()
+        self._chunk_targets: Dict[Path, ChunkTarget] = {}
+
+    def _record(self, name: str) -> Optional[Dict[str, Any]]:
+        return next((target for target in self._source.get_collection("storage_targets") if target.get("name") == name), None)
+
+    def resolve(self, name: str) -> Path:
+        record = self._record(name)
+        if record is not None and record.get("localPath"):
+            return Path(record["localPath"])
+        return self.root / relative_location(name)
+
+    def target(self, name: str) -> Union[Path, ChunkTarget]:
+        path = self.resolve(name)
+        record = self._record(name)
+        if record is None or not record.get("chunked", record.get("type") in CHUNKED_TARGET_TYPES):
+            return path
+        # One instance per target root, so concurrent jobs share its chunk index.
+        key = path.absolute()
+        with self._lock:
+            if key not in self._chunk_targets:
+                index_name = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+                self._chunk_targets[key] = ChunkTarget(path, self.root / CHUNK_INDEX_DIR / f"{index_name}.idx")
+            return self._chunk_targets[key]
+
+
+class JobProgress:
+    COUNTERS = ("totalFiles", "successFiles", "failedFiles", "copiedFiles", "skippedFiles", "bytesCopied", "bytesDeduplicated")
+
+    def __init__(self, counters: Sequence[str] = COUNTERS) -> None:
+        self._lock = threading.Lock()
+        self.counters = {name: 0 for name in counters}
+        self.errors: List[str] = []
+        self._published_at = 0.0
+
+    def add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counters[name] += delta
+
+    def error(self, message: str) -> None:
+        with self._lock:
+            if len(self.errors) < MAX_JOB_ERRORS:
+                self.errors.append(message)
+
+    def snapshot(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        # Returns the fields to write, at most once per PROGRESS_INTERVAL unless forced.
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._published_at < PROGRESS_INTERVAL:
+                return None
+            self._published_at = now
+            return {**self.counters, "errors": list(self.errors)}
+
+
+class SyncExecutor:
+    # Runs sync jobs on a shared, bounded pool of copy workers. Each job has a
+    # driver thread that walks the task's source and feeds one work item per
+    # file into the pool, holding at most `concurrency` of them in flight, and
+    # periodically writes its counters into the sync_jobs record.
+
+    def __init__(self, source: BaseStore, workers: int = SYNC_WORKERS, task_concurrency: int = TASK_CONCURRENCY) -> None:
+        self._source = source
+        self.locations = SyncLocations(source)
+        self.task_concurrency = task_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-copy")
+        self._lock = threading.Lock()
+        self._running: Dict[int, Tuple[int, threading.Event]] = {}
+        self._stopping = threading.Event()
+
+    def claim(self, task_id: int) -> bool:
+        # Reserves a task so it never runs twice at once; start() or release() follows.
+        with self._lock:
+            if task_id in self._running or self._stopping.is_set():
+                return False
+            self._running[task_id] = (0, threading.Event())
+            return True
+
+    def release(self, task_id: int) -> None:
+        with self._lock:
+            entry = self._running.pop(task_id, None)
+        if entry is not None:
+            entry[1].set()
+
+    def is_running(self, task_id: int) -> bool:
+        with self._lock:
+            return task_id in self._running
+
+    def start(self, task: Dict[str, Any], job_id: int) -> None:
+        with self._lock:
+            done = self._running[task["id"]][1]
+            self._running[task["id"]] = (job_id, done)
+        thread = threading.Thread(target=self._drive, args=(task, job_id), name=f"sync-job-{job_id}", daemon=True)
+        thread.start()
+
+    def launch(self, task: Dict[str, Any], trigger: str = "manual") -> Optional[Dict[str, Any]]:
+        # Creates the job record and starts it; None if the task is already
+        # running, in this process or in another one sharing the store.
+        if not self.claim(task["id"]):
+            return None
+        job = {
+            "taskId": task["id"],
+            "taskName": task.get("name"),
+            "trigger": trigger,
+            "startedAt": iso_now(),
+            "finishedAt": None,
+            "status": "running",
+            "totalFiles": 0,
+            "successFiles": 0,
+            "failedFiles": 0,
+        }
+        try:
+            # Checked and claimed in one write transaction (BEGIN IMMEDIATE on a
+            # shared store), so two worker processes cannot both start the task.
+            with self._source.transaction():
+                current = self._source.find_by_id("sync_tasks", task["id"])
+                if current is None or current.get("runningJobId") is not None:
+                    self.release(task["id"])
+                    return None
+                self._source.insert("sync_jobs", job)
+                self._source.update("sync_tasks", task["id"], {"runningJobId": job["id"]})
+            self._source.save()
+        except Exception:
+            self.release(task["id"])
+            raise
+        self.start(task, job["id"])
+        return job
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            done = next((event for running_job, event in self._running.values() if running_job == job_id), None)
+        return True if done is None else done.wait(timeout)
+
+    def recover(self) -> None:
+        # Jobs left "running" by a previous process will never advance, nor release their task.
+        for job in self._source.scan("sync_jobs", where=lambda job: job.get("status") == "running"):
+            self._source.update("sync_jobs", job["id"], {"status": "fail", "finishedAt": iso_now(), "errors": ["服务重启，任务中断"]})
+        for task in self._source.scan("sync_tasks", where=lambda task: task.get("runningJobId") is not None):
+            self._source.update("sync_tasks", task["id"], {"runningJobId": None})
+        self._source.save()
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            pending = [event for _, event in self._running.values()]
+        # Let drivers record their final status before the store closes.
+        deadline = time.monotonic() + timeout
+        for event in pending:
+            event.wait(max(deadline - time.monotonic(), 0))
+
+    def _publish(self, job_id: int, progress: JobProgress, force: bool = False) -> None:
+        fields = progress.snapshot(force)
+        if fields is not None:
+            self._source.update("sync_jobs", job_id, fields)
+            self._source.save()
+
+    def _sync_file(self, path: Path, source: Path, targets: List[Union[Path, ChunkTarget]], mode: str, job_id: int, progress: JobProgress) -> None:
+        relative = path.relative_to(source)
+        copied = skipped = copied_bytes = reused_bytes = 0
+        failed = False
+        for target_root in targets:
+            label = target_root.root if isinstance(target_root, ChunkTarget) else target_root
+            try:
+                if isinstance(target_root, ChunkTarget):
+                    uploaded = target_root.upload(path, relative, mode)
+                    if uploaded is None:
+                        skipped += 1
+                    else:
+                        copied += 1
+                        copied_bytes += uploaded[0]
+                        reused_bytes += uploaded[1]
+                elif needs_copy(path, target_root / relative, mode):
+                    copy_file(path, target_root / relative)
+                    copied += 1
+                    copied_bytes += path.stat().st_size
+                else:
+                    skipped += 1
+            except Exception as exc:  # counted as a failed file like any copy error
+                failed = True
+                progress.error(f"{relative} -> {label}: {exc}")
+        progress.add(
+            successFiles=0 if failed else 1,
+            failedFiles=1 if failed else 0,
+            copiedFiles=copied,
+            skippedFiles=skipped,
+            bytesCopied=copied_bytes,
+            bytesDeduplicated=reused_bytes,
+        )
+        self._publish(job_id, progress)
+
+    def _drive(self, task: Dict[str, Any], job_id: int) -> None:
+        progress = JobProgress()
+        try:
+            source = self.locations.resolve(task.get("source", ""))
+            targets = [self.locations.target(name) for name in task.get("target", [])]
+            concurrency = max(int(task.get("concurrency") or self.task_concurrency), 1)
+            if not source.is_dir():
+                progress.error(f"源目录不存在: {source}")
+                progress.add(failedFiles=1)
+            else:
+                slots = threading.BoundedSemaphore(concurrency)
+
+                def done(_: Any) -> None:
+                    slots.release()
+
+                for path in iter_files(source):
+                    if self._stopping.is_set():
+                        progress.error("服务关闭，任务中断")
+                        progress.add(failedFiles=1)
+                        break
+                    slots.acquire()
+                    progress.add(totalFiles=1)
+                    try:
+                        future = self._pool.submit(self._sync_file, path, source, targets, task.get("mode", "incremental"), job_id, progress)
+                    except RuntimeError:
+                        slots.release()
+                        break
+                    future.add_done_callback(done)
+                # Holding every slot means every submitted copy has finished.
+                for _ in range(concurrency):
+                    slots.acquire()
+        except Exception as exc:  # the job record must not stay "running"
+            progress.error(str(exc))
+            progress.add(failedFiles=1)
+        finally:
+            counters = progress.counters
+            status = job_status(counters["totalFiles"], counters["successFiles"], counters["failedFiles"])
+            finished = iso_now()
+            self._publish(job_id, progress, force=True)
+            self._source.update("sync_jobs", job_id, {"status": status, "finishedAt": finished})
+            self._source.update("sync_tasks", task["id"], {"lastRunStatus": status, "lastRunAt": finished, "runningJobId": None})
+            self._source.save()
+            self.release(task["id"])
+
+
+sync_executor = SyncExecutor(store)
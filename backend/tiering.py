@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .datastore import ISO_FORMAT, BaseStore, iso_now, store
+from .rollups import parse_time
+
+TIERING_ENABLED = os.environ.get("NAS_TIERING", "1") == "1"
+# Seconds between evaluations; each one only looks at assets that fell due.
+TIERING_INTERVAL = float(os.environ.get("NAS_TIERING_INTERVAL", "60"))
+# Assets changed per bulk write; the store lock is released between batches.
+TIERING_BATCH = int(os.environ.get("NAS_TIERING_BATCH", "500"))
+DAY = 24 * 3600
+POLICY_FIELDS = ("hotToWarmDays", "warmToColdDays", "coldCacheGb")
+TIER_FIELDS = ("projectId", "tierLevel", "localPresence", "size", "lastAccessedAt", "updatedAt", "createdAt")
+# Copies counted against the cold cache; only "both" can be dropped, since
+# the cloud still holds the asset.
+LOCAL_PRESENCES = ("local", "both")
+
+logger = logging.getLogger(__name__)
+
+
+class TierEntry(NamedTuple):
+    project_id: Optional[int]
+    tier: str
+    presence: Optional[str]
+    size: float
+    touched: Optional[int]
+
+
+def tier_entry(asset: Dict[str, Any]) -> TierEntry:
+    touched = parse_time(asset.get("lastAccessedAt")) or parse_time(asset.get("updatedAt")) or parse_time(asset.get("createdAt"))
+    return TierEntry(asset.get("projectId"), asset.get("tierLevel", "hot"), asset.get("localPresence"), asset.get("size", 0), touched)
+
+
+class TieringEngine:
+    # Keeps one summary per asset plus a heap of the time each asset next
+    # falls due for demotion, maintained from store change events. A tick
+    # pops only the due entries, so its cost follows the number of assets
+    # demoted rather than the size of the library; superseded heap entries
+    # are skipped when they surface. Cold copies still on local disk are
+    # tracked per cache scope (a project with its own policy, or the global
+    # policy as None) with an LRU heap for eviction.
+
+    def __init__(
+        self, source: BaseStore, interval: float = TIERING_INTERVAL, batch: int = TIERING_BATCH, clock: Callable[[], float] = time.time
+    ) -> None:
+        self._source = source
+        self.interval = interval
+        self.batch = batch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._global: Dict[str, Any] = {}
+        self._projects: Dict[int, Dict[str, Any]] = {}
+        self._assets: Dict[int, TierEntry] = {}
+        self._due: Dict[int, float] = {}
+        self._queue: List[Tuple[float, int]] = []
+        self._cache_used: Dict[Optional[int], float] = {}
+        self._lru: Dict[Optional[int], List[Tuple[int, int]]] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def load(self, policies: List[Dict[str, Any]], assets: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for policy in policies:
+                self._set_policy(policy, 1)
+            for asset in assets:
+                self._track(asset["id"], tier_entry(asset), 1)
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if collection == "assets":
+            if old is not None and new is not None and all(old.get(field) == new.get(field) for field in TIER_FIELDS):
+                return
+            with self._lock:
+                if old is not None:
+                    self._track(old["id"], tier_entry(old), -1)
+                if new is not None:
+                    self._track(new["id"], tier_entry(new), 1)
+        elif collection == "tier_policies":
+            with self._lock:
+                if old is not None:
+                    self._set_policy(old, -1)
+                if new is not None:
+                    self._set_policy(new, 1)
+                self._reschedule()
+
+    def _set_policy(self, policy: Dict[str, Any], sign: int) -> None:
+        project_id = policy.get("projectId") if policy.get("type") == "project" else None
+        current = self._global if project_id is None else self._projects.get(project_id, {})
+        if sign > 0:
+            current = policy
+        elif current.get("id") == policy["id"]:
+            current = {}
+        if project_id is None:
+            self._global = current
+        elif current:
+            self._projects[project_id] = current
+        else:
+            self._projects.pop(project_id, None)
+
+    def _reschedule(self) -> None:
+        # Policies changed: every asset's due time and cache scope may move.
+        entries = list(self._assets.items())
+        self._assets.clear()
+        self._due.clear()
+        self._queue.clear()
+        self._cache_used.clear()
+        self._lru.clear()
+        for asset_id, entry in entries:
+            self._track(asset_id, entry, 1)
+
+    def scope(self, project_id: Optional[int]) -> Optional[int]:
+        return project_id if project_id in self._projects else None
+
+    def policy(self, scope: Optional[int]) -> Dict[str, Any]:
+        # Project fields override the global policy; missing ones fall back to it.
+        override = self._projects.get(scope, {}) if scope is not None else {}
+        return {field: override[field] if override.get(field) is not None else self._global.get(field) for field in POLICY_FIELDS}
+
+    def _track(self, asset_id: int, entry: TierEntry, sign: int) -> None:
+        scope = self.scope(entry.project_id)
+        if entry.tier == "cold" and entry.presence in LOCAL_PRESENCES:
+            self._cache_used[scope] = self._cache_used.get(scope, 0) + sign * entry.size
+        if sign < 0:
+            self._assets.pop(asset_id, None)
+            self._due.pop(asset_id, None)
+            return
+        self._assets[asset_id] = entry
+        if entry.tier == "cold" and entry.presence == "both" and entry.touched is not None:
+            heap = self._lru.setdefault(scope, [])
+            heapq.heappush(heap, (entry.touched, asset_id))
+            if len(heap) > 2 * len(self._assets) + 64:
+                self._lru[scope] = self._compact_lru(scope)
+        days = {"hot": "hotToWarmDays", "warm": "warmToColdDays"}.get(entry.tier)
+        limit = self.policy(scope).get(days) if days else None
+        if limit is not None and entry.touched is not None:
+            due = entry.touched + limit * DAY
+            self._due[asset_id] = due
+            heapq.heappush(self._queue, (due, asset_id))
+            # Superseded entries are normally dropped as they surface; bound them here.
+            if len(self._queue) > 2 * len(self._due) + 64:
+                self._queue = [(due, asset_id) for asset_id, due in self._due.items()]
+                heapq.heapify(self._queue)
+
+    def _evictable(self, asset_id: int, touched: int, scope: Optional[int]) -> bool:
+        entry = self._assets.get(asset_id)
+        return (
+            entry is not None
+            and entry.touched == touched
+            and entry.tier == "cold"
+            and entry.presence == "both"
+            and self.scope(entry.project_id) == scope
+        )
+
+    def _compact_lru(self, scope: Optional[int]) -> List[Tuple[int, int]]:
+        heap = list({item for item in self._lru.get(scope, []) if self._evictable(item[1], item[0], scope)})
+        heapq.heapify(heap)
+        return heap
+
+    def _target_tier(self, entry: TierEntry, now: float) -> str:
+        # An asset idle past both thresholds skips warm and goes straight to cold.
+        cold_days = self.policy(self.scope(entry.project_id)).get("warmToColdDays")
+        if cold_days is not None and entry.touched is not None and now >= entry.touched + cold_days * DAY:
+            return "cold"
+        return "warm" if entry.tier == "hot" else "cold"
+
+    def _pop_due(self, now: float) -> List[Tuple[int, str]]:
+        demotions: List[Tuple[int, str]] = []
+        while self._queue and self._queue[0][0] <= now and len(demotions) < self.batch:
+            due, asset_id = heapq.heappop(self._queue)
+            if self._due.get(asset_id) != due:
+                continue
+            del self._due[asset_id]
+            demotions.append((asset_id, self._target_tier(self._assets[asset_id], now)))
+        return demotions
+
+    def _pop_evictions(self) -> List[int]:
+        evictions: List[int] = []
+        chosen = set()
+        for scope, heap in self._lru.items():
+            budget = self.policy(scope).get("coldCacheGb")
+            if budget is None:
+                continue
+            used = self._cache_used.get(scope, 0)
+            while heap and used > budget and len(evictions) < self.batch:
+                touched, asset_id = heapq.heappop(heap)
+                if asset_id in chosen or not self._evictable(asset_id, touched, scope):
+                    continue
+                chosen.add(asset_id)
+                evictions.append(asset_id)
+                used -= self._assets[asset_id].size
+        return evictions
+
+    def run_once(self) -> Dict[str, Any]:
+        # Applies due demotions, then cold cache evictions, batch by batch.
+        now = self._clock()
+        result = {"demoted": 0, "evicted": 0, "ranAt": iso_now()}
+        for kind, field in (("demoted", "tierLevel"), ("evicted", "localPresence")):
+            while True:
+                with self._source.transaction():
+                    with self._lock:
+                        if kind == "demoted":
+                            updates = [(asset_id, {"tierLevel": tier, "tieredAt": result["ranAt"]}) for asset_id, tier in self._pop_due(now)]
+                        else:
+                            updates = [(asset_id, {"localPresence": "cloud", "evictedAt": result["ranAt"]}) for asset_id in self._pop_evictions()]
+                    if not updates:
+                        break
+                    self._source.bulk_write("assets", updates, [])
+                result[kind] += len(updates)
+        if result["demoted"] or result["evicted"]:
+            self._source.save()
+        self.last_run = result
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            while self._queue and self._due.get(self._queue[0][1]) != self._queue[0][0]:
+                heapq.heappop(self._queue)
+            next_due = self._queue[0][0] if self._queue else None
+            scopes = sorted(set(self._cache_used) | set(self._projects) | {None}, key=lambda scope: -1 if scope is None else scope)
+            return {
+                "tracked": len(self._assets),
+                "scheduled": len(self._due),
+                "nextDueAt": None if next_due is None else time.strftime(ISO_FORMAT, time.gmtime(next_due)),
+                "coldCache": [
+                    {"projectId": scope, "usedGb": round(self._cache_used.get(scope, 0), 6), "budgetGb": self.policy(scope).get("coldCacheGb")}
+                    for scope in scopes
+                ],
+                "lastRun": self.last_run,
+            }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="tiering", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:  # keep evaluating on later ticks
+                logger.exception("tiering run failed")
+
+
+def build_tiering_engine(source: BaseStore) -> TieringEngine:
+    engine = TieringEngine(source)
+    with source.transaction():
+        source.add_listener(engine.on_change)
+        engine.load(source.get_collection("tier_policies"), source.get_collection("assets"))
+    return engine
+
+
+tiering_engine = build_tiering_engine(store)
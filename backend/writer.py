@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .datastore import BaseStore, store
+
+# Writes applied together before one save; the rest wait for the next round.
+WRITER_BATCH = int(os.environ.get("NAS_WRITER_BATCH", "256"))
+
+Write = Tuple[Callable[..., Any], Tuple[Any, ...], "asyncio.Future[Any]"]
+Outcome = Tuple[Optional[BaseException], Any]
+
+
+class StoreWriter:
+    # Async front for store writes. Request handlers await a write; a task on
+    # the event loop hands everything queued so far to one dedicated thread,
+    # which applies the writes in order and saves once for the whole round.
+    # Handlers never block the loop on disk I/O, and writes arriving while a
+    # save is running share the next one. Routes that only read are plain
+    # functions run in FastAPI's thread pool, since a SQLite read is a query.
+
+    def __init__(self, source: BaseStore, max_batch: int = WRITER_BATCH) -> None:
+        self._source = source
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+        self._queue: Deque[Write] = deque()
+        self._drainer: Optional[asyncio.Task[None]] = None
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        # Runs function(*args) on the writer thread and returns once the
+        # save covering it has finished; exceptions are re-raised here.
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((function, args, future))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+        return await future
+
+    async def insert(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.run(self._source.insert, collection, item)
+
+    async def update(self, collection: str, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self.run(self._source.update, collection, item_id, changes)
+
+    async def delete_by_id(self, collection: str, item_id: int) -> bool:
+        return await self.run(self._source.delete_by_id, collection, item_id)
+
+    async def merge_document(self, path: Sequence[str], changes: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.run(self._source.merge_document, path, changes)
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+            outcomes = await loop.run_in_executor(self._executor, self._apply, batch)
+            for (_, _, future), (error, result) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, batch: List[Write]) -> List[Outcome]:
+        outcomes: List[Outcome] = []
+        with self._source.deferred_saves():
+            for function, args, _ in batch:
+                try:
+                    outcomes.append((None, function(*args)))
+                except Exception as exc:  # belongs to the caller that queued it
+                    outcomes.append((exc, None))
+        if any(error is None for error, _ in outcomes):
+            try:
+                self._source.save()
+            except Exception as exc:  # the writes are in memory but not on disk
+                outcomes = [(error or exc, result) for error, result in outcomes]
+        return outcomes
+
+    async def close(self) -> None:
+        if self._drainer is not None and not self._drainer.done():
+            await self._drainer
+
+
+store_writer = StoreWriter(store)
@@ -0,0 +1,181 @@
+# Latency of mixed read/write API traffic against a real uvicorn server. To
+# compare against an older revision, serve its checkout with --root:
+#
+#     git worktree add /tmp/nas-before <commit>
+#     python benchmarks/api_load.py --root /tmp/nas-before
+#     python benchmarks/api_load.py
+#
+# --workers N serves from N uvicorn worker processes on a shared SQLite store.
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+CONTENT_LENGTH = re.compile(rb"content-length: *(\d+)", re.IGNORECASE)
+
+
+def server_env(root: Path, work: Path, mode: str, workers: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "PYTHONPATH": str(root),
+            "NAS_STORE_MODE": mode,
+            "NAS_STORE_PATH": str(work / ("data_store.db" if mode == "sqlite" else "data_store.json")),
+            "NAS_SYNC_ROOT": str(work / "sync"),
+            "NAS_IMPORT_ROOT": str(work / "library"),
+            "NAS_SCHEDULER": "0",
+            "NAS_TIERING": "0",
+            "NAS_SHARED_STORE": "1" if workers > 1 else "0",
+        }
+    )
+    return env
+
+
+def seed(root: Path, env: Dict[str, str], count: int) -> List[int]:
+    # Builds the store with the served tree's own code, then closes it.
+    os.environ.update(env)
+    sys.path.insert(0, str(root))
+    store = importlib.import_module("backend.datastore").store
+    folders = store.get_collection("folders")
+    for index in range(count):
+        folder = folders[index % len(folders)]
+        store.insert(
+            "assets",
+            {
+                "projectId": folder.get("projectId"),
+                "folderId": folder["id"],
+                "fileName": f"A{index:06d}_外景.mov",
+                "fileType": "video",
+                "size": round(0.5 + index % 97 / 10, 2),
+                "tierLevel": "hot",
+                "localPresence": "local",
+                "tags": ["外景"],
+            },
+        )
+    store.close()
+    return [folder["id"] for folder in folders]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class Connection:
+    # Minimal keep-alive HTTP/1.1 client, so the load generator spends as
+    # little CPU as possible next to the server it measures.
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> int:
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        self.writer.write(head.encode("ascii") + payload)
+        response = await self.reader.readuntil(b"\r\n\r\n")
+        match = CONTENT_LENGTH.search(response)
+        await self.reader.readexactly(int(match.group(1)) if match else 0)
+        return int(response[9:12])
+
+
+async def client(port: int, rng: random.Random, deadline: float, assets: int, folders: List[int], write_ratio: float) -> List[Tuple[str, float]]:
+    connection = Connection(*await asyncio.open_connection("127.0.0.1", port))
+    samples: List[Tuple[str, float]] = []
+    try:
+        while time.perf_counter() < deadline:
+            asset_id = rng.randint(1, assets)
+            started = time.perf_counter()
+            if rng.random() < write_ratio:
+                kind = "write"
+                status = await connection.request("PATCH", f"/api/assets/{asset_id}/meta", {"rating": rng.randint(1, 5)})
+            elif rng.random() < 0.5:
+                kind = "read"
+                status = await connection.request("GET", f"/api/assets/{asset_id}")
+            else:
+                kind = "read"
+                status = await connection.request("GET", f"/api/folders/{rng.choice(folders)}/assets?limit=50")
+            if status != 200:
+                raise RuntimeError(f"{kind} request failed with {status}")
+            samples.append((kind, time.perf_counter() - started))
+    finally:
+        connection.writer.close()
+    return samples
+
+
+async def load(port: int, clients: int, duration: float, assets: int, folders: List[int], write_ratio: float) -> List[Tuple[str, float]]:
+    deadline = time.perf_counter() + duration
+    results = await asyncio.gather(*(client(port, random.Random(index), deadline, assets, folders, write_ratio) for index in range(clients)))
+    return [sample for samples in results for sample in samples]
+
+
+def wait_ready(port: int, server: subprocess.Popen) -> None:
+    for _ in range(300):
+        if server.poll() is not None:
+            raise SystemExit("server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/dashboard/overview", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", type=Path, default=ROOT, help="source tree to serve")
+    parser.add_argument("--mode", default="json", choices=("json", "journal", "sqlite"))
+    parser.add_argument("--assets", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8731)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    if args.workers > 1 and args.mode != "sqlite":
+        parser.error("--workers needs --mode sqlite")
+
+    root = args.root.resolve()
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        env = server_env(root, work, args.mode, args.workers)
+        folders = seed(root, env, args.assets)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=work,
+            env=env,
+        )
+        try:
+            wait_ready(args.port, server)
+            # Lets every worker finish starting up before anything is measured.
+            asyncio.run(load(args.port, args.clients, 3.0, args.assets, folders, args.write_ratio))
+            samples = asyncio.run(load(args.port, args.clients, args.duration, args.assets, folders, args.write_ratio))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{root} ({args.mode}, {args.workers} workers, {args.assets} assets, {args.clients} clients, {args.write_ratio:.0%} writes)")
+    print(f"{'kind':<6} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind in ("read", "write", "all"):
+        values = [latency for sample_kind, latency in samples if kind in ("all", sample_kind)]
+        print(
+            f"{kind:<6} {len(values):>9} {len(values) / args.duration:>8.0f} {percentile(values, 0.5) * 1000:>8.1f}"
+            f" {percentile(values, 0.99) * 1000:>8.1f} {max(values, default=0) * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
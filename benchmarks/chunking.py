@@ -0,0 +1,83 @@
+# Bytes sent when re-syncing edited camera files to a chunked target, for
+# whole-file copies, fixed-size chunks and content-defined chunks:
+#
+#     python benchmarks/chunking.py --size 256
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.chunking import CHUNK_AVG, Chunker, ChunkTarget  # noqa: E402
+
+
+class FixedChunker(Chunker):
+    def chunks(self, handle: BinaryIO) -> Iterator[bytes]:
+        return iter(lambda: handle.read(CHUNK_AVG), b"")
+
+
+def edits(size: int) -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    rng = random.Random(7)
+    middle = size // 2
+    return [
+        ("unchanged", lambda data: data),
+        ("metadata rewrite (+3 KB in header)", lambda data: data[:512] + rng.randbytes(3584) + data[1024:]),
+        ("overwrite 64 KB in the middle", lambda data: data[:middle] + rng.randbytes(65536) + data[middle + 65536 :]),
+        ("trim first 10%", lambda data: data[size // 10 :]),
+        ("trim last 10%", lambda data: data[: size - size // 10]),
+        ("cut 5 s from the middle (2%)", lambda data: data[:middle] + data[middle + size // 50 :]),
+        ("append 1%", lambda data: data + rng.randbytes(size // 100)),
+    ]
+
+
+def sync(target: ChunkTarget, path: Path, data: bytes) -> int:
+    path.write_bytes(data)
+    sent, _ = target.upload(path, Path(path.name), "checksum") or (0, 0)
+    return sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=256, help="file size in MB")
+    args = parser.parse_args()
+    size = args.size * 1024 * 1024
+    # Compressed video is effectively random bytes.
+    original = random.Random(1).randbytes(size)
+
+    start = time.perf_counter()
+    chunk_count = sum(1 for _ in Chunker().chunks(io.BytesIO(original)))
+    elapsed = time.perf_counter() - start
+    print(f"{args.size} MB file, content-defined chunking {args.size / elapsed:.0f} MB/s, {chunk_count} chunks (avg {size / chunk_count / 1024:.0f} KB)")
+    print(f"  {'edit':<36} {'whole file':>12} {'fixed 1 MB':>12} {'content-defined':>16}")
+
+    totals: Dict[str, int] = {"whole": 0, "fixed": 0, "cdc": 0}
+    for label, edit in edits(size):
+        edited = edit(original)
+        sent = {}
+        for name, chunker in (("fixed", FixedChunker()), ("cdc", Chunker())):
+            with tempfile.TemporaryDirectory() as workdir:
+                root = Path(workdir)
+                target = ChunkTarget(root / "target", root / "index.idx", chunker)
+                sync(target, root / "clip.mov", original)
+                sent[name] = sync(target, root / "clip.mov", edited)
+        totals["whole"] += len(edited)
+        totals["fixed"] += sent["fixed"]
+        totals["cdc"] += sent["cdc"]
+        print(f"  {label:<36} {_mb(len(edited)):>12} {_mb(sent['fixed']):>12} {_mb(sent['cdc']):>16}")
+    print(f"  {'total':<36} {_mb(totals['whole']):>12} {_mb(totals['fixed']):>12} {_mb(totals['cdc']):>16}")
+    print(f"  bytes on wire saved vs whole-file copies: fixed {1 - totals['fixed'] / totals['whole']:.1%}, content-defined {1 - totals['cdc'] / totals['whole']:.1%}")
+
+
+def _mb(count: int) -> str:
+    return f"{count / 1024 / 1024:.1f} MB"
+
+
+if __name__ == "__main__":
+    main()
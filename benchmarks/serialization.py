@@ -0,0 +1,97 @@
+# Compares stdlib JSON with the fast serialization path on a large asset list:
+#
+#     python benchmarks/serialization.py --assets 50000
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.responses import FastJSONResponse, FastJSONRoute  # noqa: E402
+from backend.serialization import FAST_JSON, dumps, loads  # noqa: E402
+
+
+def make_assets(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": index,
+            "projectId": index % 50 + 1,
+            "folderId": index % 400 + 1,
+            "fileName": f"A{index:06d}_花絮采访.mov",
+            "fileType": "video",
+            "size": round(0.5 + index % 97 / 10, 2),
+            "tierLevel": ("hot", "warm", "cold")[index % 3],
+            "tags": ["采访", "4K"] if index % 2 else ["航拍"],
+            "camera": "Sony FX6",
+            "location": "上海",
+            "createdAt": "2024-03-01T10:00:00Z",
+            "localPresence": "both",
+        }
+        for index in range(count)
+    ]
+
+
+def timed(label: str, func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<38} {best * 1000:9.1f} ms")
+    return best
+
+
+def build_app(fast: bool, payload: Dict[str, Any]) -> FastAPI:
+    if fast:
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.router.route_class = FastJSONRoute
+    else:
+        app = FastAPI()
+
+    @app.get("/assets")
+    def list_assets() -> Dict[str, Any]:
+        return payload
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    assets = make_assets(args.assets)
+    snapshot = {"assets": assets}
+    print(f"{args.assets} assets, orjson {'available' if FAST_JSON else 'not installed (stdlib fallback)'}")
+
+    print("snapshot encode")
+    pretty = json.dumps(snapshot, ensure_ascii=False, indent=2).encode("utf-8")
+    compact = dumps(snapshot)
+    base = timed("stdlib json, indent=2 (previous)", lambda: json.dumps(snapshot, ensure_ascii=False, indent=2), args.repeat)
+    fast = timed("serialization.dumps, compact", lambda: dumps(snapshot), args.repeat)
+    print(f"  speedup {base / fast:.1f}x, size {len(pretty) / 1e6:.1f} MB -> {len(compact) / 1e6:.1f} MB")
+
+    print("snapshot load")
+    base = timed("stdlib json.loads", lambda: json.loads(pretty), args.repeat)
+    fast = timed("serialization.loads", lambda: loads(compact), args.repeat)
+    print(f"  speedup {base / fast:.1f}x")
+
+    print("GET response with the full list")
+    results = []
+    for fast_path in (False, True):
+        client = TestClient(build_app(fast_path, {"items": assets}))
+        label = "FastJSONRoute + FastJSONResponse" if fast_path else "FastAPI default (model + encoder)"
+        results.append(timed(label, lambda: client.get("/assets").content, args.repeat))
+    print(f"  speedup {results[0] / results[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
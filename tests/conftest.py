@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Importing backend builds the module-level store and engines; keep them out
+# of the working tree and their background threads idle.
+WORK = Path(tempfile.mkdtemp(prefix="nas-tests-"))
+os.environ.setdefault("NAS_STORE_MODE", "json")
+os.environ.setdefault("NAS_STORE_PATH", str(WORK / "data_store.json"))
+os.environ.setdefault("NAS_SYNC_ROOT", str(WORK / "sync"))
+os.environ.setdefault("NAS_IMPORT_ROOT", str(WORK / "library"))
+os.environ.setdefault("NAS_SCHEDULER", "0")
+os.environ.setdefault("NAS_TIERING", "0")
+# Restores recovered at startup would otherwise pace through seconds of simulated downloads.
+os.environ.setdefault("NAS_RESTORE_BANDWIDTH_MB", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One app for the whole run: the backend modules are process-wide singletons.
+    from fastapi.testclient import TestClient
+
+    from backend.app import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from backend import aggregates
+from backend.aggregates import DashboardAggregates, build_dashboard_aggregates
+from backend.datastore import DataStore
+
+
+def failed_job(job_id, status="failed"):
+    return {"id": job_id, "taskId": 1, "status": status, "startedAt": "2024-03-09T02:00:00Z"}
+
+
+def test_overview_follows_changes_incrementally(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    dashboard = build_dashboard_aggregates(source)
+    assert dashboard.overview() == source.dashboard_overview()
+    asset = source.insert("assets", {"projectId": 1, "folderId": 4, "size": 2.0, "tierLevel": "cold"})
+    source.update("assets", asset["id"], {"tierLevel": "warm"})
+    source.update("disks", 1, {"status": "failed"})
+    source.insert("alerts", {"status": "open"})
+    source.delete_by_id("projects", 2)
+    assert dashboard.overview() == source.dashboard_overview()
+    source.close()
+
+
+def test_recent_failures_are_capped(monkeypatch):
+    monkeypatch.setattr(aggregates, "FAILURES_KEPT", 8)
+    dashboard = DashboardAggregates()
+    dashboard.load("sync_jobs", [failed_job(job_id) for job_id in range(30, 0, -1)])
+    assert len(dashboard._failure_ids) == 8
+    assert [job["id"] for job in dashboard.sync_summary()["recentFailures"]] == [30, 29, 28, 27, 26]
+    dashboard.on_change("sync_jobs", None, failed_job(31, "partial"))
+    dashboard.on_change("sync_jobs", None, failed_job(2))
+    assert len(dashboard._failure_ids) == 8
+    assert dashboard._failure_ids[-1] == 31
+
+
+def test_recent_failures_refill_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(aggregates, "FAILURES_KEPT", 6)
+    source = DataStore(str(tmp_path / "store.json"))
+    jobs = source.insert_many("sync_jobs", [failed_job(0, "error" if index % 2 else "failed") for index in range(10)])
+    dashboard = build_dashboard_aggregates(source)
+    newest = [job["id"] for job in reversed(jobs)]
+    assert [job["id"] for job in dashboard.sync_summary()["recentFailures"]] == newest[:5]
+    source.bulk_write("sync_jobs", [], newest[:3])
+    # The partial seed job (id 2) is the oldest failure of all.
+    assert [job["id"] for job in dashboard.sync_summary()["recentFailures"]] == newest[3:8]
+    source.update("sync_jobs", newest[3], {"status": "success"})
+    assert dashboard.sync_summary()["recentFailures"][0]["id"] == newest[4]
+    source.close()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from backend.bulk import plan_batch, unique_ids
+from backend.datastore import store
+
+
+def test_plan_batch_reports_every_id():
+    assets = {1: {"id": 1, "folderId": 4, "tags": ["a"]}, 2: {"id": 2, "folderId": 5, "tags": []}}
+    updates, deletes, outcomes = plan_batch("move", [1, 2, 9], assets, {"targetFolderId": 5})
+    assert updates == [(1, {"folderId": 5})] and deletes == []
+    assert outcomes == [{"id": 1, "status": "moved"}, {"id": 2, "status": "unchanged"}, {"id": 9, "status": "not_found"}]
+    updates, _, outcomes = plan_batch("tag", [1, 2], assets, {"tags": ["a", "b", "b"]})
+    assert updates == [(1, {"tags": ["a", "b"]}), (2, {"tags": ["a", "b"]})]
+    assert [outcome["status"] for outcome in outcomes] == ["tagged", "tagged"]
+    _, deletes, outcomes = plan_batch("delete", [2], assets, {})
+    assert deletes == [2] and outcomes == [{"id": 2, "status": "deleted"}]
+    assert unique_ids([3, 1, 3, 2, 1]) == [3, 1, 2]
+
+
+def test_batch_endpoint_returns_per_item_results(client):
+    first, second = store.insert_many("assets", [{"projectId": 1, "folderId": 4, "tags": ["批量"]}, {"projectId": 1, "folderId": 5, "tags": []}])
+    ids = [first["id"], second["id"], 99999]
+    body = client.patch("/api/assets/batch", json={"action": "move", "assetIds": ids, "targetFolderId": 5}).json()
+    assert [result["status"] for result in body["results"]] == ["moved", "unchanged", "not_found"]
+    assert body["summary"] == {"moved": 1, "unchanged": 1, "not_found": 1}
+    assert [item["folderId"] for item in body["items"]] == [5, 5]
+    assert store.count_by("assets", "folderId", 4) == store.count("assets", {"folderId": 4})
+    body = client.patch("/api/assets/batch", json={"action": "tag", "assetIds": ids[:2], "tags": ["批量"]}).json()
+    assert [result["status"] for result in body["results"]] == ["unchanged", "tagged"]
+    body = client.patch("/api/assets/batch", json={"action": "delete", "assetIds": [second["id"], second["id"]]}).json()
+    assert body["results"] == [{"id": second["id"], "status": "deleted"}] and body["items"] == []
+    assert store.find_by_id("assets", second["id"]) is None
+    assert client.patch("/api/assets/batch", json={"action": "rename", "assetIds": ids}).status_code == 400
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import io
+import random
+from pathlib import Path
+
+from backend.chunking import Chunker, ChunkTarget
+
+
+def payload(size: int, seed: int = 7) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+def test_chunks_reassemble_within_size_bounds():
+    chunker = Chunker(min_size=4 * 1024, avg_size=16 * 1024, max_size=64 * 1024)
+    data = payload(2 * 1024 * 1024)
+    chunks = list(chunker.chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= chunker.max_size for chunk in chunks)
+    assert all(len(chunk) >= chunker.min_size for chunk in chunks[:-1])
+
+
+def test_boundaries_survive_an_insert():
+    chunker = Chunker(min_size=4 * 1024, avg_size=16 * 1024, max_size=64 * 1024)
+    data = payload(1024 * 1024)
+    edited = data[:1000] + b"inserted bytes" + data[1000:]
+    before = set(chunker.chunks(io.BytesIO(data)))
+    after = list(chunker.chunks(io.BytesIO(edited)))
+    # Only the chunks around the edit change.
+    assert sum(chunk not in before for chunk in after) <= 2
+
+
+def test_small_and_empty_inputs():
+    chunker = Chunker(min_size=4 * 1024, avg_size=16 * 1024, max_size=64 * 1024)
+    assert list(chunker.chunks(io.BytesIO(b""))) == []
+    assert list(chunker.chunks(io.BytesIO(b"tiny"))) == [b"tiny"]
+
+
+def test_target_stores_shared_chunks_once(tmp_path):
+    chunker = Chunker(min_size=4 * 1024, avg_size=16 * 1024, max_size=64 * 1024)
+    data = payload(512 * 1024)
+    first = tmp_path / "first.bin"
+    second = tmp_path / "second.bin"
+    first.write_bytes(data)
+    second.write_bytes(data[:300000] + b"edit" + data[300000:])
+    target = ChunkTarget(tmp_path / "target", tmp_path / "index" / "target.idx", chunker)
+    assert target.upload(first, Path("a/first.bin"), "incremental") == (len(data), 0)
+    sent, reused = target.upload(second, Path("b/second.bin"), "incremental")
+    assert sent < len(data) // 4 and sent + reused == len(data) + 4
+    assert target.upload(first, Path("a/first.bin"), "incremental") is None
+    assert b"".join(target.read_file(Path("b/second.bin"))) == second.read_bytes()
+    # A fresh instance reads the local index instead of re-uploading.
+    reopened = ChunkTarget(tmp_path / "target", tmp_path / "index" / "target.idx", chunker)
+    assert reopened.upload(first, Path("c/copy.bin"), "full") == (0, len(data))
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.commit import GroupCommitter
+
+
+def test_sync_requests_within_window_share_one_flush():
+    flushes = []
+    committer = GroupCommitter(lambda: flushes.append(time.monotonic()), window=0.05)
+    threads = [threading.Thread(target=committer.request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    committer.close()
+    assert 1 <= len(flushes) <= 3
+
+
+def test_deferred_failure_is_raised_until_a_flush_succeeds():
+    failing = [True]
+    flushed = threading.Event()
+
+    def flush():
+        if failing[0]:
+            raise OSError("disk full")
+        flushed.set()
+
+    committer = GroupCommitter(flush, window=0.01, durability="deferred")
+    committer.request()
+    time.sleep(0.1)
+    with pytest.raises(OSError):
+        committer.request()
+    failing[0] = False
+    assert flushed.wait(1)
+    committer.request()
+    committer.close()
+
+
+def test_flush_raises_error_of_its_own_flush():
+    def flush():
+        raise OSError("disk full")
+
+    committer = GroupCommitter(flush, window=10)
+    with pytest.raises(OSError):
+        committer.flush()
+
+
+def test_close_stops_the_flusher_when_the_last_flush_fails():
+    def flush():
+        raise OSError("disk full")
+
+    committer = GroupCommitter(flush, window=10)
+    with pytest.raises(OSError):
+        committer.close()
+    assert not committer._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        committer.request()
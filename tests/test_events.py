@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.datastore import DataStore
+from backend.events import EventBus, build_event_bus, parse_topics, sse_stream
+
+
+def test_parse_topics():
+    assert parse_topics("sync_jobs:12, sync_jobs:13,import_tasks") == {"sync_jobs": {12, 13}, "import_tasks": None}
+    assert parse_topics("alerts,alerts:3") == {"alerts": None}
+    for text in ("users", "", "sync_jobs:x"):
+        with pytest.raises(ValueError):
+            parse_topics(text)
+
+
+def test_subscriber_keeps_latest_state_per_record_and_overflows(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    bus = build_event_bus(source)
+
+    async def scenario():
+        subscriber = bus.subscribe(parse_topics("alerts"), asyncio.get_running_loop())
+        subscriber.limit = 2
+        first = source.insert("alerts", {"content": "a", "status": "open"})
+        source.update("alerts", first["id"], {"status": "closed"})
+        source.insert("alerts", {"content": "b"})
+        source.insert("restore_tasks", {"status": "queued"})
+        events, overflowed = subscriber.drain()
+        assert not overflowed
+        assert [(event["id"], event["op"]) for event in events] == [(first["id"], "update"), (first["id"] + 1, "insert")]
+        assert events[0]["record"]["status"] == "closed"
+        for index in range(3):
+            source.insert("alerts", {"content": str(index)})
+        events, overflowed = subscriber.drain()
+        assert overflowed and len(events) == 1
+        bus.unsubscribe(subscriber)
+        bus.unsubscribe(subscriber)
+        assert bus._count == 0
+
+    asyncio.run(scenario())
+    source.close()
+
+
+def test_stream_sends_snapshot_then_changes_and_releases_its_slot(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    bus = EventBus(source, max_subscribers=1)
+    source.add_listener(bus.on_change)
+    job = source.insert("sync_jobs", {"status": "running", "successFiles": 0})
+
+    async def scenario():
+        subscriber = bus.subscribe(parse_topics(f"sync_jobs:{job['id']}"), asyncio.get_running_loop())
+        with pytest.raises(OverflowError):
+            bus.subscribe(parse_topics("alerts"), asyncio.get_running_loop())
+        disconnected = [False]
+
+        async def is_disconnected():
+            return disconnected[0]
+
+        stream = sse_stream(bus, subscriber, is_disconnected, heartbeat=0.01)
+        snapshot = await stream.__anext__()
+        assert snapshot.startswith(b"id: 1\nevent: sync_jobs\n") and b'"op":"snapshot"' in snapshot
+        assert await stream.__anext__() == b": ping\n\n"
+        source.update("sync_jobs", job["id"], {"successFiles": 5})
+        source.insert("sync_jobs", {"status": "running"})
+        update = await stream.__anext__()
+        assert update.startswith(b"id: 2\n") and b'"successFiles":5' in update
+        disconnected[0] = True
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        assert bus.subscribe(parse_topics("alerts"), asyncio.get_running_loop())
+
+    asyncio.run(scenario())
+    source.close()
+
+
+def test_events_api_rejects_unknown_topics(client):
+    assert client.get("/api/events", params={"topics": "users"}).status_code == 400
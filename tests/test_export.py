@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+from backend.datastore import DataStore, store
+from backend.export import buffered, csv_lines, iter_records, ndjson_lines
+
+
+def test_iter_records_pages_through_all_matches(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    source.insert_many("sync_jobs", [{"taskId": 5, "status": "success"} for _ in range(12)])
+    records = list(iter_records(source, "sync_jobs", {"taskId": 5}, chunk=5))
+    source.close()
+    assert len(records) == 12
+    assert [record["id"] for record in records] == sorted(record["id"] for record in records)
+
+
+def test_csv_and_ndjson_lines():
+    records = [{"id": 1, "fileName": "花絮采访.wav", "tags": ["采访", "外景"]}, {"id": 2, "fileName": 'a,"b"'}]
+    text = "".join(csv_lines(iter(records), None))
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows == [["id", "fileName", "tags"], ["1", "花絮采访.wav", '["采访","外景"]'], ["2", 'a,"b"', ""]]
+    assert "".join(csv_lines(iter([]), ["id", "fileName"])) == "\ufeffid,fileName\r\n"
+    lines = "".join(ndjson_lines(iter(records), ["fileName"])).splitlines()
+    assert [json.loads(line) for line in lines] == [{"fileName": "花絮采访.wav"}, {"fileName": 'a,"b"'}]
+
+
+def test_buffered_groups_lines_into_chunks():
+    chunks = list(buffered(iter(["x" * 40000, "y" * 40000, "z"])))
+    assert b"".join(chunks) == ("x" * 40000 + "y" * 40000 + "z").encode()
+    assert len(chunks) == 2
+
+
+def test_export_endpoint_streams_filtered_records(client):
+    created = store.insert_many("assets", [{"projectId": 1, "folderId": 5, "fileName": f"导出{index}.mov", "fileType": "export"} for index in range(3)])
+    response = client.get("/api/export/assets", params={"fileType": "export", "fields": "id,fileName"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"id": item["id"], "fileName": item["fileName"]} for item in created]
+    response = client.get("/api/export/assets", params={"fileType": "export", "format": "csv", "fields": "id,fileName"})
+    assert response.headers["content-disposition"] == 'attachment; filename="assets.csv"'
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert rows == [["id", "fileName"], *[[str(item["id"]), item["fileName"]] for item in created]]
+    assert client.get("/api/export/users").status_code == 404
+    assert client.get("/api/export/assets", params={"projectId": "x"}).status_code == 422
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+from backend.folder_sizes import Totals, build_folder_rollups
+
+
+def recomputed(source, folder_id):
+    # Brute force: walk every asset's ancestor chain.
+    parents = {folder["id"]: folder.get("parentId") for folder in source.get_collection("folders")}
+    totals = Totals()
+    for asset in source.get_collection("assets"):
+        node = asset.get("folderId")
+        while node is not None:
+            if node == folder_id:
+                totals.add(asset.get("size", 0), 1, {asset.get("tierLevel", "hot"): asset.get("size", 0)}, 1)
+                break
+            node = parents.get(node)
+    return totals.to_dict()
+
+
+def assert_consistent(source, rollups):
+    for folder in source.get_collection("folders"):
+        assert rollups.folder(folder["id"]) == recomputed(source, folder["id"]), folder
+
+
+def test_rollups_follow_asset_and_folder_changes(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    rollups = build_folder_rollups(source)
+    assert_consistent(source, rollups)
+    day3 = source.insert("folders", {"projectId": 1, "name": "Day3", "parentId": 4})
+    asset = source.insert("assets", {"projectId": 1, "folderId": day3["id"], "size": 3.5, "tierLevel": "cold"})
+    assert rollups.folder(1)["assetCount"] == 3
+    assert_consistent(source, rollups)
+    # Move a subtree under another root, then back to the top level.
+    source.update("folders", 4, {"parentId": 2})
+    assert_consistent(source, rollups)
+    source.update("folders", 4, {"parentId": None})
+    assert_consistent(source, rollups)
+    source.update("assets", asset["id"], {"folderId": 3, "tierLevel": "warm", "size": 1.0})
+    source.bulk_write("assets", [(1, {"folderId": 5})], [2])
+    source.delete_by_id("folders", day3["id"])
+    assert_consistent(source, rollups)
+    assert rollups.project(1)["assetCount"] == 2
+    assert rollups.folder(1) == {"size": 12.5, "assetCount": 1, "tiers": {"hot": 12.5, "warm": 0, "cold": 0}}
+    source.close()
+
+
+def test_folder_stats_endpoint(client):
+    stats = client.get("/api/folders/1/stats").json()
+    assert stats["folderId"] == 1
+    assert {"size", "assetCount", "tiers"} <= set(stats)
+    assert client.get("/api/folders/999/stats").status_code == 404
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+from backend.folder_tree import build_folder_tree_cache
+
+
+def names(nodes):
+    return [(node["name"], names(node.get("children", []))) for node in nodes]
+
+
+def test_tree_depth_and_subtree(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    trees = build_folder_tree_cache(source)
+    assert names(trees.tree(1)) == [("素材", [("Day1", []), ("Day2", [])]), ("工程", []), ("输出", [])]
+    shallow = trees.tree(1, depth=1)
+    assert [node["name"] for node in shallow] == ["素材", "工程", "输出"]
+    assert "children" not in shallow[0] and shallow[0]["hasChildren"] is True
+    assert names(trees.tree(1, parent_id=1)) == [("Day1", []), ("Day2", [])]
+    source.close()
+
+
+def test_deep_tree_is_built_without_recursion(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    trees = build_folder_tree_cache(source)
+    parent = None
+    for level in range(3000):
+        parent = source.insert("folders", {"projectId": 3, "name": str(level), "parentId": parent})["id"]
+    node = trees.tree(3)[0]
+    depth = 1
+    while node["children"]:
+        node = node["children"][0]
+        depth += 1
+    assert depth == 3000
+    source.close()
+
+
+def test_cached_tree_follows_folder_changes(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    trees = build_folder_tree_cache(source)
+    assert trees.adjacency(1) is trees.adjacency(1)
+    created = source.insert("folders", {"projectId": 1, "name": "Day3", "parentId": 1})
+    source.update("folders", 2, {"parentId": 3})
+    assert names(trees.tree(1)) == [("素材", [("Day1", []), ("Day2", []), ("Day3", [])]), ("输出", [("工程", [])])]
+    source.delete_by_id("folders", created["id"])
+    # Moving a folder to another project updates both trees.
+    source.update("folders", 5, {"projectId": 2, "parentId": 6})
+    assert names(trees.tree(1, parent_id=1)) == [("Day1", [])]
+    assert names(trees.tree(2, parent_id=6)) == [("Day2", [])]
+    source.close()
+
+
+def test_tree_endpoint(client):
+    items = client.get("/api/projects/1/tree", params={"depth": 1}).json()["items"]
+    assert {"assetCount", "size", "hasChildren"} <= set(items[0])
+    assert client.get("/api/projects/1/tree", params={"parentId": 6}).status_code == 404
+    assert client.get("/api/projects/999/tree").status_code == 404
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from backend.http_cache import ResponseCache, etag_matches
+
+
+def test_etag_matching():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('W/"b"', '"b"')
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put(("/a", b"", (1,)), [], b"a")
+    cache.put(("/b", b"", (1,)), [], b"b")
+    assert cache.get(("/a", b"", (1,))) is not None
+    cache.put(("/c", b"", (1,)), [], b"c")
+    assert cache.get(("/b", b"", (1,))) is None
+    assert cache.get(("/a", b"", (1,)))[1] == b"a"
+
+
+def test_if_none_match_gets_304_until_the_collection_changes(client):
+    first = client.get("/api/roles")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    revalidated = client.get("/api/roles", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    # A different query is a different representation.
+    assert client.get("/api/storage-targets", params={"type": "object"}).headers["etag"] != client.get("/api/storage-targets").headers["etag"]
+    # Replayed from the cache with the same body and validator.
+    again = client.get("/api/roles")
+    assert again.content == first.content and again.headers["etag"] == etag
+    client.patch("/api/roles/3", json={"description": "只读"})
+    changed = client.get("/api/roles", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["items"][2]["description"] == "只读"
+    # Routes over other collections keep their validators.
+    users = client.get("/api/users").headers["etag"]
+    client.patch("/api/roles/3", json={"description": "只读与上传"})
+    assert client.get("/api/users", headers={"If-None-Match": users}).status_code == 304
+
+
+def test_uncached_routes_and_errors_have_no_etag(client):
+    assert "etag" not in client.get("/api/dashboard/overview").headers
+    missing = client.get("/api/disks/999")
+    assert missing.status_code == 404 and "etag" not in missing.headers
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.datastore import DataStore
+
+
+def reopen(store: DataStore, journal: bool) -> DataStore:
+    store.close()
+    return DataStore(str(store.path), journal=journal)
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_ids_are_not_reused_after_restart(tmp_path, journal):
+    store = DataStore(str(tmp_path / "store.json"), journal=journal)
+    first = store.insert("alerts", {"content": "a"})
+    store.delete_by_id("alerts", first["id"])
+    store.compact()
+    store = reopen(store, journal)
+    second = store.insert("alerts", {"content": "b"})
+    store.close()
+    assert second["id"] == first["id"] + 1
+
+
+def test_lookups_by_primary_key(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"))
+    created = store.insert_many("alerts", [{"content": str(index)} for index in range(5)])
+    assert store.next_id("alerts") == created[-1]["id"] + 1
+    assert store.find_by_id("alerts", created[2]["id"])["content"] == "2"
+    assert store.delete_by_id("alerts", created[2]["id"]) is True
+    assert store.delete_by_id("alerts", created[2]["id"]) is False
+    assert store.find_by_id("alerts", created[2]["id"]) is None
+    assert store.update("alerts", created[2]["id"], {"content": "x"}) is None
+    # The primary key cannot be changed through an update.
+    assert store.update("alerts", created[0]["id"], {"id": 999})["id"] == created[0]["id"]
+    assert set(store.find_many("alerts", [created[0]["id"], created[2]["id"], 999])) == {created[0]["id"]}
+    store.close()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import hashlib
+
+from backend.datastore import DataStore
+from backend.import_engine import ImportEngine
+
+
+def make_engine(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    card = tmp_path / "card"
+    (card / "DCIM").mkdir(parents=True)
+    for index in range(3):
+        (card / "DCIM" / f"C{index:04d}.MP4").write_bytes(bytes([index]) * (4096 + index))
+    (card / "DCIM" / "._C0000.MP4").write_bytes(b"metadata")
+    source.put_document(["import_devices"], [{"name": "card", "mountPath": str(card)}])
+    folder = source.find_by("folders", "projectId", 1)[0]
+    engine = ImportEngine(source, workers=2, root=tmp_path / "library", algorithm="sha256")
+    return source, engine, card, folder
+
+
+def test_import_copies_verifies_and_resumes(tmp_path):
+    source, engine, card, folder = make_engine(tmp_path)
+    task = source.insert("import_tasks", {"sourceDevice": "card", "sourcePaths": ["/DCIM"], "targetProjectId": 1, "targetFolderId": folder["id"]})
+    engine.launch(task["id"])
+    assert engine.wait(task["id"], 10)
+    assert source.find_by_id("import_tasks", task["id"])["status"] == "success"
+    assets = source.find_by("assets", "importTaskId", task["id"])
+    assert sorted(asset["sourcePath"] for asset in assets) == ["DCIM/C0000.MP4", "DCIM/C0001.MP4", "DCIM/C0002.MP4"]
+    for asset in assets:
+        data = (card / asset["sourcePath"]).read_bytes()
+        assert asset["checksum"] == f"sha256:{hashlib.sha256(data).hexdigest()}"
+        assert asset["folderId"] == folder["id"] and asset["fileType"] == "video"
+    # A retry skips what is already registered and copies only new files.
+    (card / "DCIM" / "C0003.MP4").write_bytes(b"new clip")
+    engine.launch(task["id"])
+    assert engine.wait(task["id"], 10)
+    retried = source.find_by_id("import_tasks", task["id"])
+    assert (retried["totalFiles"], retried["skippedFiles"], retried["successFiles"]) == (4, 3, 4)
+    assert len(source.find_by("assets", "importTaskId", task["id"])) == 4
+    engine.close()
+    source.close()
+
+
+def test_import_api_rejects_unknown_or_mismatched_targets(client):
+    device = client.get("/api/import/devices").json()["items"][0]["name"]
+    project = client.post("/api/projects", json={"name": "导入校验"}).json()
+    other = client.post("/api/projects", json={"name": "导入校验-其他"}).json()
+    folder = client.post("/api/folders", json={"projectId": other["id"], "name": "素材", "parentId": None}).json()
+    for target in (
+        {"targetProjectId": project["id"], "targetFolderId": "../../x"},
+        {"targetProjectId": project["id"], "targetFolderId": 999999},
+        {"targetProjectId": project["id"], "targetFolderId": folder["id"]},
+        {"targetProjectId": True, "targetFolderId": folder["id"]},
+    ):
+        response = client.post("/api/import/tasks", json={"sourceDevice": device, **target})
+        assert response.status_code == 400
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+
+
+def test_find_by_returns_index_bucket_in_id_order(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"))
+    items = store.insert_many("folders", [{"projectId": 9, "parentId": None} for _ in range(5)])
+    store.update("folders", items[0]["id"], {"projectId": 8})
+    store.update("folders", items[0]["id"], {"projectId": 9})
+    ids = [folder["id"] for folder in store.find_by("folders", "projectId", 9)]
+    store.close()
+    assert ids == sorted(item["id"] for item in items)
+
+
+def test_index_follows_updates_and_deletes(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"))
+    first, second = store.insert_many("sync_jobs", [{"taskId": 7}, {"taskId": 7}])
+    store.update("sync_jobs", first["id"], {"taskId": 8})
+    store.delete_by_id("sync_jobs", second["id"])
+    assert store.find_by("sync_jobs", "taskId", 7) == []
+    assert store.count_by("sync_jobs", "taskId", 7) == 0
+    assert [job["id"] for job in store.find_by("sync_jobs", "taskId", 8)] == [first["id"]]
+    # Unindexed fields fall back to a scan.
+    assert [job["id"] for job in store.find_by("sync_jobs", "status", None)] == [first["id"]]
+    store.close()
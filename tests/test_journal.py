@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+
+
+def reopen(store: DataStore) -> DataStore:
+    store.close()
+    return DataStore(str(store.path), journal=True)
+
+
+def test_journal_round_trip_with_compaction(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"), journal=True, compact_bytes=1)
+    created = store.insert("projects", {"name": "p"})
+    store.update("projects", created["id"], {"status": "done"})
+    store.merge_document(["settings", "base"], {"hostname": "nas-test"})
+    store.insert_many("assets", [{"projectId": created["id"], "folderId": 1} for _ in range(3)])
+    store.bulk_write("assets", [], [1])
+    store.save()
+    store.compact()
+    after_compaction = store.insert("projects", {"name": "q"})
+    store.delete_by_id("projects", 2)
+    store.save()
+    expected = {name: store.get_collection(name) for name in ("projects", "assets")}
+    store = reopen(store)
+    assert {name: store.get_collection(name) for name in ("projects", "assets")} == expected
+    assert store.find_by_id("projects", created["id"])["status"] == "done"
+    assert store.find_by_id("projects", after_compaction["id"])["name"] == "q"
+    assert store.get_document("settings")["base"]["hostname"] == "nas-test"
+    store.close()
+
+
+def test_journal_replay_stops_at_torn_line(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"), journal=True)
+    store.insert("alerts", {"content": "kept"})
+    store.save()
+    store.journal.close()
+    with store.journal.path.open("ab") as handle:
+        handle.write(b'{"op":"insert","c":"alerts","v":{"id":99')
+    store = DataStore(str(store.path), journal=True)
+    contents = [alert["content"] for alert in store.get_collection("alerts")]
+    store.close()
+    assert contents[-1] == "kept"
+    assert store.find_by_id("alerts", 99) is None
+
+
+def test_replay_skips_records_already_in_snapshot(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"), journal=True)
+    store.append_document(["settings", "backup_history"], {"id": 2, "file": "config.json"})
+    store.save()
+    # Crash after the snapshot is written but before the rotated journal is removed.
+    store.journal.discard_rotated = lambda: None
+    store.compact()
+    assert store.journal.rotated_path.exists()
+    store.append_document(["settings", "backup_history"], {"id": 3, "file": "later.json"})
+    store.save()
+    store = reopen(store)
+    history = store.get_document("settings")["backup_history"]
+    store.close()
+    assert [entry["id"] for entry in history] == [1, 2, 3]
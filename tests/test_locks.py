@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.datastore import DataStore
+from backend.locks import RWLock, lock_file
+
+
+def test_store_refuses_second_owner(tmp_path):
+    path = tmp_path / "store.json"
+    store = DataStore(str(path), exclusive=True)
+    with pytest.raises(RuntimeError):
+        DataStore(str(path), exclusive=True)
+    store.close()
+    assert lock_file(path.with_name(path.name + ".lock")) is not None
+
+
+def test_rwlock_writer_excludes_readers():
+    lock = RWLock()
+    events = []
+    entered = threading.Event()
+
+    def reader():
+        entered.set()
+        with lock.read():
+            events.append("read")
+
+    with lock.write():
+        thread = threading.Thread(target=reader)
+        thread.start()
+        entered.wait()
+        time.sleep(0.05)
+        events.append("write done")
+    thread.join()
+    assert events == ["write done", "read"]
+
+
+def test_rwlock_rejects_upgrade_and_allows_reentry():
+    lock = RWLock()
+    with lock.write():
+        with lock.read():
+            with lock.write():
+                pass
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            with lock.write():
+                pass
+
+
+def test_concurrent_writers_and_readers_keep_the_store_consistent(tmp_path):
+    store = DataStore(str(tmp_path / "store.json"))
+    errors = []
+
+    def write(offset):
+        for index in range(50):
+            created = store.insert("assets", {"projectId": offset, "folderId": index})
+            store.update("assets", created["id"], {"folderId": -1})
+
+    def read():
+        for _ in range(200):
+            for item in store.find_by("assets", "projectId", 100):
+                if item is None or item["projectId"] != 100:
+                    errors.append(item)
+            store.save()
+
+    threads = [threading.Thread(target=write, args=(100 + offset % 2,)) for offset in range(4)]
+    threads.append(threading.Thread(target=read))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [item["id"] for item in store.get_collection("assets")]
+    store.close()
+    assert not errors
+    assert len(ids) == len(set(ids)) == 203
+    # Snapshots replace the file atomically and leave no temporary file behind.
+    assert not list(tmp_path.glob("*.tmp"))
+    reopened = DataStore(str(tmp_path / "store.json"))
+    assert len(reopened.get_collection("assets")) == 203
+    assert reopened.count("assets", {"folderId": -1}) == 200
+    reopened.close()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+from backend.restore import FairQueue, RestoreScheduler, TokenBucket
+
+
+def drain(queue: FairQueue, lanes):
+    order = []
+    while True:
+        popped = queue.pop(lanes)
+        if popped is None:
+            return order
+        order.append(popped)
+
+
+def test_fair_queue_alternates_users_then_projects():
+    queue = FairQueue()
+    for asset_id in (1, 2, 3):
+        queue.push("bulk", "alice", 1, asset_id)
+    queue.push("bulk", "alice", 2, 4)
+    queue.push("bulk", "bob", 1, 5)
+    assert [asset_id for _, asset_id in drain(queue, ("bulk",))] == [1, 5, 4, 2, 3]
+
+
+def test_fair_queue_serves_lanes_in_priority_order():
+    queue = FairQueue()
+    queue.push("bulk", "alice", 1, 1)
+    queue.push("interactive", "bob", 1, 2)
+    assert drain(queue, ("interactive", "bulk")) == [("interactive", 2), ("bulk", 1)]
+
+
+def test_token_bucket_sleeps_off_debt():
+    now = [0.0]
+    sleeps = []
+    bucket = TokenBucket(100, clock=lambda: now[0], sleep=sleeps.append)
+    bucket.consume(100)
+    assert sleeps == []
+    bucket.consume(50)
+    assert sleeps == [0.5]
+    now[0] = 2.0
+    bucket.consume(50)
+    assert sleeps == [0.5]
+
+
+def test_duplicate_requests_share_one_download_and_jump_lanes(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    first = source.insert("assets", {"projectId": 1, "fileName": "a.mov", "size": 0.001, "localPresence": "cloud"})
+    second = source.insert("assets", {"projectId": 1, "fileName": "b.mov", "size": 0.001, "localPresence": "cloud"})
+    transfers = []
+    scheduler = RestoreScheduler(source, workers=1, bandwidth_mb=0, transfer=lambda asset, offset, length: transfers.append(asset["id"]))
+    bulk = scheduler.submit([first["id"], second["id"]], "alice", "bulk", "folder", 1)
+    interactive = scheduler.submit([second["id"]], "bob", "interactive", "asset", 1)
+    assert scheduler.pending()["queued"] == {"interactive": 1, "bulk": 1}
+    item = scheduler.next_item(("interactive",), block=False)
+    assert item.asset_id == second["id"]
+    scheduler.restore(item)
+    assert scheduler.next_item(("interactive",), block=False) is None
+    assert source.find_by_id("restore_tasks", interactive["id"])["status"] == "success"
+    assert source.find_by_id("restore_tasks", bulk["id"])["restoredAssets"] == 1
+    # The upgraded asset's old bulk entry is skipped when it surfaces.
+    scheduler.restore(scheduler.next_item(("interactive", "bulk"), block=False))
+    assert scheduler.next_item(("interactive", "bulk"), block=False) is None
+    assert source.find_by_id("restore_tasks", bulk["id"])["status"] == "success"
+    assert transfers == [second["id"], first["id"]]
+    assert source.find_by_id("assets", second["id"])["localPresence"] == "both"
+    source.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import calendar
+import time
+
+from backend.rollups import SyncRollup, classify, parse_time
+
+NOW = calendar.timegm(time.strptime("2024-03-10T12:00:00Z", "%Y-%m-%dT%H:%M:%SZ"))
+
+
+def job(started, status="success", files=10):
+    return {"startedAt": started, "status": status, "totalFiles": files, "successFiles": files if status == "success" else 0, "failedFiles": 0 if status == "success" else files}
+
+
+def test_parse_time_and_classify():
+    assert parse_time("2024-03-10T12:00:00Z") == NOW
+    assert parse_time("") is None
+    assert parse_time("yesterday") is None
+    assert [classify(status) for status in ("success", "partial", "running", "disabled")] == ["success", "failed", "running", "other"]
+
+
+def test_windows_only_count_jobs_inside_them():
+    rollup = SyncRollup(clock=lambda: NOW)
+    rollup.add(job("2024-03-10T11:59:00Z"), 1)
+    rollup.add(job("2024-03-09T12:30:00Z", "partial"), 1)
+    rollup.add(job("2024-03-09T11:00:00Z"), 1)
+    rollup.add(job("2024-03-05T00:00:00Z", "running"), 1)
+    rollup.add(job("2024-01-01T00:00:00Z"), 1)
+    rollup.add(job(None), 1)
+    windows = rollup.windows()
+    assert (windows["24h"]["total"], windows["24h"]["success"], windows["24h"]["failed"]) == (2, 1, 1)
+    assert (windows["7d"]["total"], windows["7d"]["running"]) == (4, 1)
+    assert windows["30d"]["total"] == 4
+    assert windows["24h"]["successFilesPerHour"] == round(10 / 24, 2)
+
+
+def test_status_change_moves_a_job_between_counters():
+    rollup = SyncRollup(clock=lambda: NOW)
+    running = job("2024-03-10T10:00:00Z", "running")
+    rollup.add(running, 1)
+    rollup.add(running, -1)
+    rollup.add(job("2024-03-10T10:00:00Z", "failed"), 1)
+    window = rollup.window("24h")
+    assert (window["total"], window["running"], window["failed"]) == (1, 0, 1)
+
+
+def test_old_buckets_expire_as_the_clock_moves():
+    clock = [NOW]
+    rollup = SyncRollup(clock=lambda: clock[0])
+    rollup.add(job("2024-03-10T11:00:00Z"), 1)
+    clock[0] = NOW + 24 * 3600
+    assert rollup.window("24h")["total"] == 0
+    assert rollup.window("7d")["total"] == 1
+    rollup.add(job("2024-03-11T11:30:00Z"), 1)
+    assert rollup.window("24h")["total"] == 1
+
+
+def test_stats_endpoint(client):
+    windows = client.get("/api/sync-jobs/stats").json()["windows"]
+    assert set(windows) == {"24h", "7d", "30d"}
+    assert {"total", "success", "failed", "successFilesPerHour"} <= set(windows["24h"])
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from backend.datastore import DataStore
+from backend.scheduler import CronSpec, SyncScheduler, parse_schedule
+
+
+@pytest.mark.parametrize(
+    ("expression", "moment", "expected"),
+    [
+        ("*/15 * * * *", datetime(2024, 3, 10, 8, 7, 30), datetime(2024, 3, 10, 8, 15)),
+        ("*/15 * * * *", datetime(2024, 3, 10, 8, 15), datetime(2024, 3, 10, 8, 30)),
+        ("0 2 * * *", datetime(2024, 3, 10, 2, 0), datetime(2024, 3, 11, 2, 0)),
+        ("30 1 * * 1-5", datetime(2024, 3, 8, 12, 0), datetime(2024, 3, 11, 1, 30)),
+        ("0 0 1 * *", datetime(2024, 12, 31, 23, 59), datetime(2025, 1, 1, 0, 0)),
+        ("0 12 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29, 12, 0)),
+        ("0 0 * * 7", datetime(2024, 3, 10, 0, 0), datetime(2024, 3, 17, 0, 0)),
+        # Day of month and weekday both restricted: either one fires.
+        ("0 9 13 * 5", datetime(2024, 9, 1), datetime(2024, 9, 6, 9, 0)),
+    ],
+)
+def test_next_fire(expression, moment, expected):
+    assert CronSpec(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize(
+    ("text", "expression"),
+    [
+        ("每日 02:00", "0 2 * * *"),
+        ("每天 2:05", "5 2 * * *"),
+        ("每周一 01:00", "0 1 * * 1"),
+        ("每周日 23:30", "30 23 * * 0"),
+        ("每月15日 04:00", "0 4 15 * *"),
+        ("每小时", "0 * * * *"),
+        ("每小时 20分", "20 * * * *"),
+    ],
+)
+def test_chinese_schedules(text, expression):
+    assert parse_schedule(text).expression == expression
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "每周八 01:00"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        parse_schedule(expression)
+
+
+def test_expression_that_never_fires():
+    with pytest.raises(ValueError):
+        CronSpec("0 0 31 2 *").next_after(datetime(2024, 1, 1))
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.launched = []
+
+    def launch(self, task, trigger="manual"):
+        self.launched.append((task["id"], trigger))
+        return {"id": len(self.launched)}
+
+    def wait(self, job_id, timeout=None):
+        return True
+
+
+def test_due_tasks_are_queued_once_and_rescheduled(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    now = [datetime(2024, 3, 10, 8, 0).timestamp()]
+    executor = FakeExecutor()
+    scheduler = SyncScheduler(source, executor, clock=lambda: now[0])
+    source.add_listener(scheduler.on_change)
+    hourly = source.insert("sync_tasks", {"name": "h", "schedule": "每小时", "enabled": True})
+    quarter = source.insert("sync_tasks", {"name": "q", "schedule": "*/15 * * * *", "enabled": True})
+    source.insert("sync_tasks", {"name": "off", "schedule": "*/5 * * * *", "enabled": False})
+    source.insert("sync_tasks", {"name": "bad", "schedule": "sometimes", "enabled": True})
+    assert [run["taskId"] for run in scheduler.upcoming()] == [quarter["id"], hourly["id"]]
+    now[0] = datetime(2024, 3, 10, 9, 0).timestamp()
+    scheduler.fire_due()
+    # Missed quarter-hour runs collapse into one.
+    assert [scheduler.next_ready(block=False) for _ in range(3)] == [quarter["id"], hourly["id"], None]
+    assert scheduler.upcoming()[0]["taskId"] == quarter["id"]
+    source.update("sync_tasks", quarter["id"], {"enabled": False})
+    now[0] = datetime(2024, 3, 10, 10, 0).timestamp()
+    scheduler.fire_due()
+    assert scheduler.next_ready(block=False) == hourly["id"]
+    assert scheduler.next_ready(block=False) is None
+    assert scheduler.run_task(hourly["id"]) == {"id": 1}
+    assert scheduler.run_task(quarter["id"]) is None
+    assert executor.launched == [(hourly["id"], "schedule")]
+    source.close()
+
+
+def test_sync_task_api_rejects_invalid_schedule(client):
+    response = client.post("/api/sync-tasks", json={"name": "坏计划", "source": "a", "target": ["b"], "schedule": "每周八 01:00"})
+    assert response.status_code == 400
+    assert client.get("/api/sync-tasks/upcoming").status_code == 200
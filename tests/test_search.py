@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from backend.datastore import store
+from backend.search import SearchIndex
+
+
+def make_index():
+    index = SearchIndex()
+    index.rebuild(
+        [
+            {"id": 1, "fileName": "花絮采访.wav", "tags": ["采访"], "location": "上海"},
+            {"id": 2, "fileName": "旅途A卷.raw", "tags": ["自然", "山脉"], "location": "西藏"},
+            {"id": 3, "fileName": "A001_C001.MP4", "camera": "FX6", "owner": "林楠"},
+        ]
+    )
+    return index
+
+
+def test_cjk_substrings_without_word_boundaries():
+    index = make_index()
+    assert index.search("花絮") == [1]
+    assert index.search("絮采") == [1]
+    assert index.search("采访") == [1]
+    assert index.search("旅途a") == [2]
+    assert index.search("山") == [2]
+    assert index.search("林楠") == [3]
+    assert index.search("花絮采访录音") == []
+
+
+def test_latin_keywords_are_case_insensitive_substrings():
+    index = make_index()
+    assert index.search("a001_c0") == [3]
+    assert index.search("mp4") == [3]
+    assert index.search(".wav") == [1]
+    assert index.search("fx") == [3]
+
+
+def test_keyword_does_not_match_across_fields():
+    index = make_index()
+    # "采访" ends one field of asset 1 and "上海" starts the next.
+    assert index.search("访上") == []
+
+
+def test_index_follows_changes():
+    index = make_index()
+    index.on_change("assets", {"id": 1, "fileName": "花絮采访.wav"}, {"id": 1, "fileName": "片尾.wav"})
+    index.on_change("assets", None, {"id": 4, "fileName": "花絮二.mov"})
+    index.on_change("assets", {"id": 2}, None)
+    index.on_change("folders", None, {"id": 5, "name": "花絮"})
+    assert index.search("花絮") == [4]
+    assert index.search("片尾") == [1]
+    assert index.search("山脉") == []
+
+
+def test_search_endpoint_pages_keyword_hits(client):
+    created = store.insert_many(
+        "assets", [{"projectId": 2, "folderId": 6, "fileName": f"航拍长镜头{index}.mov", "tierLevel": "hot"} for index in range(3)]
+    )
+    ids = [asset["id"] for asset in created]
+    response = client.post("/api/assets/search", json={"keyword": "长镜头"})
+    assert response.status_code == 200
+    assert [asset["id"] for asset in response.json()["items"]] == ids
+    assert response.json()["total"] == 3
+    response = client.post("/api/assets/search", json={"keyword": "镜头1", "projectIds": [2], "fields": ["id", "fileName"]})
+    assert response.json()["items"] == [{"id": ids[1], "fileName": "航拍长镜头1.mov"}]
+    assert client.post("/api/assets/search", json={"keyword": "长镜头", "projectIds": [1]}).json()["items"] == []
+    first = client.post("/api/assets/search", json={"keyword": "航拍", "limit": 2}).json()
+    assert [asset["id"] for asset in first["items"]] == ids[:2]
+    rest = client.post("/api/assets/search", json={"keyword": "航拍", "limit": 2, "cursor": first["nextCursor"]}).json()
+    assert [asset["id"] for asset in rest["items"]] == ids[2:]
+    assert rest["nextCursor"] is None
+    assert client.post("/api/assets/search", json={"keyword": "航拍", "limit": 0}).status_code == 422
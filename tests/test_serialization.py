@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+import pytest
+
+from backend import serialization
+from backend.responses import FastJSONResponse
+from backend.serialization import dumps, dumps_text, loads
+
+VALUE = {"name": "花絮采访.wav", "size": 0.8, "tags": ["采访"], "nested": {"ok": True, "none": None}, "count": 3}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend_json(request, monkeypatch):
+    if request.param == "orjson":
+        if not serialization.FAST_JSON:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+
+def test_round_trip_keeps_cjk_unescaped(backend_json):
+    encoded = dumps(VALUE)
+    assert "花絮采访".encode("utf-8") in encoded
+    assert b" " not in encoded
+    assert loads(encoded) == VALUE
+    assert loads(dumps_text(VALUE)) == VALUE
+    assert json.loads(dumps(VALUE, pretty=True)) == VALUE
+    assert b"\n  " in dumps(VALUE, pretty=True)
+
+
+def test_response_falls_back_for_values_only_fastapi_encodes():
+    body = FastJSONResponse({"ids": {3}, "at": datetime(2024, 3, 10, 8, 0)}).body
+    assert loads(body) == {"ids": [3], "at": "2024-03-10T08:00:00"}
+
+
+def test_handlers_return_compact_utf8_json(client):
+    response = client.get("/api/projects/2")
+    assert response.headers["content-type"] == "application/json"
+    assert "纪录片".encode("utf-8") in response.content
+    assert response.json()["id"] == 2
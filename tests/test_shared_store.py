@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from backend.sqlite_store import SQLiteStore
+from backend.sync_engine import SyncExecutor
+
+
+def test_shared_stores_allocate_distinct_ids_and_see_each_other(tmp_path):
+    path = str(tmp_path / "store.db")
+    first = SQLiteStore(path, shared=True)
+    second = SQLiteStore(path, shared=True)
+    seen = []
+    second.add_listener(lambda collection, old, new: seen.append(new["id"]) if collection == "alerts" and new else None)
+    ids = []
+
+    def insert_many(store):
+        for _ in range(25):
+            ids.append(store.insert("alerts", {"content": "x"})["id"])
+
+    threads = [threading.Thread(target=insert_many, args=(store,)) for store in (first, second, first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    first.refresh()
+    second.refresh()
+    assert len(set(ids)) == len(ids) == 100
+    assert sorted(seen) == sorted(ids)
+    assert first.version("alerts") == second.version("alerts")
+    assert first.epoch == second.epoch
+    first.close()
+    second.close()
+
+
+def test_shared_store_reads_while_another_writer_holds_the_gate(tmp_path):
+    path = str(tmp_path / "store.db")
+    writer = SQLiteStore(path, shared=True)
+    reader = SQLiteStore(path, shared=True)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with writer.transaction():
+            writer.insert("alerts", {"content": "pending"})
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    holding.wait(5)
+    blocked = threading.Thread(target=reader.insert, args=("alerts", {"content": "queued"}))
+    blocked.start()
+    # Neither the other store's open write nor this store's queued writer delays reads.
+    started = time.monotonic()
+    count = reader.count("alerts")
+    reader.refresh()
+    assert reader.count("alerts") == count
+    assert time.monotonic() - started < 1
+    release.set()
+    thread.join()
+    blocked.join()
+    reader.refresh()
+    assert reader.count("alerts") == count + 2
+    writer.close()
+    reader.close()
+
+
+def test_a_sync_task_runs_in_one_process_at_a_time(tmp_path):
+    path = str(tmp_path / "store.db")
+    first_store = SQLiteStore(path, shared=True)
+    second_store = SQLiteStore(path, shared=True)
+    first = SyncExecutor(first_store)
+    second = SyncExecutor(second_store)
+    # The first process claims the task but its job has not finished yet.
+    first.start = lambda task, job_id: None
+    task = first_store.insert("sync_tasks", {"name": "t", "source": "missing", "target": []})
+    job = first.launch(task)
+    assert job is not None
+    assert second.launch(second_store.find_by_id("sync_tasks", task["id"])) is None
+    assert second_store.count("sync_jobs", {"taskId": task["id"]}) == 1
+    first._drive(task, job["id"])
+    assert second_store.find_by_id("sync_tasks", task["id"])["runningJobId"] is None
+    rerun = second.launch(second_store.find_by_id("sync_tasks", task["id"]))
+    assert rerun is not None and second.wait(rerun["id"], 5)
+    # A claim left behind by a crashed process is cleared on recovery.
+    first_store.update("sync_tasks", task["id"], {"runningJobId": 999})
+    first.recover()
+    assert second_store.find_by_id("sync_tasks", task["id"])["runningJobId"] is None
+    for executor in (first, second):
+        executor.close()
+    first_store.close()
+    second_store.close()
+
+
+def test_cached_routes_catch_up_off_the_event_loop(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.http_cache import ETagMiddleware, cache_on
+
+    path = str(tmp_path / "store.db")
+    served = SQLiteStore(path, shared=True)
+    other = SQLiteStore(path, shared=True)
+    refreshed = []
+    refresh = served.refresh
+
+    def tracked_refresh():
+        refreshed.append(threading.get_ident())
+        refresh()
+
+    served.refresh = tracked_refresh
+    app = FastAPI()
+    app.add_middleware(ETagMiddleware, source=served)
+
+    @app.get("/alerts")
+    @cache_on("alerts")
+    def alerts():
+        return {"count": served.count("alerts")}
+
+    @app.get("/plain")
+    async def plain():
+        return {"loop": threading.get_ident()}
+
+    with TestClient(app) as client:
+        before = client.get("/alerts")
+        other.insert("alerts", {"content": "from another worker"})
+        after = client.get("/alerts", headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200 and after.json()["count"] == before.json()["count"] + 1
+        calls = len(refreshed)
+        loop_thread = client.get("/plain").json()["loop"]
+        client.post("/alerts")
+    assert refreshed and loop_thread not in refreshed and len(refreshed) == calls
+    served.close()
+    other.close()
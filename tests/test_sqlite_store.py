@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from backend.datastore import DataStore
+from backend.sqlite_store import SQLiteStore, migrate_json
+
+
+def test_nested_transaction_commits_with_outer_block(tmp_path):
+    store = SQLiteStore(str(tmp_path / "store.db"))
+    with store.transaction():
+        created = store.insert("alerts", {"content": "outer"})
+        with store.transaction():
+            store.update("alerts", created["id"], {"status": "closed"})
+    store.save()
+    store.close()
+    reopened = SQLiteStore(str(tmp_path / "store.db"))
+    assert reopened.find_by_id("alerts", created["id"])["status"] == "closed"
+    reopened.close()
+
+
+def test_migration_keeps_id_counters(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    deleted = source.insert("alerts", {"content": "gone"})
+    source.delete_by_id("alerts", deleted["id"])
+    source.close()
+    target = migrate_json(str(tmp_path / "store.json"), str(tmp_path / "store.db"))
+    assert target.insert("alerts", {"content": "new"})["id"] == deleted["id"] + 1
+    target.close()
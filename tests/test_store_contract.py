@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import inspect
+from copy import deepcopy
+
+import pytest
+
+from backend.datastore import BaseStore, DataStore
+from backend.sqlite_store import SQLiteStore
+
+
+@pytest.fixture(params=["json", "journal", "sqlite"])
+def open_store(request, tmp_path):
+    opened = []
+
+    def open_store():
+        if request.param == "sqlite":
+            store = SQLiteStore(str(tmp_path / "store.db"))
+        else:
+            store = DataStore(str(tmp_path / "store.json"), journal=request.param == "journal")
+        opened.append(store)
+        return store
+
+    yield open_store
+    opened[-1].close()
+
+
+def test_backends_implement_the_declared_interface():
+    declared = {name for name, _ in inspect.getmembers(BaseStore, inspect.isfunction) if not name.startswith("_")}
+    for backend in (DataStore, SQLiteStore):
+        public = {name for name, _ in inspect.getmembers(backend, inspect.isfunction) if not name.startswith("_")}
+        assert declared <= public
+        assert not {"export", "load"} & declared
+
+
+def test_failed_transaction_is_undone_everywhere(open_store):
+    store = open_store()
+    changes = []
+    store.add_listener(lambda collection, old, new: changes.append((old, new)))
+    alerts = store.get_collection("alerts")
+    settings = deepcopy(store.get_document("settings"))
+    with pytest.raises(ValueError):
+        with store.transaction():
+            store.insert("alerts", {"content": "partial"})
+            store.update("alerts", alerts[0]["id"], {"status": "closed", "note": "added"})
+            store.delete_by_id("alerts", alerts[1]["id"])
+            store.merge_document(["settings", "base"], {"hostname": "changed"})
+            store.append_document(["settings", "backup_history"], {"id": 9})
+            raise ValueError
+    assert store.get_collection("alerts") == alerts
+    assert store.get_document("settings") == settings
+    # Listeners saw each change, then its reversal.
+    assert [(old, new) for new, old in reversed(changes[3:])] == changes[:3]
+    store.save()
+    store.close()
+    reopened = open_store()
+    assert reopened.get_collection("alerts") == alerts
+    assert reopened.get_document("settings") == settings
+
+
+def test_inner_failure_only_undoes_the_inner_block(open_store):
+    store = open_store()
+    with store.transaction():
+        created = store.insert("alerts", {"content": "outer"})
+        with pytest.raises(ValueError):
+            with store.transaction():
+                store.update("alerts", created["id"], {"status": "closed"})
+                raise ValueError
+        store.update("alerts", created["id"], {"handler": "admin"})
+    store.save()
+    store.close()
+    reopened = open_store()
+    kept = reopened.find_by_id("alerts", created["id"])
+    assert kept.get("status") is None
+    assert kept["handler"] == "admin"
+    assert [alert["id"] for alert in reopened.scan("alerts")] == [alert["id"] for alert in reopened.get_collection("alerts")]
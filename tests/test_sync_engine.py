@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from backend import sync_engine
+from backend.datastore import DataStore, store
+from backend.sync_engine import SyncExecutor, SyncLocations, relative_location, sync_executor
+
+
+@pytest.fixture
+def executor(tmp_path):
+    source = DataStore(str(tmp_path / "store.json"))
+    executor = SyncExecutor(source, workers=2)
+    executor.locations = SyncLocations(source, tmp_path / "root")
+    for index in range(5):
+        path = tmp_path / "root" / "src" / f"dir{index % 2}" / f"clip{index}.mov"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([index]) * 1000)
+    yield executor, source
+    executor.close()
+    source.close()
+
+
+def run(executor, source, task):
+    job = executor.launch(task)
+    assert executor.wait(job["id"], timeout=10)
+    return source.find_by_id("sync_jobs", job["id"])
+
+
+def test_job_copies_then_skips_unchanged_files(executor, tmp_path):
+    executor, source = executor
+    task = source.insert("sync_tasks", {"name": "t", "source": "src", "target": ["dst"], "mode": "incremental"})
+    job = run(executor, source, task)
+    assert (job["status"], job["totalFiles"], job["successFiles"], job["copiedFiles"]) == ("success", 5, 5, 5)
+    assert (tmp_path / "root" / "dst" / "dir1" / "clip3.mov").read_bytes() == bytes([3]) * 1000
+    job = run(executor, source, task)
+    assert (job["copiedFiles"], job["skippedFiles"]) == (0, 5)
+    assert source.find_by_id("sync_tasks", task["id"])["lastRunStatus"] == "success"
+
+
+def test_unexpected_errors_count_as_failed_files(executor, monkeypatch):
+    executor, source = executor
+    copy = sync_engine.copy_file
+
+    def flaky(path, target):
+        if path.name == "clip2.mov":
+            raise UnicodeEncodeError("utf-8", "x", 0, 1, "bad name")
+        copy(path, target)
+
+    monkeypatch.setattr(sync_engine, "copy_file", flaky)
+    task = source.insert("sync_tasks", {"name": "t", "source": "src", "target": ["dst"], "mode": "full"})
+    job = run(executor, source, task)
+    assert (job["status"], job["totalFiles"], job["successFiles"], job["failedFiles"]) == ("partial", 5, 4, 1)
+    assert len(job["errors"]) == 1 and "clip2.mov" in job["errors"][0]
+
+
+def test_locations_may_not_leave_the_sync_root(executor):
+    executor, source = executor
+    for name in ("../outside", "/etc", "a/../../b"):
+        with pytest.raises(ValueError):
+            relative_location(name)
+    task = source.insert("sync_tasks", {"name": "t", "source": "src", "target": ["../escape"]})
+    job = run(executor, source, task)
+    assert job["status"] == "fail" and "'..'" in job["errors"][0]
+
+
+def test_run_endpoint_and_location_validation(client):
+    assert client.post("/api/sync-tasks", json={"name": "bad", "source": "../x", "target": ["a"]}).status_code == 400
+    assert client.post("/api/sync-tasks", json={"name": "bad", "source": "a", "target": ["/tmp/x"]}).status_code == 400
+    assert client.patch("/api/sync-tasks/1", json={"target": ["../../x"]}).status_code == 400
+    (sync_executor.locations.root / "api-src").mkdir(parents=True, exist_ok=True)
+    (sync_executor.locations.root / "api-src" / "a.txt").write_text("a")
+    task = client.post("/api/sync-tasks", json={"name": "api", "source": "api-src", "target": ["api-dst"]}).json()
+    job = client.post(f"/api/sync-tasks/{task['id']}/run").json()
+    assert job["status"] == "running" and job["taskId"] == task["id"]
+    assert sync_executor.wait(job["id"], timeout=10)
+    assert store.find_by_id("sync_jobs", job["id"])["status"] == "success"
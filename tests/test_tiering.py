@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from backend.datastore import DataStore
+from backend.rollups import parse_time
+from backend.tiering import DAY, TieringEngine
+
+POLICY = {"id": 100, "type": "global", "hotToWarmDays": 10, "warmToColdDays": 30, "coldCacheGb": 5}
+
+
+def make_engine(tmp_path, now):
+    source = DataStore(str(tmp_path / "store.json"))
+    engine = TieringEngine(source, batch=2, clock=lambda: now[0])
+    source.add_listener(engine.on_change)
+    engine.load([POLICY], [])
+    return source, engine
+
+
+def asset(source, touched, **fields):
+    return source.insert("assets", {"projectId": 1, "size": 3, "tierLevel": "hot", "localPresence": "local", "lastAccessedAt": touched, **fields})
+
+
+def test_idle_assets_are_demoted_when_due(tmp_path):
+    start = parse_time("2024-03-01T00:00:00Z")
+    now = [start]
+    source, engine = make_engine(tmp_path, now)
+    recent = asset(source, "2024-03-01T00:00:00Z")
+    stale = asset(source, "2024-01-01T00:00:00Z")
+    warm = asset(source, "2024-02-25T00:00:00Z", tierLevel="warm")
+    assert engine.run_once()["demoted"] == 1
+    assert source.find_by_id("assets", stale["id"])["tierLevel"] == "cold"
+    now[0] = start + 11 * DAY
+    assert engine.run_once()["demoted"] == 1
+    assert source.find_by_id("assets", recent["id"])["tierLevel"] == "warm"
+    assert source.find_by_id("assets", warm["id"])["tierLevel"] == "warm"
+    # Touching an asset pushes its due time back.
+    source.update("assets", warm["id"], {"lastAccessedAt": "2024-03-12T00:00:00Z"})
+    now[0] = start + 40 * DAY
+    assert engine.run_once()["demoted"] == 1
+    assert source.find_by_id("assets", recent["id"])["tierLevel"] == "cold"
+    assert source.find_by_id("assets", warm["id"])["tierLevel"] == "warm"
+    assert engine.status()["scheduled"] == 1
+    source.close()
+
+
+def test_cold_cache_over_budget_drops_oldest_cloud_backed_copies(tmp_path):
+    now = [parse_time("2024-03-01T00:00:00Z")]
+    source, engine = make_engine(tmp_path, now)
+    oldest = asset(source, "2023-01-01T00:00:00Z", tierLevel="cold", localPresence="both")
+    local_only = asset(source, "2023-01-02T00:00:00Z", tierLevel="cold", localPresence="local")
+    newest = asset(source, "2023-01-03T00:00:00Z", tierLevel="cold", localPresence="both")
+    assert engine.status()["coldCache"][0]["usedGb"] == 9
+    result = engine.run_once()
+    # 9 GB against a 5 GB budget: the two "both" copies go, oldest first; the local-only one stays.
+    assert result["evicted"] == 2
+    assert source.find_by_id("assets", oldest["id"])["localPresence"] == "cloud"
+    assert source.find_by_id("assets", newest["id"])["localPresence"] == "cloud"
+    assert source.find_by_id("assets", local_only["id"])["localPresence"] == "local"
+    assert engine.status()["coldCache"][0]["usedGb"] == 3
+    assert engine.run_once()["evicted"] == 0
+    source.close()
+
+
+def test_failed_runs_are_logged_and_retried(tmp_path, caplog):
+    now = [parse_time("2024-03-01T00:00:00Z")]
+    source, engine = make_engine(tmp_path, now)
+    engine.interval = 0.01
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("store unavailable")
+
+    engine.run_once = broken
+    with caplog.at_level(logging.ERROR, logger="backend.tiering"):
+        engine.start()
+        deadline = time.monotonic() + 2
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.close()
+    assert len(calls) >= 2
+    assert "tiering run failed" in caplog.text
+    source.close()
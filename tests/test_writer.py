@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.datastore import DataStore
+from backend.writer import StoreWriter
+
+
+class CountingStore(DataStore):
+    saves = 0
+
+    def save(self) -> None:
+        self.saves += 1
+        super().save()
+
+
+def test_queued_writes_share_one_save_and_keep_their_own_errors(tmp_path):
+    source = CountingStore(str(tmp_path / "store.json"))
+    writer = StoreWriter(source, max_batch=16)
+
+    def fail():
+        raise LookupError("missing")
+
+    async def scenario():
+        writes = [writer.insert("alerts", {"content": str(index)}) for index in range(40)]
+        results = await asyncio.gather(*writes, writer.run(fail), return_exceptions=True)
+        await writer.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[-1], LookupError)
+    assert len({result["id"] for result in results[:-1]}) == 40
+    # 41 writes in rounds of at most 16, one save per round.
+    assert source.saves == 3
+    reopened = DataStore(str(tmp_path / "store.json"))
+    assert all(reopened.find_by_id("alerts", result["id"]) for result in results[:-1])
+    source.close()
+    reopened.close()
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body"),
+    [
+        ("patch", "/api/projects/999999", {"name": "x"}),
+        ("patch", "/api/folders/999999", {"name": "x"}),
+        ("patch", "/api/assets/999999/meta", {"tags": []}),
+        ("patch", "/api/sync-tasks/999999/enable", {"enabled": False}),
+        ("patch", "/api/users/999999", {"name": "x"}),
+        ("patch", "/api/alerts/999999", {"status": "closed"}),
+        ("post", "/api/assets/999999/restore", {}),
+        ("post", "/api/folders/999999/restore", {}),
+        ("post", "/api/sync-tasks/999999/run", None),
+        ("post", "/api/import/tasks/999999/retry", None),
+        ("post", "/api/projects/999999/members", {"userId": 1}),
+        ("delete", "/api/folders/999999", None),
+    ],
+)
+def test_writes_to_missing_records_are_404(client, method, path, body):
+    response = client.request(method.upper(), path, json=body)
+    assert response.status_code == 404
+
+
+def test_update_of_a_deleted_record_is_404(client):
+    role = client.post("/api/roles", json={"name": "临时角色"}).json()
+    assert client.patch(f"/api/roles/{role['id']}", json={"name": "改名"}).json()["name"] == "改名"
+    assert client.delete(f"/api/roles/{role['id']}").status_code == 200
+    assert client.patch(f"/api/roles/{role['id']}", json={"name": "再改"}).status_code == 404